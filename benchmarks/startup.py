@@ -0,0 +1,93 @@
+"""Report how long each CLI command spends importing modules before it runs.
+
+Every command is measured in a fresh interpreter with ``python -X importtime``:
+the child imports ``main`` and builds the parser the way the CLI does, then
+loads the command's handler (and the database layer if it needs one). The
+summed import time and wall-clock time of that child are printed per command.
+
+    python benchmarks/startup.py [--repeat N] [--max-ms MS] [command ...]
+
+With --max-ms the script exits with status 1 if any command's import time
+exceeds the budget, so it can guard against startup regressions.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CHILD = """
+import sys
+import main
+
+parser = main.build_parser()
+if sys.argv[1] != "-":
+    sub = parser._subparsers._group_actions[0].choices[sys.argv[1]]
+    sub.get_default("func").load()
+    if sub.get_default("needs_db"):
+        import src.core.databaseAccessor
+        import src.operations.audit
+"""
+
+
+def commands() -> list[str]:
+    sys.path.insert(0, str(ROOT))
+    from src.core.buildParser import build_parser
+
+    return list(build_parser()._subparsers._group_actions[0].choices)
+
+
+def measure(command: str) -> tuple[float, float, int]:
+    """Return (import ms, wall ms, module count) for one cold start."""
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD, command],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    wall = (time.perf_counter() - started) * 1000
+    if proc.returncode:
+        raise RuntimeError(f"{command}: {proc.stderr.strip().splitlines()[-1]}")
+    total = 0
+    modules = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        total += int(line.split(":", 1)[1].split("|")[0])
+        modules += 1
+    return total / 1000, wall, modules
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("command", nargs="*", help="Commands to measure (default: all)")
+    ap.add_argument(
+        "--repeat", type=int, default=3, help="Runs per command (best kept)"
+    )
+    ap.add_argument("--max-ms", type=float, help="Fail if imports take longer")
+    args = ap.parse_args()
+
+    names = args.command or ["-"] + commands()
+    print(f"{'command':<14} {'imports ms':>11} {'wall ms':>9} {'modules':>8}")
+    over = []
+    for name in names:
+        runs = [measure(name) for _ in range(max(1, args.repeat))]
+        imports, wall, modules = min(runs)
+        label = "(parser only)" if name == "-" else name
+        print(f"{label:<14} {imports:>11.1f} {wall:>9.1f} {modules:>8}")
+        if args.max_ms is not None and imports > args.max_ms:
+            over.append(label)
+    if over:
+        print(f"Over the {args.max_ms:g} ms budget:", ", ".join(over))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,37 @@
 from src.core.buildParser import build_parser
-from src.core.databaseAccessor import db
+from src.daemon import dispatch, forward_to_daemon, runs_locally
 
 import asyncio
+import os
+import sys
 
 
 async def main():
+    parser = build_parser()
+    args = parser.parse_args()
+
+    if not hasattr(args, "func"):
+        parser.print_help()
+        return
+
+    if not os.environ.get("FILEMGR_NO_DAEMON") and not runs_locally(args):
+        status = forward_to_daemon(sys.argv[1:])
+        if status is not None:
+            sys.exit(status)
+
+    if not args.needs_db:
+        await dispatch(args)
+        return
+
+    # Only commands that use the database pay for importing SQLAlchemy.
+    from src.core.databaseAccessor import db
+    from src.operations.audit import auditLog
+
     await db.connect()
     try:
-        parser = build_parser()
-        args = parser.parse_args()
-
-        if not hasattr(args, "func"):
-            parser.print_help()
-            return
-
-        fn = args.func
-        if asyncio.iscoroutinefunction(fn):
-            await fn(args)
-        else:
-            r = fn(args)
-            if asyncio.iscoroutine(r):
-                await r
+        await dispatch(args)
     finally:
+        await auditLog.close()
         await db.disconnect()
 
 
@@ -0,0 +1,59 @@
+from collections import Counter, defaultdict
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from src.blobs.blobs import Blob
+from src.core.databaseAccessor import db
+
+
+class BlobAccessor:
+    async def add_refs(self, blocks) -> None:
+        """Take one reference per (hash, size) entry of a manifest."""
+        counts = Counter(h for h, _ in blocks)
+        if not counts:
+            return
+        sizes = dict(blocks)
+        stmt = insert(Blob).values(
+            [{"hash": h, "size": sizes[h], "refcount": n} for h, n in counts.items()]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Blob.hash],
+            set_={"refcount": Blob.refcount + stmt.excluded.refcount},
+        )
+        await db.execute(stmt)
+
+    async def release(self, blocks) -> list[str]:
+        """Drop the references of a manifest; returns hashes no longer used."""
+        counts = Counter(h for h, _ in blocks)
+        if not counts:
+            return []
+        by_count = defaultdict(list)
+        for h, n in counts.items():
+            by_count[n].append(h)
+        for n, hashes in by_count.items():
+            stmt = (
+                update(Blob)
+                .where(Blob.hash.in_(hashes))
+                .values(refcount=Blob.refcount - n)
+            )
+            await db.execute(stmt)
+        stmt = (
+            delete(Blob)
+            .where(Blob.hash.in_(list(counts)), Blob.refcount <= 0)
+            .returning(Blob.hash)
+        )
+        result = await db.execute(stmt)
+        return list(result.scalars().all())
+
+    async def unreferenced(self, hashes) -> list[str]:
+        """Those of hashes that have no row, i.e. no file references them."""
+        hashes = set(hashes)
+        if not hashes:
+            return []
+        stmt = select(Blob.hash).where(Blob.hash.in_(hashes))
+        result = await db.execute(stmt)
+        return list(hashes - set(result.scalars().all()))
+
+
+blobAccessor = BlobAccessor()
@@ -0,0 +1,11 @@
+from src.core.models.models import BaseModel
+from sqlalchemy import BigInteger, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class Blob(BaseModel):
+    __tablename__ = "blobs"
+
+    hash: Mapped[str] = mapped_column(String(64), unique=True)
+    size: Mapped[int] = mapped_column(BigInteger)
+    refcount: Mapped[int] = mapped_column(BigInteger, server_default="0")
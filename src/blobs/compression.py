@@ -0,0 +1,177 @@
+import gzip
+import io
+import lzma
+import struct
+from pathlib import Path
+
+from src.cli import STREAM_CHUNK_SIZE, copy_stream, mark_stored_format
+from src.core.config import config
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION = getattr(config.static, "COMPRESSION", None)
+COMPRESSION_LEVEL = getattr(config.static, "COMPRESSION_LEVEL", None)
+COMPRESS_SUFFIXES = frozenset(
+    getattr(
+        config.static,
+        "COMPRESS_SUFFIXES",
+        (".txt", ".json", ".xml", ".csv", ".log", ".md"),
+    )
+)
+
+COMPRESSED_MAGIC = b"\x00filemgr-compressed\x00\n"
+# codec name (4 bytes, NUL padded) and logical size
+_HEADER = struct.Struct("<4sQ")
+HEADER_SIZE = len(COMPRESSED_MAGIC) + _HEADER.size
+
+
+class _Region(io.RawIOBase):
+    """fh seen from offset ``start`` on, so codecs can rewind to "0"."""
+
+    def __init__(self, fh, start: int):
+        self._fh = fh
+        self._start = start
+        fh.seek(start)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        return self._fh.readinto(b)
+
+    def tell(self):
+        return self._fh.tell() - self._start
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            offset += self._start
+        return self._fh.seek(offset, whence) - self._start
+
+    def close(self):
+        self._fh.close()
+        super().close()
+
+
+class _Decompressed(io.RawIOBase):
+    """Raw stream over a codec's reader that also closes the file below it."""
+
+    def __init__(self, reader, region: _Region):
+        self._reader = reader
+        self._region = region
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        return self._reader.readinto(b)
+
+    def tell(self):
+        return self._reader.tell()
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self._reader.seek(offset, whence)
+
+    def close(self):
+        try:
+            self._reader.close()
+        finally:
+            self._region.close()
+            super().close()
+
+
+def _zstd_writer(fh, level):
+    cctx = zstandard.ZstdCompressor(level=3 if level is None else level)
+    return cctx.stream_writer(fh, closefd=False)
+
+
+def _zstd_reader(fh):
+    return zstandard.ZstdDecompressor().stream_reader(fh, closefd=False)
+
+
+# zlib is stored with gzip framing, which adds a CRC over the content.
+CODECS = {
+    "zlib": (
+        lambda fh, level: gzip.GzipFile(
+            fileobj=fh, mode="wb", compresslevel=6 if level is None else level, mtime=0
+        ),
+        lambda fh: gzip.GzipFile(fileobj=fh, mode="rb"),
+    ),
+    "lzma": (
+        lambda fh, level: lzma.LZMAFile(fh, "wb", preset=level),
+        lambda fh: lzma.LZMAFile(fh, "rb"),
+    ),
+}
+if zstandard is not None:
+    CODECS["zstd"] = (_zstd_writer, _zstd_reader)
+
+
+def codec_for(p: Path, requested: str | None = None) -> str | None:
+    """Codec to store p with: the requested one, else the COMPRESSION policy.
+
+    requested may be "none" to store p uncompressed whatever the policy says.
+    Raises ValueError for codecs that are unknown or not installed.
+    """
+    if requested is None:
+        if not COMPRESSION or p.suffix.lower() not in COMPRESS_SUFFIXES:
+            return None
+        requested = COMPRESSION
+    if requested == "none":
+        return None
+    if requested not in CODECS:
+        raise ValueError(f"Compression codec {requested!r} is not available")
+    return requested
+
+
+def read_header(fh) -> tuple[str, int] | None:
+    """(codec, logical size) if fh, positioned at 0, holds compressed content."""
+    head = fh.read(HEADER_SIZE)
+    if not head.startswith(COMPRESSED_MAGIC) or len(head) < HEADER_SIZE:
+        return None
+    name, size = _HEADER.unpack_from(head, len(COMPRESSED_MAGIC))
+    return name.rstrip(b"\x00").decode(), size
+
+
+def compress_stream(src, dst, codec: str, limit: int, level=COMPRESSION_LEVEL):
+    """Compress src into the binary file dst in streaming chunks.
+
+    Returns (logical size, sha256 of the content) like copy_stream; the size
+    in the header is filled in once the input is exhausted. dst is marked
+    with the codec (see ``mark_stored_format``), which is what makes it
+    read back decompressed.
+    """
+    dst.write(COMPRESSED_MAGIC + _HEADER.pack(codec.encode(), 0))
+    writer = CODECS[codec][0](dst, level)
+    try:
+        size, digest = copy_stream(src, writer, limit)
+    finally:
+        writer.close()
+    end = dst.tell()
+    dst.seek(len(COMPRESSED_MAGIC))
+    dst.write(_HEADER.pack(codec.encode(), size))
+    dst.seek(end)
+    mark_stored_format(dst.fileno(), codec)
+    return size, digest
+
+
+def open_compressed(fh, codec: str):
+    """Readable, seekable stream of the content decompressed incrementally.
+
+    fh must be the raw file, positioned anywhere; backward seeks restart
+    decompression from the start of the data.
+    """
+    if codec not in CODECS:
+        fh.close()
+        raise ValueError(f"Compression codec {codec!r} is not available")
+    region = _Region(fh, HEADER_SIZE)
+    return io.BufferedReader(
+        _Decompressed(CODECS[codec][1](region), region), STREAM_CHUNK_SIZE
+    )
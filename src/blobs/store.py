@@ -0,0 +1,232 @@
+import bisect
+import hashlib
+import io
+import json
+import re
+from pathlib import Path
+
+from src.blobs.compression import open_compressed, read_header
+from src.cli import (
+    STATE_DIR,
+    STREAM_CHUNK_SIZE,
+    AtomicWriter,
+    PayloadTooLarge,
+    mark_stored_format,
+    stored_format,
+)
+from src.core.config import config
+
+STORAGE_BACKEND = getattr(config.static, "STORAGE_BACKEND", "plain")
+DEDUP_BLOCK_SIZE = getattr(config.static, "DEDUP_BLOCK_SIZE", 4 * 1024 * 1024)
+BLOB_DIR = STATE_DIR / "blobs"
+
+MANIFEST_MAGIC = b"\x00filemgr-manifest\x00\n"
+_BLOCK_HASH = re.compile("[0-9a-f]{64}")
+
+
+def _check_manifest(manifest) -> dict:
+    """manifest, if it is well formed; ValueError otherwise."""
+    try:
+        blocks = manifest["blocks"]
+        valid = sum(n for _, n in blocks) == manifest["size"] and all(
+            isinstance(h, str) and _BLOCK_HASH.fullmatch(h) and type(n) is int and n > 0
+            for h, n in blocks
+        )
+    except (KeyError, TypeError, ValueError):
+        valid = False
+    if not valid:
+        raise ValueError("Invalid blob manifest")
+    return manifest
+
+
+class ManifestReader(io.RawIOBase):
+    """Seekable read-only view of the content described by a manifest."""
+
+    def __init__(self, store: "BlobStore", manifest: dict):
+        self._paths = [store.blob_path(h) for h, _ in manifest["blocks"]]
+        self._starts = []
+        offset = 0
+        for _, n in manifest["blocks"]:
+            self._starts.append(offset)
+            offset += n
+        self._size = manifest["size"]
+        self._pos = 0
+        self._fh = None
+        self._index = -1
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._pos = max(0, offset)
+        return self._pos
+
+    def readinto(self, b):
+        if self._pos >= self._size:
+            return 0
+        i = bisect.bisect_right(self._starts, self._pos) - 1
+        if i != self._index:
+            if self._fh:
+                self._fh.close()
+            self._fh = open(self._paths[i], "rb")
+            self._index = i
+        end = self._starts[i + 1] if i + 1 < len(self._starts) else self._size
+        self._fh.seek(self._pos - self._starts[i])
+        view = memoryview(b)[: min(len(b), end - self._pos)]
+        n = self._fh.readinto(view)
+        if not n:
+            raise OSError(f"Blob {self._paths[i].name} is truncated")
+        self._pos += n
+        return n
+
+    def close(self):
+        if self._fh:
+            self._fh.close()
+            self._fh = None
+        super().close()
+
+
+class BlobStore:
+    """Content-addressed block store under STATE_DIR/blobs.
+
+    File content is cut into DEDUP_BLOCK_SIZE blocks stored once by sha256; the
+    user-visible path holds a manifest listing the blocks, and is marked as
+    one with ``mark_stored_format``. Reference counts live in the ``blobs``
+    table (see BlobAccessor).
+    """
+
+    def __init__(self, root: Path = BLOB_DIR, block_size: int = DEDUP_BLOCK_SIZE):
+        self.root = root
+        self.block_size = block_size
+
+    def blob_path(self, h: str) -> Path:
+        if not isinstance(h, str) or not _BLOCK_HASH.fullmatch(h):
+            raise ValueError(f"Invalid block hash: {h!r}")
+        return self.root / h[:2] / h[2:4] / h
+
+    def write_blocks(self, src, limit: int, created: list | None = None) -> dict:
+        """Store src block by block, skipping blocks already present.
+
+        Returns the manifest; raises PayloadTooLarge once more than ``limit`` bytes
+        have been read. The hashes of the blobs written are appended to
+        created; if storing fails, they are removed again instead.
+        """
+        created = [] if created is None else created
+        digest = hashlib.sha256()
+        blocks = []
+        total = 0
+        try:
+            while block := src.read(self.block_size):
+                total += len(block)
+                if total > limit:
+                    raise PayloadTooLarge()
+                digest.update(block)
+                h = hashlib.sha256(block).hexdigest()
+                path = self.blob_path(h)
+                if not path.exists():
+                    with AtomicWriter(path, "wb", size=len(block)) as f:
+                        f.write(block)
+                    created.append(h)
+                blocks.append([h, len(block)])
+        except BaseException:
+            self.remove_blobs(created)
+            raise
+        return {"size": total, "sha256": digest.hexdigest(), "blocks": blocks}
+
+    def remove_blobs(self, hashes):
+        for h in hashes:
+            self.blob_path(h).unlink(missing_ok=True)
+
+    @staticmethod
+    def dump_manifest(manifest: dict) -> bytes:
+        return MANIFEST_MAGIC + json.dumps(manifest).encode()
+
+    def write_manifest(self, f, manifest: dict):
+        """Write manifest to the open file f and mark f as holding one."""
+        f.write(self.dump_manifest(manifest))
+        mark_stored_format(f.fileno(), "manifest")
+
+    @staticmethod
+    def load_manifest(p: Path) -> dict | None:
+        """The manifest p holds, or None if p is not marked as a manifest."""
+        if stored_format(p) != "manifest":
+            return None
+        try:
+            with open(p, "rb") as f:
+                if f.read(len(MANIFEST_MAGIC)) != MANIFEST_MAGIC:
+                    raise ValueError("Invalid blob manifest")
+                return _check_manifest(json.loads(f.read()))
+        except (FileNotFoundError, IsADirectoryError):
+            return None
+
+    @staticmethod
+    def _check_header(f, codec: str) -> tuple[str, int]:
+        header = read_header(f)
+        if header is None or header[0] != codec:
+            raise ValueError("Invalid compressed file")
+        return header
+
+    def compressed_header(self, p: Path) -> tuple[str, int] | None:
+        """(codec, logical size) if p is marked as compressed."""
+        codec = stored_format(p)
+        if codec is None or codec == "manifest":
+            return None
+        try:
+            with open(p, "rb") as f:
+                return self._check_header(f, codec)
+        except (FileNotFoundError, IsADirectoryError):
+            return None
+
+    def is_plain(self, p: Path) -> bool:
+        """True if p holds its content as is (no manifest, no compression)."""
+        return self.load_manifest(p) is None and self.compressed_header(p) is None
+
+    def manifest_blocks(self, p: Path) -> list:
+        manifest = self.load_manifest(p)
+        return manifest["blocks"] if manifest else []
+
+    def stored_size(self, p: Path) -> int:
+        """Logical size of p, whether it is a manifest, compressed or plain."""
+        manifest = self.load_manifest(p)
+        if manifest:
+            return manifest["size"]
+        header = self.compressed_header(p)
+        return header[1] if header else p.stat().st_size
+
+    @staticmethod
+    def physical_size(p: Path) -> int:
+        """Bytes p itself takes under BASE_DIR (shared blobs not included)."""
+        return p.stat().st_size
+
+    def open(self, p: Path):
+        """Open p for reading its logical content."""
+        manifest = self.load_manifest(p)
+        if manifest is not None:
+            return io.BufferedReader(ManifestReader(self, manifest), STREAM_CHUNK_SIZE)
+        f = open(p, "rb")
+        codec = stored_format(f.fileno())
+        if codec is None or codec == "manifest":
+            return f
+        try:
+            self._check_header(f, codec)
+        except BaseException:
+            f.close()
+            raise
+        return open_compressed(f, codec)
+
+    def read_bytes(self, p: Path) -> bytes:
+        with self.open(p) as f:
+            return f.read()
+
+
+blobStore = BlobStore()
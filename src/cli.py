@@ -1,19 +1,41 @@
 import asyncio
+import errno
+import hashlib
+import heapq
+import io
+import itertools
 import json
+import mmap
 import os
+import pickle
+import secrets
 import shutil
+import struct
 import tempfile
+import threading
+import weakref
 import zipfile
+import zlib
+from contextlib import AsyncExitStack, asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 
 from defusedxml.ElementTree import fromstring as safe_xml_fromstring
+from defusedxml.ElementTree import iterparse as safe_xml_iterparse
+from xml.etree.ElementTree import Element, tostring as xml_tostring
+from xml.sax.saxutils import escape as xml_escape
 
 import fcntl
 
 from src.core.config import config
+from src.files.jsonstream import iter_events, select_pointer
 
 BASE_DIR = Path(getattr(config.static, "BASE_DIR", Path.cwd() / "storage")).resolve()
 os.makedirs(BASE_DIR, exist_ok=True)
+STATE_DIR = Path(
+    getattr(config.static, "STATE_DIR", BASE_DIR.parent / ".filemgr")
+).resolve()
 
 MAX_UPLOAD_SIZE = getattr(config.static, "MAX_UPLOAD_SIZE", 20 * 1024 * 1024)
 MAX_FILENAME_LENGTH = getattr(config.static, "FILE_NAME_MAX_LENGTH", 255)
@@ -22,8 +44,40 @@ ZIP_MAX_TOTAL_EXTRACTED_SIZE = getattr(
 )
 ZIP_MAX_RATIO = getattr(config.static, "ZIP_MAX_RATIO", 100)
 ZIP_MAX_FILES = getattr(config.static, "ZIP_MAX_FILES", 1000)
+ZIP_WORKERS = getattr(config.static, "ZIP_WORKERS", os.cpu_count() or 1)
+ZIP_STORED_SUFFIXES = getattr(
+    config.static,
+    "ZIP_STORED_SUFFIXES",
+    frozenset(
+        ".zip .gz .tgz .bz2 .xz .zst .7z .rar "
+        ".jpg .jpeg .png .gif .webp .mp3 .mp4 .mkv .mov .webm".split()
+    ),
+)
+WALK_WORKERS = getattr(
+    config.static, "WALK_WORKERS", min(32, 4 * (os.cpu_count() or 1))
+)
+SORT_CHUNK_ITEMS = getattr(config.static, "SORT_CHUNK_ITEMS", 100_000)
+MAX_STREAM_UPLOAD_SIZE = getattr(
+    config.static, "MAX_STREAM_UPLOAD_SIZE", 64 * 1024 * 1024 * 1024
+)
+STREAM_CHUNK_SIZE = getattr(config.static, "STREAM_CHUNK_SIZE", 1024 * 1024)
+FICLONE = getattr(fcntl, "FICLONE", 0x40049409)
+DURABILITY_LEVELS = ("none", "data", "full")
+DURABILITY = getattr(config.static, "DURABILITY", "none")
+
+LOCK_PATH = STATE_DIR / "locks"
+STORED_FORMAT_XATTR = "user.filemgr.format"
+
 
-_LOCKS = {}
+def _read_umask() -> int:
+    mask = os.umask(0o022)
+    os.umask(mask)
+    return mask
+
+
+UMASK = _read_umask()
+LOCK_SLOTS = getattr(config.static, "LOCK_SLOTS", 1 << 20)
+LOCK_TIMEOUT = getattr(config.static, "LOCK_TIMEOUT", None)
 
 
 def ensure_valid_filename(name: str) -> str:
@@ -49,56 +103,887 @@ def safe_load_xml(data: str):
     return safe_xml_fromstring(data)
 
 
+def safe_iter_json(fh, pointer: str = ""):
+    """Stream JSON events from fh, narrowed to the subtree at ``pointer``."""
+    events = iter_events(fh)
+    if pointer:
+        return select_pointer(events, pointer)
+    return events
+
+
+def _xml_local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _xml_path_matches(steps, absolute: bool, stack) -> bool:
+    if len(stack) < len(steps) or (absolute and len(stack) != len(steps)):
+        return False
+    for step, el in zip(reversed(steps), reversed(stack)):
+        if step != "*" and step not in (el.tag, _xml_local_name(el.tag)):
+            return False
+    return True
+
+
+def safe_iter_xml(fh, path: str):
+    """Yield every element matching a simple XPath as soon as it is complete.
+
+    Supported paths are ``/a/b`` (from the root) and ``//b`` or ``a/b``
+    (anywhere in the tree); ``*`` matches any tag. Elements outside a match
+    are dropped once parsed, so memory is bounded by the largest match.
+    """
+    absolute = path.startswith("/") and not path.startswith("//")
+    steps = [s for s in path.strip("/").split("/") if s]
+    if not steps:
+        raise LookupError(f"Invalid path: {path}")
+    stack = []
+    capturing = 0
+    for event, el in safe_xml_iterparse(fh, events=("start", "end")):
+        if event == "start":
+            stack.append(el)
+            if not capturing and _xml_path_matches(steps, absolute, stack):
+                capturing = len(stack)
+            continue
+        depth = len(stack)
+        stack.pop()
+        if capturing == depth:
+            capturing = 0
+            yield el
+        if not capturing and stack:
+            stack[-1].remove(el)
+
+
+def dump_xml(fh, out):
+    """Serialize an XML document from fh as it is parsed.
+
+    Every element is written as soon as its end tag is seen and then dropped
+    from the tree, at any depth, so memory is bounded by the nesting depth
+    and the longest text rather than by the size of the document.
+    """
+    # Per open element: [element, its closing tag once the opening tag is
+    # written, the last finished child, whose tail is still to be written].
+    stack = []
+    for event, el in safe_xml_iterparse(fh, events=("start", "end")):
+        if event == "start":
+            if stack:
+                parent = stack[-1]
+                if parent[1] is None:
+                    opening, parent[1] = _xml_split_tags(parent[0])
+                    out.write(opening + xml_escape(parent[0].text or ""))
+                else:
+                    out.write(xml_escape(parent[2].tail or ""))
+            stack.append([el, None, None])
+            continue
+        _, closing, last = stack.pop()
+        if closing is None:
+            # No children. Its tail may be partly parsed already; it is
+            # written with the next sibling or the parent's closing tag.
+            tail, el.tail = el.tail, None
+            out.write(xml_tostring(el, encoding="unicode"))
+            el.tail = tail
+        else:
+            out.write(xml_escape(last.tail or "") + closing)
+        if stack:
+            stack[-1][0].remove(el)
+            stack[-1][2] = el
+
+
+def _xml_split_tags(el):
+    shell = Element(el.tag, el.attrib)
+    text = xml_tostring(shell, encoding="unicode", short_empty_elements=False)
+    i = text.rindex("</")
+    return text[:i], text[i:]
+
+
+class _DirSyncs:
+    def __init__(self):
+        self.dirs = set()
+        self.lock = threading.Lock()
+
+    def add(self, path: Path):
+        with self.lock:
+            self.dirs.add(path)
+
+    def flush(self):
+        with self.lock:
+            dirs, self.dirs = self.dirs, set()
+        for path in dirs:
+            fsync_dir(path)
+
+
+_TMPFILE_LINKABLE = {}
+
+
+def _tmpfile_linkable(directory: Path) -> bool:
+    """Whether an O_TMPFILE in directory can be linked in (cached per device).
+
+    Needs O_TMPFILE support in the filesystem and a usable /proc/self/fd,
+    which some containers and sandboxes don't provide.
+    """
+    if not hasattr(os, "O_TMPFILE"):
+        return False
+    dev = os.stat(directory).st_dev
+    if dev not in _TMPFILE_LINKABLE:
+        probe = directory / f".filemgr-probe.{secrets.token_hex(6)}"
+        try:
+            fd = os.open(directory, os.O_TMPFILE | os.O_RDWR, 0o600)
+            try:
+                os.link(f"/proc/self/fd/{fd}", probe, follow_symlinks=True)
+                probe.unlink()
+                _TMPFILE_LINKABLE[dev] = True
+            finally:
+                os.close(fd)
+        except OSError:
+            _TMPFILE_LINKABLE[dev] = False
+    return _TMPFILE_LINKABLE[dev]
+
+
+_dir_syncs: ContextVar[_DirSyncs | None] = ContextVar("dir_syncs", default=None)
+
+
+def fsync_dir(path: Path):
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def batched_dir_sync():
+    """Defer the directory fsyncs of "full" AtomicWriters until the block exits.
+
+    Each directory is then synced once, however many files were renamed into
+    it; everything written inside is durable once the block exits. Nested
+    blocks join the outermost one. Worker threads only take part if they run
+    in a copy of this context.
+    """
+    if _dir_syncs.get() is not None:
+        yield
+        return
+    pending = _DirSyncs()
+    token = _dir_syncs.set(pending)
+    try:
+        yield
+    finally:
+        _dir_syncs.reset(token)
+        pending.flush()
+
+
 class AtomicWriter:
-    def __init__(self, target: Path, mode="wb"):
+    """Write target through a temporary file that replaces it on success.
+
+    The temporary file is an unnamed O_TMPFILE inode where the filesystem
+    supports it (linked in under a temporary name only at commit time), and a
+    mkstemp file otherwise. A known size is preallocated with posix_fallocate.
+
+    durability is "none" (rename only), "data" (fdatasync before the rename)
+    or "full" (also fsync the parent directory after it, see
+    ``batched_dir_sync``).
+    """
+
+    def __init__(self, target: Path, mode="wb", size=None, durability=None):
         self.target = target
         self.mode = mode
+        self.size = size
+        self.durability = durability or DURABILITY
+        if self.durability not in DURABILITY_LEVELS:
+            raise ValueError(f"Unknown durability: {self.durability}")
         self.temp_path = None
         self._fh = None
+        self._preallocated = False
 
     def __enter__(self):
         parent = self.target.parent
         parent.mkdir(parents=True, exist_ok=True)
-        fd, tmp = tempfile.mkstemp(dir=str(parent))
-        os.close(fd)
-        self.temp_path = Path(tmp)
-        self._fh = open(self.temp_path, self.mode)
-        fcntl.flock(self._fh.fileno(), fcntl.LOCK_EX)
+        fd = None
+        if _tmpfile_linkable(parent):
+            try:
+                fd = os.open(parent, os.O_TMPFILE | os.O_RDWR, 0o600)
+            except OSError:
+                pass
+        if fd is None:
+            fd, tmp = tempfile.mkstemp(dir=str(parent))
+            self.temp_path = Path(tmp)
+        if self.size:
+            try:
+                os.posix_fallocate(fd, 0, self.size)
+                self._preallocated = True
+            except OSError:
+                pass
+        self._fh = os.fdopen(fd, self.mode)
         return self._fh
 
     def __exit__(self, exc_type, *_):
-        if self._fh:
-            fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+        try:
+            if exc_type:
+                return
+            self._fh.flush()
+            fd = self._fh.fileno()
+            if self._preallocated:
+                os.ftruncate(fd, self._fh.tell())
+            if self.durability != "none":
+                os.fdatasync(fd)
+            if self.temp_path is None:
+                self.temp_path = self._link_tmpfile(fd)
+            os.replace(self.temp_path, self.target)
+            self.temp_path = None
+        finally:
             self._fh.close()
-        if exc_type:
-            try:
+            if self.temp_path is not None:
                 self.temp_path.unlink(missing_ok=True)
-            except Exception:
-                pass
-        else:
-            os.replace(str(self.temp_path), str(self.target))
+        if self.durability == "full":
+            pending = _dir_syncs.get()
+            if pending is None:
+                fsync_dir(self.target.parent)
+            else:
+                pending.add(self.target.parent)
+
+    def _link_tmpfile(self, fd: int) -> Path:
+        # linkat() refuses to replace an existing name, so link under a fresh
+        # temporary name and rename that over the target.
+        while True:
+            tmp = self.target.parent / f".{self.target.name}.{secrets.token_hex(6)}"
+            try:
+                os.link(f"/proc/self/fd/{fd}", tmp, follow_symlinks=True)
+                return tmp
+            except FileExistsError:
+                continue
+            except OSError:
+                break
+        # The probe said linking works, but it didn't: copy the data out this
+        # once and use mkstemp on this filesystem from now on.
+        _TMPFILE_LINKABLE[os.fstat(fd).st_dev] = False
+        out, tmp = tempfile.mkstemp(dir=str(self.target.parent))
+        try:
+            clone_file(fd, out)
+            copy_stored_format(fd, out)
+            if self.durability != "none":
+                os.fdatasync(out)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        finally:
+            os.close(out)
+        return Path(tmp)
+
+
+class PayloadTooLarge(ValueError):
+    """More data was read than the limit a store was given."""
+
+    def __init__(self, message="Data too large"):
+        super().__init__(message)
+
+
+def copy_stream(src, dst, limit: int, chunk_size: int = STREAM_CHUNK_SIZE):
+    """Copy src into dst in fixed-size chunks, returning (size, sha256 hexdigest).
+
+    Raises PayloadTooLarge as soon as more than ``limit`` bytes have been read, so an
+    oversized payload is never fully consumed.
+    """
+    digest = hashlib.sha256()
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    total = 0
+    while True:
+        n = src.readinto(buf)
+        if not n:
+            break
+        total += n
+        if total > limit:
+            raise PayloadTooLarge()
+        digest.update(view[:n])
+        dst.write(view[:n])
+    return total, digest.hexdigest()
+
+
+def _data_extents(fd: int, size: int):
+    """Yield (start, end) of the non-hole ranges of fd."""
+    pos = 0
+    while pos < size:
+        try:
+            start = os.lseek(fd, pos, os.SEEK_DATA)
+        except OSError as e:
+            if e.errno == errno.ENXIO:
+                return
+            if e.errno == errno.EINVAL:
+                yield pos, size
+                return
+            raise
+        end = min(os.lseek(fd, start, os.SEEK_HOLE), size)
+        yield start, end
+        pos = end
+
+
+def clone_file(src_fd: int, dst_fd: int) -> str:
+    """Copy src_fd into the empty dst_fd without passing data through Python.
+
+    Tries a FICLONE reflink first, then copy_file_range over the data extents
+    found with SEEK_DATA/SEEK_HOLE (so holes stay holes), then sendfile.
+    Returns the method that was used.
+    """
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        return "reflink"
+    except OSError:
+        pass
+    size = os.fstat(src_fd).st_size
+    method = "copy_file_range"
+    for start, end in _data_extents(src_fd, size):
+        pos = start
+        while pos < end:
+            if method == "copy_file_range":
+                try:
+                    n = os.copy_file_range(src_fd, dst_fd, end - pos, pos, pos)
+                except OSError as e:
+                    if e.errno not in (
+                        errno.EXDEV,
+                        errno.ENOSYS,
+                        errno.EINVAL,
+                        errno.EOPNOTSUPP,
+                    ):
+                        raise
+                    method = "sendfile"
+                    continue
+            else:
+                os.lseek(dst_fd, pos, os.SEEK_SET)
+                n = os.sendfile(dst_fd, src_fd, pos, end - pos)
+            if not n:
+                raise OSError(f"Source shrank while copying (at byte {pos})")
+            pos += n
+    os.ftruncate(dst_fd, size)
+    return method
+
+
+def stored_format(target) -> str | None:
+    """How target (a path or a file descriptor) stores its content.
+
+    "manifest" for a blob manifest, a codec name for compressed content, None
+    for plain bytes. Kept in an extended attribute, outside the content, so
+    that no uploaded data can pass for either.
+    """
+    try:
+        return os.getxattr(target, STORED_FORMAT_XATTR).decode()
+    except OSError as e:
+        if e.errno in (errno.ENODATA, errno.ENOTSUP, errno.ENOENT):
+            return None
+        raise
+
+
+def mark_stored_format(fd: int, fmt: str):
+    try:
+        os.setxattr(fd, STORED_FORMAT_XATTR, fmt.encode())
+    except OSError as e:
+        if e.errno == errno.ENOTSUP:
+            raise ValueError(
+                "Deduplicated and compressed storage need extended attributes, "
+                "which this filesystem does not support"
+            ) from e
+        raise
+
 
+def copy_stored_format(src_fd: int, dst_fd: int):
+    fmt = stored_format(src_fd)
+    if fmt is not None:
+        mark_stored_format(dst_fd, fmt)
 
-def acquire_lock_for_path(p: Path):
-    if str(p) not in _LOCKS:
-        _LOCKS[str(p)] = asyncio.Lock()
-    return _LOCKS[str(p)]
+
+def send_file_range(fh, out, offset: int, length: int):
+    """Write ``length`` bytes of fh starting at ``offset`` to the binary stream out.
+
+    Uses sendfile(2) so the data never enters user space; when the kernel refuses
+    (e.g. out is opened with O_APPEND) falls back to writing mmap slices.
+    """
+    sent = 0
+    try:
+        fh.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+        fh.seek(offset)
+        while sent < length:
+            chunk = fh.read(min(STREAM_CHUNK_SIZE, length - sent))
+            if not chunk:
+                break
+            out.write(chunk)
+            sent += len(chunk)
+        out.flush()
+        return sent
+    try:
+        out_fd = out.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+        out_fd = None
+    if out_fd is not None:
+        out.flush()
+        try:
+            while sent < length:
+                n = os.sendfile(out_fd, fh.fileno(), offset + sent, length - sent)
+                if n == 0:
+                    break
+                sent += n
+            return sent
+        except OSError as e:
+            if sent or e.errno not in (errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP):
+                raise
+    if length == 0:
+        return 0
+    with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        end = min(offset + length, len(mm))
+        for pos in range(offset, end, STREAM_CHUNK_SIZE):
+            out.write(mm[pos : min(pos + STREAM_CHUNK_SIZE, end)])
+            sent += min(STREAM_CHUNK_SIZE, end - pos)
+    out.flush()
+    return sent
+
+
+def entry_info(entry: os.DirEntry):
+    """Return (is_dir, size) for a scandir entry using its cached stat data."""
+    try:
+        st = entry.stat()
+    except OSError:
+        st = entry.stat(follow_symlinks=False)
+    return entry.is_dir(), st.st_size
+
+
+def _scan_dir(path):
+    with os.scandir(path) as it:
+        return list(it)
+
+
+def walk_entries(root: Path, workers: int = WALK_WORKERS):
+    """Yield (relative path, DirEntry) for everything below root.
+
+    Directories are scanned concurrently and each one's entries are yielded as
+    soon as its scan finishes, so callers can start output before the walk is
+    done. Unreadable directories are skipped and symlinks are not followed.
+    """
+    pool = ThreadPoolExecutor(max_workers=workers)
+    pending = {pool.submit(_scan_dir, root): ""}
+    try:
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                prefix = pending.pop(future)
+                try:
+                    entries = future.result()
+                except OSError:
+                    continue
+                for entry in entries:
+                    rel = prefix + entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        pending[pool.submit(_scan_dir, entry.path)] = rel + "/"
+                    yield rel, entry
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _spill(run):
+    f = tempfile.TemporaryFile()
+    for item in run:
+        pickle.dump(item, f, pickle.HIGHEST_PROTOCOL)
+    f.seek(0)
+    return f
+
+
+def _unspill(f):
+    while True:
+        try:
+            yield pickle.load(f)
+        except EOFError:
+            return
+
+
+def external_sorted(items, chunk_items: int = SORT_CHUNK_ITEMS):
+    """Yield items in sorted order, holding at most chunk_items in memory.
+
+    Items are sorted in chunks; when there is more than one, each sorted run
+    is pickled to a temporary file and the runs are merged with heapq.merge.
+    """
+    items = iter(items)
+    runs = []
+    try:
+        while True:
+            chunk = sorted(itertools.islice(items, chunk_items))
+            if len(chunk) < chunk_items and not runs:
+                yield from chunk
+                return
+            if chunk:
+                runs.append(_spill(chunk))
+            if len(chunk) < chunk_items:
+                break
+            del chunk
+        yield from heapq.merge(*(_unspill(f) for f in runs))
+    finally:
+        for f in runs:
+            f.close()
+
+
+class _SlotState:
+    """In-process holders of one lock slot."""
+
+    def __init__(self):
+        self.readers = 0
+        self.writer = False
+        self.writers_waiting = 0
+        self.changed = asyncio.Condition()
+
+
+class LockManager:
+    """Shared/exclusive path locks that also hold across processes.
+
+    Each path hashes to one byte of a single lock file in STATE_DIR, locked
+    with fcntl (F_RDLCK for shared, F_WRLCK for exclusive). POSIX record locks
+    belong to the whole process, so tasks of the same process are coordinated
+    by a per-slot reader/writer state first: the first holder of a slot takes
+    the fcntl lock and the last one releases it. Slot states are kept in a
+    WeakValueDictionary and go away once nobody holds or waits for them.
+    """
+
+    def __init__(self, path: Path = LOCK_PATH, slots: int = LOCK_SLOTS):
+        self.path = path
+        self.slots = slots
+        self._fd = None
+        self._states = weakref.WeakValueDictionary()
+
+    def _lock_fd(self) -> int:
+        if self._fd is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        return self._fd
+
+    def slot(self, p: Path) -> int:
+        # Stable across processes, unlike hash().
+        digest = hashlib.blake2b(str(p).encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big") % self.slots
+
+    @asynccontextmanager
+    async def lock_many(self, requests, timeout=LOCK_TIMEOUT):
+        """Lock several (path, shared) pairs in slot order.
+
+        A fixed order means two commands locking the same paths can't
+        deadlock. Paths sharing a slot are locked once, exclusively if any of
+        them asks for it.
+        """
+        slots = {}
+        for p, shared in requests:
+            slot = self.slot(p)
+            if slot in slots:
+                shared = shared and slots[slot][1]
+            slots[slot] = (p, shared)
+        async with AsyncExitStack() as stack:
+            for slot in sorted(slots):
+                p, shared = slots[slot]
+                await stack.enter_async_context(self.lock(p, shared, timeout))
+            yield
+
+    @asynccontextmanager
+    async def lock(self, p: Path, shared: bool = False, timeout=LOCK_TIMEOUT):
+        slot = self.slot(p)
+        state = self._states.get(slot)
+        if state is None:
+            state = self._states[slot] = _SlotState()
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        try:
+            async with asyncio.timeout_at(deadline):
+                await self._acquire(state, slot, shared)
+        except TimeoutError:
+            raise TimeoutError(f"Timed out waiting for lock on {p.name}") from None
+        try:
+            yield
+        finally:
+            await self._release(state, slot, shared)
+
+    async def _acquire(self, state: _SlotState, slot: int, shared: bool):
+        async with state.changed:
+            if shared:
+                await state.changed.wait_for(
+                    lambda: not state.writer and not state.writers_waiting
+                )
+                if not state.readers:
+                    await self._lockf(slot, fcntl.LOCK_SH)
+                state.readers += 1
+                return
+            state.writers_waiting += 1
+            try:
+                await state.changed.wait_for(
+                    lambda: not state.writer and not state.readers
+                )
+                await self._lockf(slot, fcntl.LOCK_EX)
+                state.writer = True
+            finally:
+                state.writers_waiting -= 1
+                state.changed.notify_all()
+
+    async def _lockf(self, slot: int, mode: int):
+        fd = self._lock_fd()
+        delay = 0.001
+        while True:
+            try:
+                fcntl.lockf(fd, mode | fcntl.LOCK_NB, 1, slot)
+                return
+            except OSError as e:
+                if e.errno not in (errno.EAGAIN, errno.EACCES):
+                    raise
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.05)
+
+    async def _release(self, state: _SlotState, slot: int, shared: bool):
+        async with state.changed:
+            if shared:
+                state.readers -= 1
+            else:
+                state.writer = False
+            if not state.readers and not state.writer:
+                fcntl.lockf(self._lock_fd(), fcntl.LOCK_UN, 1, slot)
+            state.changed.notify_all()
+
+
+lockManager = LockManager()
+
+
+def acquire_lock_for_path(p: Path, shared: bool = False, timeout=LOCK_TIMEOUT):
+    """Lock p for reading (shared) or writing (exclusive, the default)."""
+    return lockManager.lock(p, shared=shared, timeout=timeout)
+
+
+def acquire_locks_for_paths(requests, timeout=LOCK_TIMEOUT):
+    """Lock several (path, shared) pairs at once without risking deadlock."""
+    return lockManager.lock_many(requests, timeout=timeout)
+
+
+class ZipBudget:
+    """Running member count and sizes checked against the ZIP_MAX_* limits."""
+
+    def __init__(self):
+        self.files = 0
+        self.uncompressed = 0
+        self.compressed = 0
+
+    def add(self, name: str, file_size: int, compress_size: int):
+        self.files += 1
+        self.uncompressed += file_size
+        self.compressed += compress_size
+        if compress_size and file_size / max(1, compress_size) > ZIP_MAX_RATIO:
+            raise ValueError(f"Suspicious compression ratio: {name}")
+        if self.files > ZIP_MAX_FILES:
+            raise ValueError("Too many files in zip")
+        if self.uncompressed > ZIP_MAX_TOTAL_EXTRACTED_SIZE:
+            raise ValueError("Total extracted size too large")
 
 
 def inspect_zip_safety(zf: zipfile.ZipFile):
-    total_uncompressed = 0
-    total_compressed = 0
-    nfiles = 0
+    budget = ZipBudget()
     for info in zf.infolist():
-        nfiles += 1
-        total_uncompressed += info.file_size
-        total_compressed += info.compress_size or 0
-        if (
-            info.compress_size
-            and info.file_size / max(1, info.compress_size) > ZIP_MAX_RATIO
-        ):
-            raise ValueError(f"Suspicious compression ratio: {info.filename}")
-    if nfiles > ZIP_MAX_FILES:
-        raise ValueError("Too many files in zip")
-    if total_uncompressed > ZIP_MAX_TOTAL_EXTRACTED_SIZE:
-        raise ValueError("Total extracted size too large")
+        budget.add(info.filename, info.file_size, info.compress_size or 0)
+    return budget
+
+
+class ExtractBudget:
+    """Thread-safe tally of the bytes actually decompressed by an extraction."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total = 0
+        self.cancelled = threading.Event()
+
+    def consume(self, n: int):
+        with self._lock:
+            self.total += n
+            if self.total > ZIP_MAX_TOTAL_EXTRACTED_SIZE:
+                raise ValueError("Total extracted size too large")
+
+
+def extract_zip_member(
+    zf: zipfile.ZipFile, info: zipfile.ZipInfo, target: Path, budget: ExtractBudget
+):
+    """Stream one member to target through an AtomicWriter.
+
+    Limits are enforced on the decompressed bytes, not on the sizes the
+    archive claims in its headers. The file gets the permission bits the
+    archive records for it (0666 when it has none), less the umask.
+    """
+    if info.is_dir():
+        target.mkdir(parents=True, exist_ok=True)
+        return 0
+    limit = max(1, info.compress_size) * ZIP_MAX_RATIO
+    written = 0
+    with (
+        zf.open(info) as src,
+        AtomicWriter(target, "wb", size=info.file_size) as dst,
+    ):
+        while chunk := src.read(STREAM_CHUNK_SIZE):
+            if budget.cancelled.is_set():
+                raise ValueError("Extraction cancelled")
+            written += len(chunk)
+            if written > limit:
+                raise ValueError(f"Suspicious compression ratio: {info.filename}")
+            budget.consume(len(chunk))
+            dst.write(chunk)
+        mode = info.external_attr >> 16 & 0o777 if info.create_system == 3 else 0
+        os.fchmod(dst.fileno(), (mode or 0o666) & ~UMASK)
+    return written
+
+
+def deflate_zip_member(path: Path, arcname: str, read_bytes=Path.read_bytes):
+    """Read and compress one archive member; safe to run in a worker thread.
+
+    Files whose suffix is in ZIP_STORED_SUFFIXES, or that do not shrink, are
+    stored as-is.
+    """
+    data = read_bytes(path)
+    zinfo = zipfile.ZipInfo.from_file(path, arcname)
+    zinfo.file_size = len(data)
+    zinfo.CRC = zlib.crc32(data)
+    zinfo.compress_type = zipfile.ZIP_STORED
+    payload = data
+    if path.suffix.lower() not in ZIP_STORED_SUFFIXES:
+        c = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        deflated = c.compress(data) + c.flush()
+        if len(deflated) < len(data):
+            zinfo.compress_type = zipfile.ZIP_DEFLATED
+            payload = deflated
+    zinfo.compress_size = len(payload)
+    return zinfo, payload
+
+
+_ZIP_LOCAL = struct.Struct("<4s5H3L2H")
+_ZIP_CENTRAL = struct.Struct("<4s6H3L5H2L")
+_ZIP_END = struct.Struct("<4s4H2LH")
+_ZIP64_END = struct.Struct("<4sQ2H2L4Q")
+_ZIP64_LOCATOR = struct.Struct("<4sLQL")
+_ZIP_UTF8 = 0x800
+
+
+def _zip32(v: int) -> int:
+    """A size or offset for a 32-bit header field; 0xFFFFFFFF if it is in
+    the zip64 extra field instead."""
+    return 0xFFFFFFFF if v >= zipfile.ZIP64_LIMIT else v
+
+
+def _dos_time(date_time) -> tuple[int, int]:
+    y, mo, d, h, mi, s = date_time
+    return h << 11 | mi << 5 | s // 2, max(0, y - 1980) << 9 | mo << 5 | d
+
+
+class ZipArchiveWriter:
+    """Write a zip archive from members that are already compressed.
+
+    zipfile only writes members it compresses itself, so the layout (local
+    headers, central directory and, past the 32-bit limits, the zip64
+    records) is produced here from the public ZipInfo fields, as described
+    in PKWARE's APPNOTE. Use as a context manager; the central directory is
+    written when the block exits without an exception.
+    """
+
+    def __init__(self, fh):
+        self.fh = fh
+        # Offsets are from the start of fh, whatever precedes the archive.
+        self.offset = fh.tell()
+        self.members = []
+        self.names = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *_):
+        if exc_type is None:
+            self.close()
+
+    @staticmethod
+    def _name(zinfo) -> tuple[bytes, int]:
+        try:
+            return zinfo.filename.encode("ascii"), 0
+        except UnicodeEncodeError:
+            return zinfo.filename.encode(), _ZIP_UTF8
+
+    def add(self, zinfo: zipfile.ZipInfo, payload: bytes):
+        """Append a member produced by deflate_zip_member."""
+        if zinfo.filename in self.names:
+            raise ValueError(f"Duplicate name in zip: {zinfo.filename}")
+        self.names.add(zinfo.filename)
+        name, flags = self._name(zinfo)
+        dostime, dosdate = _dos_time(zinfo.date_time)
+        zip64 = max(zinfo.file_size, zinfo.compress_size) >= zipfile.ZIP64_LIMIT
+        extra = struct.pack("<2H2Q", 1, 16, zinfo.file_size, zinfo.compress_size)
+        self.fh.write(
+            _ZIP_LOCAL.pack(
+                b"PK\x03\x04",
+                45 if zip64 else 20,
+                flags,
+                zinfo.compress_type,
+                dostime,
+                dosdate,
+                zinfo.CRC,
+                0xFFFFFFFF if zip64 else zinfo.compress_size,
+                0xFFFFFFFF if zip64 else zinfo.file_size,
+                len(name),
+                len(extra) if zip64 else 0,
+            )
+        )
+        self.fh.write(name)
+        if zip64:
+            self.fh.write(extra)
+        self.fh.write(payload)
+        self.members.append((zinfo, self.offset))
+        self.offset += (
+            _ZIP_LOCAL.size + len(name) + (len(extra) if zip64 else 0) + len(payload)
+        )
+
+    def close(self):
+        start = self.offset
+        for zinfo, offset in self.members:
+            name, flags = self._name(zinfo)
+            dostime, dosdate = _dos_time(zinfo.date_time)
+            # zip64 extra: the fields that overflow, in this order. Readers
+            # only look there for fields set to 0xFFFFFFFF in the header.
+            big = [
+                v
+                for v in (zinfo.file_size, zinfo.compress_size, offset)
+                if v >= zipfile.ZIP64_LIMIT
+            ]
+            extra = (
+                struct.pack(f"<2H{len(big)}Q", 1, 8 * len(big), *big) if big else b""
+            )
+            self.fh.write(
+                _ZIP_CENTRAL.pack(
+                    b"PK\x01\x02",
+                    (zinfo.create_system << 8) | (45 if big else 20),
+                    45 if big else 20,
+                    flags,
+                    zinfo.compress_type,
+                    dostime,
+                    dosdate,
+                    zinfo.CRC,
+                    _zip32(zinfo.compress_size),
+                    _zip32(zinfo.file_size),
+                    len(name),
+                    len(extra),
+                    0,
+                    0,
+                    0,
+                    zinfo.external_attr,
+                    _zip32(offset),
+                )
+            )
+            self.fh.write(name + extra)
+            self.offset += _ZIP_CENTRAL.size + len(name) + len(extra)
+        count = len(self.members)
+        size = self.offset - start
+        zip64 = count >= 0xFFFF or max(start, size) >= zipfile.ZIP64_LIMIT
+        if zip64:
+            self.fh.write(
+                _ZIP64_END.pack(
+                    b"PK\x06\x06", 44, 45, 45, 0, 0, count, count, size, start
+                )
+            )
+            self.fh.write(_ZIP64_LOCATOR.pack(b"PK\x06\x07", 0, self.offset, 1))
+        self.fh.write(
+            _ZIP_END.pack(
+                b"PK\x05\x06",
+                0,
+                0,
+                0xFFFF if zip64 else count,
+                0xFFFF if zip64 else count,
+                0xFFFFFFFF if zip64 else size,
+                0xFFFFFFFF if zip64 else start,
+                0,
+            )
+        )
@@ -1,14 +1,16 @@
 import json
 from pathlib import Path
-from src.users.accessor import userAccessor
 from src.users.errors import UserNotFoundError, InvalidPasswordError
-from src.users.users import User
 
 # Файл для хранения сессии
 AUTH_FILE = Path.home() / ".cli_file_manager_auth.json"
 
 
 async def authenticate(username: str, password: str) -> int:
+    # Imported here so auth checks and logout don't load the ORM.
+    from src.users.accessor import userAccessor
+    from src.users.users import User
+
     user = await userAccessor.fetch_by_username(username)
     if not user:
         raise UserNotFoundError
@@ -33,3 +35,8 @@ def is_authenticated() -> int | None:
 def remove_authenticated_user():
     if AUTH_FILE.exists():
         AUTH_FILE.unlink()
+
+
+def cmd_logout(args=None):
+    remove_authenticated_user()
+    print("User logged out")
@@ -1,7 +1,33 @@
+import importlib
 from argparse import ArgumentParser
-from src.users.manager import userManager
-from src.files.manager import fileManager
-from src.system import cmd_disk_stats
+from datetime import datetime
+
+
+class LazyHandler:
+    """Command handler given as "module:attr.path", imported on first call.
+
+    Keeps the ORM, passlib and defusedxml out of commands that don't use them.
+    """
+
+    def __init__(self, target: str):
+        self.target = target
+        self._fn = None
+
+    def load(self):
+        if self._fn is None:
+            module, _, path = self.target.partition(":")
+            fn = importlib.import_module(module)
+            for name in path.split("."):
+                fn = getattr(fn, name)
+            self._fn = fn
+        return self._fn
+
+    def __call__(self, args):
+        return self.load()(args)
+
+
+def handler(target: str, needs_db: bool = True) -> dict:
+    return {"func": LazyHandler(target), "needs_db": needs_db}
 
 
 def build_parser():
@@ -10,24 +36,144 @@ def build_parser():
 
     # disk stats
     sp = sub.add_parser("disk-stats", help="Show disk stats")
-    sp.set_defaults(func=cmd_disk_stats)
+    sp.set_defaults(**handler("src.system:cmd_disk_stats", needs_db=False))
 
     # list
     sp = sub.add_parser("list", help="List directory")
     sp.add_argument("path", nargs="?", default=".")
-    sp.set_defaults(func=fileManager.list)
+    sp.add_argument("--recursive", "-r", action="store_true")
+    sp.add_argument(
+        "--unsorted",
+        action="store_true",
+        help="Print entries in directory order as they are read",
+    )
+    sp.add_argument(
+        "--limit",
+        type=int,
+        help="Print at most N entries (sorted mode keeps only N in memory)",
+    )
+    sp.add_argument("--cursor", help="Resume after this name (from 'Next cursor')")
+    sp.add_argument(
+        "--workers", type=int, help="Directory scan threads for --recursive"
+    )
+    sp.add_argument(
+        "--from-index",
+        action="store_true",
+        help="Answer from the metadata index instead of scanning the directory",
+    )
+    sp.set_defaults(**handler("src.files.manager:fileManager.list", needs_db=False))
+
+    # metadata index
+    sp = sub.add_parser("index", help="Maintain and query the metadata index")
+    sp.add_argument("action", choices=["refresh", "stats", "find"])
+    sp.add_argument("name", nargs="?", help="Directory for stats, file name for find")
+    sp.add_argument("--workers", type=int, help="Directory scan threads for refresh")
+    sp.set_defaults(**handler("src.files.manager:fileManager.index", needs_db=False))
+
+    sp = sub.add_parser("du", help="Show directory sizes (cached by mtime)")
+    sp.add_argument("path", nargs="?", default=".")
+    sp.add_argument(
+        "--depth", type=int, default=1, help="Show directories down to this depth"
+    )
+    sp.add_argument("--sort", choices=["name", "size"], default="name")
+    sp.add_argument("--workers", type=int, help="Directory scan threads")
+    sp.set_defaults(**handler("src.usage.manager:usageManager.du", needs_db=False))
+
+    sp = sub.add_parser("usage", help="Show per-user storage totals")
+    sp.add_argument("--user", help="Only this username (admins)")
+    sp.add_argument(
+        "--recount",
+        action="store_true",
+        help="Rebuild the counters from the files table first (admins)",
+    )
+    sp.set_defaults(**handler("src.usage.manager:usageManager.usage"))
+
+    sp = sub.add_parser("quota", help="Show or set per-user storage quotas")
+    sp.add_argument("username", nargs="?", help="User to show or set (admins)")
+    sp.add_argument("--set", help="New quota in bytes, or 'none' to remove it")
+    sp.set_defaults(**handler("src.usage.manager:usageManager.quota"))
+
+    sp = sub.add_parser("search", help="Find files by name and/or content")
+    sp.add_argument("path", nargs="?", default=".")
+    sp.add_argument("--name", help="Glob matched against file names")
+    sp.add_argument(
+        "--name-regex",
+        action="store_true",
+        help="Treat --name as a regular expression",
+    )
+    sp.add_argument("--content", help="Bytes to look for in file contents")
+    sp.add_argument(
+        "--regex", action="store_true", help="Treat --content as a regular expression"
+    )
+    sp.add_argument("--ignore-case", "-i", action="store_true")
+    sp.add_argument(
+        "--zip", action="store_true", help="Also search inside zip archives"
+    )
+    sp.add_argument("--max-results", type=int, help="Stop after N matches")
+    sp.add_argument(
+        "--indexed",
+        action="store_true",
+        help='Answer --content (words, "quoted phrases") from the text index',
+    )
+    sp.add_argument(
+        "--reindex",
+        action="store_true",
+        help="With --indexed, first index files changed outside the CLI",
+    )
+    sp.add_argument("--workers", type=int, help="Scan processes and walk threads")
+    sp.set_defaults(
+        **handler("src.search.manager:searchManager.search", needs_db=False)
+    )
+
+    sp = sub.add_parser("verify", help="Check files against their stored checksums")
+    sp.add_argument("path", nargs="?", default=".")
+    sp.add_argument(
+        "--all",
+        action="store_true",
+        help="Also rehash files unchanged since they last verified",
+    )
+    sp.add_argument(
+        "--bandwidth",
+        type=float,
+        help="Read at most this many MB/s in total (default: VERIFY_BANDWIDTH)",
+    )
+    sp.add_argument(
+        "--record",
+        action="store_true",
+        help="Store the checksums of your files that have none yet",
+    )
+    sp.add_argument("--workers", type=int, help="Hashing processes and walk threads")
+    sp.set_defaults(**handler("src.files.verify:verifyManager.verify"))
 
-    sp = sub.add_parser("logs", help="List directory")
+    sp = sub.add_parser("logs", help="Show the operations log")
     sp.add_argument("path", nargs="?", default=".")
-    sp.set_defaults(func=fileManager.show_logs)
+    sp.add_argument("--user", help="Only operations by this username")
+    sp.add_argument("--type", type=str.upper, choices=["CREATE", "DELETE", "UPDATE"])
+    sp.add_argument(
+        "--since", type=datetime.fromisoformat, help="ISO timestamp, inclusive"
+    )
+    sp.add_argument(
+        "--until", type=datetime.fromisoformat, help="ISO timestamp, exclusive"
+    )
+    sp.add_argument("--file", help="Only operations on this file name")
+    sp.add_argument("--limit", type=int, help="Print at most N operations")
+    sp.add_argument("--cursor", help="Resume after this entry (from 'Next cursor')")
+    sp.set_defaults(**handler("src.files.manager:fileManager.show_logs"))
 
     # read
     sp = sub.add_parser("read", help="Read file")
     sp.add_argument("path")
     sp.add_argument(
-        "--format", choices=["text", "json", "xml", "binary"], default="text"
+        "--format", choices=["text", "json", "xml", "binary", "raw"], default="text"
+    )
+    sp.add_argument("--offset", type=int, default=0, help="Start reading at byte")
+    sp.add_argument("--length", type=int, help="Read at most this many bytes")
+    sp.add_argument(
+        "--path",
+        dest="select",
+        help="Only print this subtree: a JSON pointer (/a/0/b) or XPath (/a/b, //b)",
     )
-    sp.set_defaults(func=fileManager.read)
+    sp.set_defaults(**handler("src.files.manager:fileManager.read", needs_db=False))
 
     # create-file
     sp = sub.add_parser(
@@ -35,7 +181,17 @@ def build_parser():
     )
     sp.add_argument("path", help="Path to new file")
     sp.add_argument("--content", help="Optional text to write into file", default="")
-    sp.set_defaults(func=fileManager.create_file)
+    sp.add_argument(
+        "--dedup",
+        action="store_true",
+        help="Store content in the deduplicating blob store",
+    )
+    sp.add_argument(
+        "--compress",
+        choices=("zlib", "lzma", "zstd", "none"),
+        help="Store compressed with this codec (default: the COMPRESSION policy)",
+    )
+    sp.set_defaults(**handler("src.files.manager:fileManager.create_file"))
 
     # write
     sp = sub.add_parser(
@@ -45,43 +201,114 @@ def build_parser():
     sp.add_argument(
         "--from-file", help="Read contents from local file instead of stdin"
     )
+    sp.add_argument(
+        "--stream",
+        action="store_true",
+        help="Lift the MAX_UPLOAD_SIZE cap up to MAX_STREAM_UPLOAD_SIZE",
+    )
+    sp.add_argument(
+        "--dedup",
+        action="store_true",
+        help="Store content in the deduplicating blob store",
+    )
+    sp.add_argument(
+        "--delta",
+        action="store_true",
+        help="Only write the blocks that differ from the stored file",
+    )
+    sp.add_argument(
+        "--compress",
+        choices=("zlib", "lzma", "zstd", "none"),
+        help="Store compressed with this codec (default: the COMPRESSION policy)",
+    )
     sp.add_argument(
         "--user-id",
         type=int,
         dest="user_id",
         help="User ID to attach to metadata (optional)",
     )
-    sp.set_defaults(func=fileManager.write)
+    sp.set_defaults(**handler("src.files.manager:fileManager.write"))
 
     # delete
     sp = sub.add_parser("delete", help="Delete file")
     sp.add_argument("path")
-    sp.set_defaults(func=fileManager.delete)
+    sp.set_defaults(**handler("src.files.manager:fileManager.delete"))
+
+    # copy / move
+    sp = sub.add_parser("copy", help="Copy a file (reflink or in-kernel copy)")
+    sp.add_argument("src")
+    sp.add_argument("dst")
+    sp.set_defaults(**handler("src.files.manager:fileManager.copy"))
+
+    sp = sub.add_parser("move", help="Move or rename a file")
+    sp.add_argument("src")
+    sp.add_argument("dst")
+    sp.set_defaults(**handler("src.files.manager:fileManager.move"))
+
+    # batch
+    sp = sub.add_parser(
+        "batch", help="Run create/write/delete/read operations from a manifest"
+    )
+    sp.add_argument("manifest", help="NDJSON or CSV manifest, '-' for stdin")
+    sp.add_argument("--format", choices=["ndjson", "csv"])
+    sp.add_argument(
+        "--concurrency", type=int, help="Operations in flight (default: 16)"
+    )
+    sp.set_defaults(**handler("src.files.batch:batchManager.run"))
 
     # zip create
     sp = sub.add_parser("create-zip", help="Create zip from dir")
     sp.add_argument("src")
     sp.add_argument("dst")
-    sp.set_defaults(func=fileManager.create_zip)
+    sp.add_argument(
+        "--workers", type=int, help="Compression threads (default: CPU count)"
+    )
+    sp.set_defaults(
+        **handler("src.files.manager:fileManager.create_zip", needs_db=False)
+    )
 
     # zip extract
     sp = sub.add_parser("extract-zip", help="Extract zip file safely")
     sp.add_argument("zip")
     sp.add_argument("--outdir", default=".")
-    sp.set_defaults(func=fileManager.extract_zip)
+    sp.add_argument(
+        "--workers", type=int, help="Extraction threads (default: CPU count)"
+    )
+    sp.set_defaults(
+        **handler("src.files.manager:fileManager.extract_zip", needs_db=False)
+    )
 
     # auth
     sp = sub.add_parser("login", help="Login")
     sp.add_argument("username")
     sp.add_argument("password")
-    sp.set_defaults(func=userManager.login)
+    sp.set_defaults(**handler("src.users.manager:userManager.login"))
 
     sp = sub.add_parser("logout", help="Logout")
-    sp.set_defaults(func=userManager.logout)
+    sp.set_defaults(**handler("src.core.auth:cmd_logout", needs_db=False))
 
     sp = sub.add_parser("create-user", help="Create user")
     sp.add_argument("username")
     sp.add_argument("password")
-    sp.set_defaults(func=userManager.create_user)
+    sp.set_defaults(**handler("src.users.manager:userManager.create_user"))
+
+    sp = sub.add_parser(
+        "watch", help="Keep file metadata in sync with changes made by other tools"
+    )
+    sp.add_argument(
+        "--scan",
+        action="store_true",
+        help="First pick up changes made while nothing was watching",
+    )
+    sp.set_defaults(**handler("src.files.watch:watchManager.watch"))
+
+    # daemon
+    sp = sub.add_parser(
+        "serve", help="Run a daemon that executes commands sent by the CLI"
+    )
+    sp.add_argument(
+        "--socket", help="Unix socket path (default: STATE_DIR/filemgr.sock)"
+    )
+    sp.set_defaults(**handler("src.daemon:daemon.serve"))
 
     return p
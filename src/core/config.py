@@ -2,7 +2,10 @@ from dataclasses import dataclass
 import os
 from functools import cached_property
 from dotenv import load_dotenv
-from sqlalchemy.engine.url import URL
+import typing
+
+if typing.TYPE_CHECKING:
+    from sqlalchemy.engine.url import URL
 
 load_dotenv()
 
@@ -24,7 +27,10 @@ class DataBaseConfig:
     db = os.getenv("POSTGRES__DB")
 
     @cached_property
-    def url(self) -> URL:
+    def url(self) -> "URL":
+        # Imported here so commands that never open the database skip SQLAlchemy.
+        from sqlalchemy.engine.url import URL
+
         return URL.create(
             drivername="postgresql+asyncpg",
             username=self.user,
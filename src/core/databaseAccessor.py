@@ -1,10 +1,11 @@
 from asyncio import current_task
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, AsyncIterator
 from contextlib import asynccontextmanager
 from contextvars import ContextVar
 from typing import Any, TypeVar, overload
 from src.core.config import config
-from sqlalchemy.engine import CursorResult, Result
+from src.core.models.models import import_models
+from sqlalchemy.engine import CursorResult, Result, Row
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
@@ -30,6 +31,8 @@ class DatabaseAccessor:
         )
 
     async def connect(self):
+        # Command handlers are imported lazily; load all models up front.
+        import_models()
         if self._engine is None:
             self._engine = create_async_engine(
                 url=config.database.url,
@@ -49,6 +52,8 @@ class DatabaseAccessor:
 
         await self._engine.dispose()
         self._engine = None
+        # Bound to the disposed engine; connect() makes a new one.
+        self._session_maker = None
 
     @property
     def session_maker(self) -> async_sessionmaker:
@@ -66,12 +71,14 @@ class DatabaseAccessor:
 
         async with scoped_session() as session:
             token = self._current_session.set(session)
-
-            yield session
-            await session.commit()
-
-            self._current_session.reset(token)
-            await scoped_session.remove()
+            try:
+                yield session
+                await session.commit()
+            finally:
+                # Also on errors and early close, or later statements in this
+                # context would run on the closed session.
+                self._current_session.reset(token)
+                await scoped_session.remove()
 
     def get_current_session(self) -> AsyncSession | None:
         return self._current_session.get()
@@ -106,5 +113,25 @@ class DatabaseAccessor:
         async with self.session() as session:
             return await session.execute(statement)
 
+    async def stream(
+        self,
+        statement: Executable,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[Row[Any]]:
+        """Yield result rows from a server-side cursor, batch_size at a time."""
+        statement = statement.execution_options(yield_per=batch_size)
+        session = self.get_current_session()
+
+        if session:
+            result = await session.stream(statement)
+            async for row in result:
+                yield row
+            return
+
+        async with self.session() as session:
+            result = await session.stream(statement)
+            async for row in result:
+                yield row
+
 
 db = DatabaseAccessor()
@@ -0,0 +1,93 @@
+"""add user_usage.quota_bytes and enforce it in the files_usage trigger
+
+Revision ID: bb1f921e70df
+Revises: ee60f7e7a8fd
+Create Date: 2026-10-18 10:49:10.660376
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "bb1f921e70df"
+down_revision: Union[str, Sequence[str], None] = "ee60f7e7a8fd"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FILES_USAGE_FUNCTION = """
+CREATE OR REPLACE FUNCTION files_usage() RETURNS trigger AS $$
+DECLARE
+    over_quota boolean;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE user_usage SET
+            file_count = file_count - 1,
+            used_bytes = used_bytes - OLD.file_size,
+            physical_bytes = physical_bytes - coalesce(OLD.physical_size, OLD.file_size)
+        WHERE user_id = OLD.user_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO user_usage (user_id, file_count, used_bytes, physical_bytes)
+        VALUES (NEW.user_id, 1, NEW.file_size, coalesce(NEW.physical_size, NEW.file_size))
+        ON CONFLICT (user_id) DO UPDATE SET
+            file_count = user_usage.file_count + 1,
+            used_bytes = user_usage.used_bytes + excluded.used_bytes,
+            physical_bytes = user_usage.physical_bytes + excluded.physical_bytes
+        RETURNING used_bytes > quota_bytes INTO over_quota;
+        -- Only growth is refused, so a user over a lowered quota can still
+        -- shrink or delete files.
+        IF over_quota AND (TG_OP = 'INSERT' OR NEW.file_size > OLD.file_size
+                           OR NEW.user_id <> OLD.user_id) THEN
+            RAISE EXCEPTION 'Quota exceeded for user %', NEW.user_id
+                USING ERRCODE = 'check_violation';
+        END IF;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+PREVIOUS_FILES_USAGE_FUNCTION = """
+CREATE OR REPLACE FUNCTION files_usage() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE user_usage SET
+            file_count = file_count - 1,
+            used_bytes = used_bytes - OLD.file_size,
+            physical_bytes = physical_bytes - coalesce(OLD.physical_size, OLD.file_size)
+        WHERE user_id = OLD.user_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO user_usage (user_id, file_count, used_bytes, physical_bytes)
+        VALUES (NEW.user_id, 1, NEW.file_size, coalesce(NEW.physical_size, NEW.file_size))
+        ON CONFLICT (user_id) DO UPDATE SET
+            file_count = user_usage.file_count + 1,
+            used_bytes = user_usage.used_bytes + excluded.used_bytes,
+            physical_bytes = user_usage.physical_bytes + excluded.physical_bytes;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.add_column(
+        "user_usage", sa.Column("quota_bytes", sa.BigInteger(), nullable=True)
+    )
+    # ### end Alembic commands ###
+    op.execute(FILES_USAGE_FUNCTION)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(PREVIOUS_FILES_USAGE_FUNCTION)
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_column("user_usage", "quota_bytes")
+    # ### end Alembic commands ###
@@ -1,6 +1,16 @@
+import importlib
+
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 from sqlalchemy import BigInteger, MetaData
 
+MODEL_MODULES = (
+    "src.users.users",
+    "src.files.files",
+    "src.operations.operations",
+    "src.blobs.blobs",
+    "src.usage.usage",
+)
+
 
 class BaseModel(DeclarativeBase):
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
@@ -13,3 +23,9 @@ class BaseModel(DeclarativeBase):
             "pk": "pk_%(table_name)s",
         },
     )
+
+
+def import_models():
+    """Register every mapped class so string relationships can be resolved."""
+    for name in MODEL_MODULES:
+        importlib.import_module(name)
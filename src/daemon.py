@@ -0,0 +1,273 @@
+import asyncio
+import contextlib
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+import threading
+from collections import deque
+from contextvars import ContextVar
+from pathlib import Path
+
+from src.cli import STATE_DIR
+from src.core.config import config
+
+DAEMON_SOCKET = Path(
+    getattr(config.static, "DAEMON_SOCKET", STATE_DIR / "filemgr.sock")
+)
+CLIENT_READ_SIZE = 64 * 1024
+# Bytes of output queued per client before commands printing from worker
+# threads wait for the client to catch up.
+DAEMON_OUTPUT_BUFFER = getattr(config.static, "DAEMON_OUTPUT_BUFFER", 1024 * 1024)
+
+# After the handshake the daemon sends frames: (_DATA, length) followed by
+# that much output, and finally (_STATUS, exit status).
+_FRAME = struct.Struct("!BI")
+_DATA = 0
+_STATUS = 1
+
+_output: ContextVar["_Output | None"] = ContextVar("daemon_output", default=None)
+
+
+async def dispatch(args):
+    fn = args.func
+    if asyncio.iscoroutinefunction(fn):
+        await fn(args)
+    else:
+        r = fn(args)
+        if asyncio.iscoroutine(r):
+            await r
+
+
+def runs_locally(args) -> bool:
+    """Commands that read the client's stdin or write raw bytes to its stdout."""
+    if args.cmd in ("serve", "watch"):
+        return True
+    if args.cmd == "write" and not args.from_file:
+        return True
+    if args.cmd == "read" and args.format == "raw":
+        return True
+    return args.cmd == "batch" and args.manifest == "-"
+
+
+def forward_to_daemon(argv, path: Path = DAEMON_SOCKET) -> int | None:
+    """Run a command in a running daemon, copying its output to stdout.
+
+    Returns the command's exit status, or None when there is no daemon (or it
+    declines the command), in which case the caller should run the command
+    itself.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(path))
+    except OSError:
+        sock.close()
+        return None
+    with sock, sock.makefile("rb") as f:
+        request = {"argv": list(argv), "cwd": os.getcwd()}
+        sock.sendall(json.dumps(request).encode() + b"\n")
+        try:
+            accepted = json.loads(f.readline() or b"{}").get("ok") is True
+        except ValueError:
+            accepted = False
+        if not accepted:
+            return None
+        sys.stdout.flush()
+        out = sys.stdout.buffer
+        while len(header := f.read(_FRAME.size)) == _FRAME.size:
+            kind, n = _FRAME.unpack(header)
+            if kind == _STATUS:
+                out.flush()
+                return n
+            while n:
+                chunk = f.read1(min(n, CLIENT_READ_SIZE))
+                if not chunk:
+                    break
+                out.write(chunk)
+                n -= len(chunk)
+        out.flush()
+    print("Lost connection to the daemon", file=sys.stderr)
+    return 1
+
+
+class _Output:
+    """Sends one connection's command output back to its client.
+
+    Output is queued and written by a task that waits for the socket to
+    drain. A command printing from a worker thread blocks while more than
+    DAEMON_OUTPUT_BUFFER bytes are queued, so a slow client slows it down
+    instead of filling the daemon's memory. Prints on the event loop itself
+    cannot wait; they are queued regardless.
+    """
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self._writer = writer
+        self._loop = asyncio.get_running_loop()
+        self._thread = threading.get_ident()
+        self._chunks = deque()
+        self._queued = 0
+        self._room = threading.Condition()
+        self._ready = asyncio.Event()
+        self._broken = False
+        self._closing = False
+        self._task = self._loop.create_task(self._pump())
+
+    def write(self, data: bytes):
+        on_loop = threading.get_ident() == self._thread
+        with self._room:
+            if not on_loop:
+                self._room.wait_for(
+                    lambda: self._queued < DAEMON_OUTPUT_BUFFER or self._broken
+                )
+            if self._broken:
+                raise BrokenPipeError("client disconnected")
+            self._chunks.append(_FRAME.pack(_DATA, len(data)) + data)
+            self._queued += len(data)
+        if on_loop:
+            self._ready.set()
+        else:
+            self._loop.call_soon_threadsafe(self._ready.set)
+
+    async def _pump(self):
+        try:
+            while True:
+                await self._ready.wait()
+                self._ready.clear()
+                while self._chunks:
+                    frame = self._chunks.popleft()
+                    self._writer.write(frame)
+                    await self._writer.drain()
+                    with self._room:
+                        self._queued -= len(frame) - _FRAME.size
+                        self._room.notify_all()
+                if self._closing:
+                    return
+        except ConnectionError:
+            with self._room:
+                self._broken = True
+                self._chunks.clear()
+                self._room.notify_all()
+
+    async def close(self, status: int):
+        """Send what is still queued, then the exit status."""
+        self._closing = True
+        self._ready.set()
+        await self._task
+        if not self._broken:
+            self._writer.write(_FRAME.pack(_STATUS, status))
+            await self._writer.drain()
+
+
+class _StdoutProxy:
+    """sys.stdout replacement that routes print() to the current client."""
+
+    def __init__(self, real):
+        self._real = real
+
+    def write(self, s: str) -> int:
+        out = _output.get()
+        if out is None:
+            return self._real.write(s)
+        out.write(s.encode())
+        return len(s)
+
+    def flush(self):
+        if _output.get() is None:
+            self._real.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._real, name)
+
+
+class Daemon:
+    """Long-running command server on a Unix socket.
+
+    Keeps the database pool, the path lock table, the metadata index and the
+    audit-log queue warm between commands. Only clients started from the
+    daemon's working directory are served, so BASE_DIR and relative paths
+    resolve the same way they would in-process.
+    """
+
+    def __init__(self, path: Path = DAEMON_SOCKET):
+        self.path = path
+        self._parser = None
+
+    async def serve(self, args):
+        from src.core.buildParser import build_parser
+
+        self.path = Path(args.socket) if args.socket else self.path
+        self._parser = build_parser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            if probe.connect_ex(str(self.path)) == 0:
+                print("Daemon already running on", self.path)
+                return
+        with contextlib.suppress(FileNotFoundError):
+            self.path.unlink()
+
+        # Bound under a private umask: a chmod after the bind would leave a
+        # window in which other local users could connect and run commands.
+        umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(self._handle, path=str(self.path))
+        finally:
+            os.umask(umask)
+        stopped = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stopped.set)
+
+        real_stdout = sys.stdout
+        sys.stdout = _StdoutProxy(real_stdout)
+        print("Listening on", self.path)
+        try:
+            async with server:
+                await stopped.wait()
+        finally:
+            sys.stdout = real_stdout
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.remove_signal_handler(sig)
+            with contextlib.suppress(FileNotFoundError):
+                self.path.unlink()
+            print("Daemon stopped")
+
+    async def _handle(self, reader, writer):
+        try:
+            try:
+                request = json.loads(await reader.readline())
+                args = self._parser.parse_args(request["argv"])
+            except (ValueError, KeyError, TypeError, SystemExit):
+                args = None
+            if (
+                args is None
+                or not hasattr(args, "func")
+                or request.get("cwd") != os.getcwd()
+                or runs_locally(args)
+            ):
+                writer.write(b'{"ok": false}\n')
+                return
+            writer.write(b'{"ok": true}\n')
+            output = _Output(writer)
+            token = _output.set(output)
+            status = 0
+            try:
+                await dispatch(args)
+            except SystemExit as e:
+                status = e.code if isinstance(e.code, int) else 1
+            except Exception as e:
+                print("Error:", e)
+                status = 1
+            finally:
+                _output.reset(token)
+            await output.close(status)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+
+daemon = Daemon()
@@ -1,4 +1,13 @@
-from sqlalchemy import insert, delete, select, update
+from sqlalchemy import (
+    BigInteger,
+    String,
+    column,
+    insert,
+    delete,
+    select,
+    update,
+    values,
+)
 from src.files.files import Files
 from src.core.databaseAccessor import db
 
@@ -11,30 +20,133 @@ class FileAccessor:
                 file_name=file_in.file_name,
                 user_id=file_in.user_id,
                 file_size=file_in.file_size,
+                physical_size=file_in.physical_size,
+                checksum=file_in.checksum,
             )
             .returning(Files)
         )
         result = await db.execute(stmt)
         return result.scalar_one()
 
-    async def delete(self, file_name):
+    async def create_many(self, files_in) -> list[Files]:
+        """Insert several files with one multi-row INSERT ... RETURNING."""
+        rows = [
+            {
+                "file_name": file_in.file_name,
+                "user_id": file_in.user_id,
+                "file_size": file_in.file_size,
+                "physical_size": file_in.physical_size,
+                "checksum": file_in.checksum,
+            }
+            for file_in in files_in
+        ]
+        if not rows:
+            return []
+        result = await db.execute(insert(Files).values(rows).returning(Files))
+        return list(result.scalars().all())
+
+    async def delete(self, file_name, user_id=None):
         stmt = delete(Files).where(Files.file_name == file_name)
+        if user_id is not None:
+            stmt = stmt.where(Files.user_id == user_id)
+        await db.execute(stmt)
+
+    async def delete_many(self, file_names, user_id):
+        file_names = list(file_names)
+        if not file_names:
+            return
+        stmt = delete(Files).where(
+            Files.file_name.in_(file_names), Files.user_id == user_id
+        )
         await db.execute(stmt)
 
-    async def fetch_by_name(self, file_name) -> Files | None:
+    async def fetch_by_name(self, file_name, user_id) -> Files | None:
+        stmt = select(Files).where(
+            Files.file_name == file_name, Files.user_id == user_id
+        )
+        result = await db.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def fetch_all_by_name(self, file_name) -> list[Files]:
         stmt = select(Files).where(Files.file_name == file_name)
         result = await db.execute(stmt)
+        return list(result.scalars().all())
+
+    async def fetch_by_names(self, file_names) -> list[Files]:
+        stmt = select(Files).where(Files.file_name.in_(list(file_names)))
+        result = await db.execute(stmt)
+        return list(result.scalars().all())
+
+    async def fetch_checksums(self) -> list:
+        """(id, file_name, user_id, checksum) of every file."""
+        stmt = select(Files.id, Files.file_name, Files.user_id, Files.checksum)
+        result = await db.execute(stmt)
+        return list(result.all())
+
+    async def update(
+        self, file_size, file_name, user_id, physical_size=None, checksum=None
+    ) -> Files | None:
+        stmt = (
+            update(Files)
+            .where(Files.file_name == file_name, Files.user_id == user_id)
+            .values(file_size=file_size, physical_size=physical_size, checksum=checksum)
+            .returning(Files)
+        )
+        result = await db.execute(stmt)
         return result.scalar_one_or_none()
 
-    async def update(self, file_size, file_name) -> Files | None:
+    async def set_checksums(self, checksums):
+        """Fill in missing checksums; checksums maps file id to its SHA-256."""
+        if not checksums:
+            return
+        new = values(
+            column("id", BigInteger),
+            column("checksum", String),
+            name="new_checksums",
+        ).data(list(checksums.items()))
+        stmt = (
+            update(Files)
+            .where(Files.id == new.c.id, Files.checksum.is_(None))
+            .values(checksum=new.c.checksum)
+        )
+        await db.execute(stmt)
+
+    async def rename(self, file_name, new_name, user_id) -> Files | None:
         stmt = (
             update(Files)
-            .where(Files.file_name == file_name)
-            .values(file_size=file_size)
+            .where(Files.file_name == file_name, Files.user_id == user_id)
+            .values(file_name=new_name)
             .returning(Files)
         )
         result = await db.execute(stmt)
         return result.scalar_one_or_none()
 
+    async def update_many(self, sizes, user_id) -> list[Files]:
+        """Set the sizes of many of a user's files in one UPDATE ... FROM (VALUES ...).
+
+        sizes maps file name to the new (file_size, physical_size, checksum).
+        """
+        if not sizes:
+            return []
+        new = values(
+            column("file_name", String),
+            column("file_size", BigInteger),
+            column("physical_size", BigInteger),
+            column("checksum", String),
+            name="new_sizes",
+        ).data([(name, *size) for name, size in sizes.items()])
+        stmt = (
+            update(Files)
+            .where(Files.file_name == new.c.file_name, Files.user_id == user_id)
+            .values(
+                file_size=new.c.file_size,
+                physical_size=new.c.physical_size,
+                checksum=new.c.checksum,
+            )
+            .returning(Files)
+        )
+        result = await db.execute(stmt)
+        return list(result.scalars().all())
+
 
 fileAccessor = FileAccessor()
@@ -0,0 +1,345 @@
+import asyncio
+import csv
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from src.blobs.accessor import blobAccessor
+from src.blobs.store import blobStore
+from src.cli import (
+    MAX_UPLOAD_SIZE,
+    STREAM_CHUNK_SIZE,
+    PayloadTooLarge,
+    acquire_locks_for_paths,
+    batched_dir_sync,
+    ensure_valid_filename,
+    resolve_secure_path,
+)
+from src.core.auth import is_authenticated
+from src.core.config import config
+from src.core.databaseAccessor import db
+from src.files.accessor import fileAccessor
+from src.files.files import Files
+from src.files.index import metadataIndex
+from src.files.manager import FileUndo, fileManager
+from src.operations.accessor import operationsAccessor
+from src.operations.enum import OperationType
+from src.operations.operations import Operations
+from src.usage.accessor import usageAccessor
+
+BATCH_CONCURRENCY = getattr(config.static, "BATCH_CONCURRENCY", 16)
+BATCH_OPS = ("create", "write", "delete", "read")
+
+
+def read_manifest(path: str, fmt: str | None = None):
+    """Yield operation dicts from an NDJSON or CSV manifest ('-' for stdin).
+
+    CSV manifests need a header row naming the op, path, content and
+    from_file columns.
+    """
+    if fmt is None:
+        fmt = "csv" if path.endswith(".csv") else "ndjson"
+    fh = sys.stdin if path == "-" else open(path, newline="")
+    try:
+        if fmt == "csv":
+            yield from csv.DictReader(fh)
+            return
+        for line in fh:
+            if line.strip():
+                yield json.loads(line)
+    finally:
+        if fh is not sys.stdin:
+            fh.close()
+
+
+class _QuotaBudget:
+    """What is left of a user's quota while a batch runs, per file name.
+
+    Overwriting a name frees the bytes it held, so each write may use the
+    remaining room plus the name's current size. Writes on different names
+    run concurrently and can each be granted the same room; the files_usage
+    trigger rejects the metadata if they overshoot together.
+    """
+
+    def __init__(self, room: int, sizes: dict):
+        self.room = room
+        self.sizes = sizes
+
+    def limit(self, name: str, cap: int) -> int:
+        return min(cap, self.room + self.sizes.get(name, 0))
+
+    def charge(self, name: str, size: int):
+        self.room -= size - self.sizes.get(name, 0)
+        self.sizes[name] = size
+
+
+def _path_key(item):
+    """The file an item works on, so that "a" and "./a" are ordered together."""
+    try:
+        return resolve_secure_path(item.get("path") or "")
+    except (OSError, TypeError, ValueError):
+        return item.get("path")
+
+
+class BatchManager:
+    """Runs many file operations in one process and one metadata transaction.
+
+    File contents are written concurrently (bounded by a semaphore); all the
+    ``files``/``operations`` changes are then applied in a single session, in
+    manifest order. If that fails, the files are restored as they were. Every
+    path of the manifest stays locked until then, so other commands and
+    watch never see a file whose row is not saved yet.
+    """
+
+    async def run(self, args):
+        user = is_authenticated()
+        if not user:
+            print("Not authenticated")
+            return
+
+        try:
+            items = list(read_manifest(args.manifest, args.format))
+        except (OSError, ValueError) as e:
+            print("Invalid manifest:", e)
+            return
+
+        started = time.perf_counter()
+        names = {os.path.basename(item.get("path") or "") for item in items}
+        rows = {}
+        for file in await fileAccessor.fetch_by_names(names):
+            rows.setdefault(file.file_name, []).append(file)
+
+        room = await usageAccessor.room(user)
+        budget = None
+        if room is not None:
+            budget = _QuotaBudget(
+                room,
+                {
+                    name: f.file_size
+                    for name, files in rows.items()
+                    for f in files
+                    if f.user_id == user
+                },
+            )
+
+        semaphore = asyncio.Semaphore(max(1, args.concurrency or BATCH_CONCURRENCY))
+        changes = [None] * len(items)
+        written = set()
+        undo = FileUndo()
+        failed = 0
+
+        async def run_one(i, item, previous):
+            nonlocal failed
+            if previous is not None:
+                await asyncio.wait([previous])
+            async with semaphore:
+                try:
+                    changes[i], detail = await self._run_item(
+                        item, user, rows, written, undo, budget
+                    )
+                    status = "ok"
+                except Exception as e:
+                    status, detail = "error", str(e) or type(e).__name__
+                    failed += 1
+            print(f"{i}\t{item.get('op')}\t{item.get('path')}\t{status}\t{detail}")
+
+        # Shared for paths that are only read; unresolvable paths fail later.
+        shared = {}
+        for item in items:
+            key = _path_key(item)
+            if isinstance(key, Path):
+                shared[key] = shared.get(key, True) and item.get("op") == "read"
+
+        async with acquire_locks_for_paths(shared.items()):
+            # Items on the same path run in manifest order; others concurrently.
+            tasks = []
+            last = {}
+            with batched_dir_sync():
+                for i, item in enumerate(items):
+                    key = _path_key(item)
+                    task = asyncio.create_task(run_one(i, item, last.get(key)))
+                    last[key] = task
+                    tasks.append(task)
+                await asyncio.gather(*tasks)
+
+            try:
+                freed = await self._apply_metadata(changes, rows, user)
+            except Exception as e:
+                print("Error saving metadata:", e)
+                restored = len(undo.saved)
+                undo.restore(user)
+                await fileManager.discard_blocks(
+                    block for change in changes if change for block in change[3]
+                )
+                print(f"Restored {restored} files")
+                return
+            touched = list(undo.saved)
+            undo.discard()
+            blobStore.remove_blobs(freed)
+            await fileManager.index_text(touched)
+
+        elapsed = time.perf_counter() - started
+        rate = len(items) / elapsed if elapsed else 0.0
+        print(
+            f"{len(items)} operations in {elapsed:.2f}s ({rate:.1f} ops/s), "
+            f"{len(items) - failed} ok, {failed} failed"
+        )
+
+    async def _run_item(self, item, user, rows, written, undo, budget=None):
+        """Run one item; its path is already locked by run."""
+        op = item.get("op")
+        if op not in BATCH_OPS:
+            raise ValueError(f"unknown op {op!r}")
+        p = resolve_secure_path(item.get("path") or "")
+        owned = [f for f in rows.get(p.name, []) if f.user_id == user]
+
+        if op == "read":
+            if not p.is_file():
+                raise FileNotFoundError("file not found")
+            size, digest = await asyncio.to_thread(self._hash_file, p)
+            return None, f"{size} bytes sha256={digest}"
+
+        if op == "delete":
+            if not p.exists():
+                raise FileNotFoundError("file not found")
+            if not owned and p.name not in written:
+                raise PermissionError("you can only delete your own files")
+            blocks = blobStore.manifest_blocks(p)
+            undo.keep(p)
+            await asyncio.to_thread(os.remove, p)
+            written.discard(p.name)
+            metadataIndex.remove(p)
+            if budget is not None:
+                budget.charge(p.name, 0)
+            return ("delete", p.name, 0, [], blocks), "deleted"
+
+        ensure_valid_filename(p.name)
+        if rows.get(p.name) and not owned:
+            raise PermissionError("you can only modify your own files")
+        if op == "create" and p.exists():
+            raise FileExistsError("file already exists")
+        limit = MAX_UPLOAD_SIZE
+        if budget is not None:
+            limit = budget.limit(p.name, limit)
+        if item.get("from_file"):
+            source = open(item["from_file"], "rb")
+        else:
+            source = io.BytesIO((item.get("content") or "").encode())
+        try:
+            undo.keep(p)
+            stored = await asyncio.to_thread(
+                fileManager.store_content,
+                p,
+                source,
+                limit,
+                bool(item.get("dedup")),
+                None,
+                item.get("compress") or None,
+            )
+        except PayloadTooLarge as e:
+            if limit < MAX_UPLOAD_SIZE:
+                raise ValueError("quota exceeded") from e
+            raise
+        finally:
+            source.close()
+        if stored is None:
+            return None, "unchanged"
+        size, digest, new_blocks, old_blocks = stored
+        sizes = (size, blobStore.physical_size(p), digest)
+        if budget is not None:
+            budget.charge(p.name, size)
+        written.add(p.name)
+        metadataIndex.record(p, owner=user, sha256=digest)
+        return ("write", p.name, sizes, new_blocks, old_blocks), f"{size} bytes"
+
+    @staticmethod
+    def _hash_file(p: Path):
+        digest = hashlib.sha256()
+        size = 0
+        with blobStore.open(p) as f:
+            while chunk := f.read(STREAM_CHUNK_SIZE):
+                digest.update(chunk)
+                size += len(chunk)
+        return size, digest.hexdigest()
+
+    async def _apply_metadata(self, changes, rows, user):
+        """Fold the changes per file name and apply them with bulk statements.
+
+        Each name ends up either untouched, updated in place, deleted, or
+        (re)created; a delete followed by a write starts the file over, and the
+        audit records keep every later step in manifest order.
+        """
+        new_blocks, old_blocks = [], []
+        plans = {}
+        for change in changes:
+            if change is None:
+                continue
+            kind, name, sizes, added, released = change
+            new_blocks += added
+            old_blocks += released
+            plan = plans.get(name)
+            if plan is None:
+                owned = [f for f in rows.get(name, []) if f.user_id == user]
+                plan = plans[name] = {
+                    "rows": owned,
+                    "deleted": False,
+                    "size": None,
+                    "ops": [],
+                }
+            if kind == "write":
+                if not plan["ops"] and (plan["deleted"] or not plan["rows"]):
+                    plan["ops"].append(OperationType.CREATE)
+                else:
+                    plan["ops"].append(OperationType.UPDATE)
+                plan["size"] = sizes
+            else:
+                plan["deleted"] = plan["deleted"] or bool(plan["rows"])
+                plan["size"] = None
+                plan["ops"] = []
+        deleted = [name for name, plan in plans.items() if plan["deleted"]]
+        updated = {
+            name: plan["size"]
+            for name, plan in plans.items()
+            if plan["size"] is not None and plan["rows"] and not plan["deleted"]
+        }
+        created = [
+            Files(
+                file_name=name,
+                file_size=plan["size"][0],
+                physical_size=plan["size"][1],
+                checksum=plan["size"][2],
+                user_id=user,
+            )
+            for name, plan in plans.items()
+            if plan["size"] is not None and (plan["deleted"] or not plan["rows"])
+        ]
+
+        async with db.session():
+            await blobAccessor.add_refs(new_blocks)
+            freed = await blobAccessor.release(old_blocks)
+            await operationsAccessor.create_many(
+                Operations(type=OperationType.DELETE, file_id=f.id, user_id=user)
+                for name in deleted
+                for f in plans[name]["rows"]
+            )
+            await fileAccessor.delete_many(deleted, user)
+            files = await fileAccessor.update_many(updated, user)
+            files += await fileAccessor.create_many(created)
+            await operationsAccessor.create_many(
+                Operations(type=op, file_id=f.id, user_id=user)
+                for f in files
+                for op in plans[f.file_name]["ops"]
+            )
+        for f in files:
+            rows[f.file_name] = [
+                r for r in rows.get(f.file_name, []) if r.user_id != user
+            ]
+            rows[f.file_name].append(f)
+        return freed
+
+
+batchManager = BatchManager()
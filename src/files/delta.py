@@ -0,0 +1,258 @@
+import errno
+import hashlib
+import os
+import struct
+import zlib
+from pathlib import Path
+
+from src.cli import STATE_DIR, STREAM_CHUNK_SIZE, AtomicWriter, PayloadTooLarge
+from src.core.config import config
+
+DELTA_BLOCK_SIZE = getattr(config.static, "DELTA_BLOCK_SIZE", 64 * 1024)
+SIGNATURE_DIR = STATE_DIR / "signatures"
+
+_MOD = 65521
+_HEADER = struct.Struct("<QQQI")
+_ENTRY = struct.Struct("<I16s")
+
+
+def weak_sum(block) -> int:
+    """Adler-32 of block: computed in C here, rolled one byte at a time below."""
+    return zlib.adler32(block)
+
+
+def strong_sum(block) -> bytes:
+    return hashlib.blake2b(block, digest_size=16).digest()
+
+
+class Signature:
+    """Per-block (weak, strong) checksums of one file, plus the stat they match."""
+
+    def __init__(self, block_size: int, entries=None, stat_key=(0, 0, 0)):
+        self.block_size = block_size
+        self.entries = entries or []
+        self.stat_key = stat_key
+        self._partial = bytearray()
+
+    @staticmethod
+    def key_of(st: os.stat_result):
+        return st.st_size, st.st_mtime_ns, st.st_ino
+
+    def update(self, data):
+        """Feed the file's content in order; full blocks become entries."""
+        buf = self._partial
+        buf += data
+        n = self.block_size
+        whole = len(buf) - len(buf) % n
+        for i in range(0, whole, n):
+            block = buf[i : i + n]
+            self.entries.append((weak_sum(block), strong_sum(block)))
+        del buf[:whole]
+
+    def index(self) -> dict:
+        """Map weak checksum to the block numbers that have it."""
+        table = {}
+        for i, (weak, _) in enumerate(self.entries):
+            table.setdefault(weak, []).append(i)
+        return table
+
+    def dump(self) -> bytes:
+        head = _HEADER.pack(*self.stat_key, self.block_size)
+        return head + b"".join(_ENTRY.pack(w, s) for w, s in self.entries)
+
+    @classmethod
+    def load(cls, data: bytes):
+        size, mtime_ns, ino, block_size = _HEADER.unpack_from(data)
+        entries = list(_ENTRY.iter_unpack(data[_HEADER.size :]))
+        return cls(block_size, entries, (size, mtime_ns, ino))
+
+
+class SignatureCache:
+    """Block signatures of stored files, kept under STATE_DIR/signatures.
+
+    An entry is only used while the file's size, mtime and inode still match
+    the ones recorded with it; otherwise the signature is recomputed.
+    """
+
+    def __init__(self, root: Path = SIGNATURE_DIR, block_size: int = DELTA_BLOCK_SIZE):
+        self.root = root
+        self.block_size = block_size
+
+    def _path(self, p: Path) -> Path:
+        return self.root / hashlib.blake2b(str(p).encode(), digest_size=16).hexdigest()
+
+    def get(self, p: Path, fd: int) -> Signature:
+        """Signature of the open file fd (stored at p), from cache if current."""
+        key = Signature.key_of(os.fstat(fd))
+        try:
+            sig = Signature.load(self._path(p).read_bytes())
+            if sig.stat_key == key and sig.block_size == self.block_size:
+                return sig
+        except (OSError, struct.error):
+            pass
+        sig = Signature(self.block_size, stat_key=key)
+        offset = 0
+        while chunk := os.pread(fd, STREAM_CHUNK_SIZE, offset):
+            sig.update(chunk)
+            offset += len(chunk)
+        self.put(p, sig)
+        return sig
+
+    def put(self, p: Path, sig: Signature):
+        try:
+            with AtomicWriter(self._path(p), "wb", durability="none") as f:
+                f.write(sig.dump())
+        except OSError:
+            pass
+
+
+def _copy_range(src_fd: int, dst_fd: int, src_off: int, dst_off: int, n: int):
+    while n:
+        try:
+            done = os.copy_file_range(src_fd, dst_fd, n, src_off, dst_off)
+        except OSError as e:
+            if e.errno not in (
+                errno.EXDEV,
+                errno.ENOSYS,
+                errno.EINVAL,
+                errno.EOPNOTSUPP,
+            ):
+                raise
+            done = os.pwrite(
+                dst_fd, os.pread(src_fd, min(n, STREAM_CHUNK_SIZE), src_off), dst_off
+            )
+        if not done:
+            raise OSError("Stored file shrank during delta write")
+        src_off += done
+        dst_off += done
+        n -= done
+
+
+class DeltaWriter:
+    """Write new content reusing the blocks it shares with the stored file.
+
+    A rolling weak checksum over the input finds blocks of the old file at any
+    offset; confirmed matches (strong checksum) are copied from the old file
+    with copy_file_range, everything else is written as literal data. After
+    two blocks' worth of unmatched positions (enough to re-synchronize after
+    an insertion of up to a block) the search falls back to checking
+    block-aligned windows only, so wholly new data costs one hash per block
+    rather than one per byte.
+    """
+
+    def __init__(self, cache: SignatureCache):
+        self.cache = cache
+
+    def write(self, p: Path, old_fd: int, src, dst_fd: int, limit: int):
+        """Copy src into dst_fd.
+
+        Returns (size, sha256 hexdigest, reused bytes, signature of the new
+        content); the caller stores the signature once the file is in place.
+        """
+        n = self.cache.block_size
+        old = self.cache.get(p, old_fd)
+        table = old.index()
+        strong = [s for _, s in old.entries]
+        new_sig = Signature(n)
+        digest = hashlib.sha256()
+
+        buf = bytearray()
+        eof = False
+        pos = 0  # start of the current window in buf
+        literal = 0  # start of pending literal bytes in buf
+        out = 0  # bytes emitted to dst
+        total = 0
+        reused = 0
+        copy = None  # pending [old offset, dst offset, length]
+        misses = 0
+        rolling = None
+
+        def emit(data):
+            nonlocal total
+            total += len(data)
+            if total > limit:
+                raise PayloadTooLarge()
+            digest.update(data)
+            new_sig.update(data)
+
+        def flush_copy():
+            nonlocal copy
+            if copy:
+                _copy_range(old_fd, dst_fd, *copy)
+                copy = None
+
+        def flush_literal(end):
+            nonlocal out, literal
+            if end > literal:
+                flush_copy()
+                data = bytes(buf[literal:end])
+                emit(data)
+                os.pwrite(dst_fd, data, out)
+                out += len(data)
+                literal = end
+
+        while True:
+            if len(buf) - pos < n and not eof:
+                flush_literal(pos)
+                del buf[:pos]
+                literal -= pos
+                pos = 0
+                chunk = src.read(max(STREAM_CHUNK_SIZE, n))
+                if chunk:
+                    buf += chunk
+                else:
+                    eof = True
+                continue
+            if len(buf) - pos < n:
+                break
+
+            if rolling is None:
+                rolling = weak_sum(buf[pos : pos + n])
+            match = None
+            candidates = table.get(rolling)
+            if candidates:
+                window = strong_sum(buf[pos : pos + n])
+                match = next((i for i in candidates if strong[i] == window), None)
+
+            if match is not None:
+                flush_literal(pos)
+                emit(buf[pos : pos + n])
+                src_off = match * n
+                if copy and copy[0] + copy[2] == src_off:
+                    copy[2] += n
+                else:
+                    flush_copy()
+                    copy = [src_off, out, n]
+                out += n
+                reused += n
+                pos += n
+                literal = pos
+                misses = 0
+                rolling = None
+                continue
+
+            misses += 1
+            if misses >= 2 * n:
+                pos += n
+                rolling = None
+            else:
+                a, b = rolling & 0xFFFF, rolling >> 16
+                gone = buf[pos]
+                pos += 1
+                if len(buf) - pos >= n:
+                    a = (a - gone + buf[pos + n - 1]) % _MOD
+                    b = (b - n * gone + a - 1) % _MOD
+                    rolling = b << 16 | a
+                else:
+                    rolling = None
+            if pos - literal >= STREAM_CHUNK_SIZE:
+                flush_literal(pos)
+
+        flush_literal(len(buf))
+        flush_copy()
+        os.ftruncate(dst_fd, out)
+        return total, digest.hexdigest(), reused, new_sig
+
+
+signatureCache = SignatureCache()
+deltaWriter = DeltaWriter(signatureCache)
@@ -1,5 +1,5 @@
 from src.core.models.models import BaseModel
-from sqlalchemy import String, DateTime, BigInteger, ForeignKey, func
+from sqlalchemy import String, DateTime, BigInteger, ForeignKey, UniqueConstraint, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from src.core.config import config
 import typing
@@ -11,12 +11,18 @@ if typing.TYPE_CHECKING:
 
 class Files(BaseModel):
     __tablename__ = "files"
+    # file_name leads so lookups by name alone can use the same index.
+    __table_args__ = (UniqueConstraint("file_name", "user_id"),)
 
     file_name: Mapped[str] = mapped_column(String(config.static.FILE_NAME_MAX_LENGTH))
     created_date: Mapped[DateTime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
-    file_size: Mapped[int] = mapped_column()
+    file_size: Mapped[int] = mapped_column(BigInteger)
+    # Bytes on disk; below file_size for compressed files.
+    physical_size: Mapped[int | None] = mapped_column(BigInteger)
+    # SHA-256 of the logical content, hex; NULL for files stored before it.
+    checksum: Mapped[str | None] = mapped_column(String(64))
     user_id: Mapped[BigInteger] = mapped_column(
         BigInteger, ForeignKey("users.id", ondelete="CASCADE")
     )
@@ -0,0 +1,204 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+from src.cli import BASE_DIR, STATE_DIR, WALK_WORKERS, walk_entries
+
+INDEX_PATH = STATE_DIR / "index.sqlite3"
+REFRESH_BATCH = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    path TEXT PRIMARY KEY,
+    parent TEXT NOT NULL,
+    name TEXT NOT NULL,
+    is_dir INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    owner INTEGER,
+    sha256 TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_entries_parent_name ON entries (parent, name);
+CREATE INDEX IF NOT EXISTS ix_entries_name ON entries (name);
+"""
+
+_UPSERT = """
+INSERT INTO entries (path, parent, name, is_dir, size, mtime_ns, inode, owner, sha256)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (path) DO UPDATE SET
+    is_dir = excluded.is_dir,
+    size = excluded.size,
+    mtime_ns = excluded.mtime_ns,
+    inode = excluded.inode,
+    owner = COALESCE(excluded.owner, entries.owner),
+    sha256 = excluded.sha256
+"""
+
+
+def _like_prefix(rel: str) -> str:
+    escaped = rel.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "/%"
+
+
+class MetadataIndex:
+    """Local SQLite index of BASE_DIR keyed by relative path.
+
+    Kept current by the FileManager write/delete/zip paths and refreshed from
+    disk with ``refresh``, which only rewrites rows whose size, mtime or inode
+    changed. Each thread gets its own connection, since commands use the
+    index from worker threads as well as from the event loop.
+    """
+
+    def __init__(self, path: Path = INDEX_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = self._local.conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+        return conn
+
+    @staticmethod
+    def relpath(p: Path) -> str:
+        rel = Path(p).relative_to(BASE_DIR).as_posix()
+        return "" if rel == "." else rel
+
+    @staticmethod
+    def _row(rel: str, st: os.stat_result, is_dir: bool, owner=None, sha256=None):
+        parent, _, name = rel.rpartition("/")
+        return (
+            rel,
+            parent,
+            name,
+            int(is_dir),
+            st.st_size,
+            st.st_mtime_ns,
+            st.st_ino,
+            owner,
+            sha256,
+        )
+
+    def record(self, p: Path, owner: int | None = None, sha256: str | None = None):
+        """Index p (and any parent directories) after it was written."""
+        rel = self.relpath(p)
+        rows = [self._row(rel, p.stat(), p.is_dir(), owner, sha256)]
+        parent = p.parent
+        while parent != BASE_DIR and BASE_DIR in parent.parents:
+            rows.append(self._row(self.relpath(parent), parent.stat(), True))
+            parent = parent.parent
+        with self.conn:
+            self.conn.executemany(_UPSERT, rows)
+
+    def remove(self, p: Path):
+        rel = self.relpath(p)
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM entries WHERE path = ? OR path LIKE ? ESCAPE '\\'",
+                (rel, _like_prefix(rel)),
+            )
+
+    def children(self, p: Path, cursor: str | None = None, limit: int = -1):
+        rel = self.relpath(p)
+        return self.conn.execute(
+            "SELECT name, is_dir, size FROM entries "
+            "WHERE parent = ? AND name > ? ORDER BY name LIMIT ?",
+            (rel, cursor or "", limit),
+        )
+
+    def descendants(self, p: Path, cursor: str | None = None, limit: int = -1):
+        rel = self.relpath(p)
+        prefix = rel + "/" if rel else ""
+        return self.conn.execute(
+            "SELECT substr(path, ?), is_dir, size FROM entries "
+            "WHERE path LIKE ? ESCAPE '\\' AND path > ? ORDER BY path LIMIT ?",
+            (
+                len(prefix) + 1,
+                _like_prefix(rel) if rel else "%",
+                prefix + (cursor or ""),
+                limit,
+            ),
+        )
+
+    def lookup(self, name: str):
+        return self.conn.execute(
+            "SELECT path, size, mtime_ns, owner, sha256 FROM entries "
+            "WHERE name = ? ORDER BY path",
+            (name,),
+        )
+
+    def stats(self, p: Path):
+        """Return (file count, total bytes) of the files indexed under p."""
+        rel = self.relpath(p)
+        if not rel:
+            where, params = "is_dir = 0", ()
+        else:
+            where = "is_dir = 0 AND (path = ? OR path LIKE ? ESCAPE '\\')"
+            params = (rel, _like_prefix(rel))
+        return self.conn.execute(
+            f"SELECT count(*), coalesce(sum(size), 0) FROM entries WHERE {where}",
+            params,
+        ).fetchone()
+
+    def file_stats(self) -> dict:
+        """Map the path of every indexed file to its (size, mtime_ns)."""
+        return {
+            path: (size, mtime_ns)
+            for path, size, mtime_ns in self.conn.execute(
+                "SELECT path, size, mtime_ns FROM entries WHERE is_dir = 0"
+            )
+        }
+
+    def refresh(self, workers: int | None = None):
+        """Re-sync the index with BASE_DIR; returns (changed, removed) counts."""
+        conn = self.conn
+        changed = 0
+        with conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen (path TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM seen")
+            batch = []
+            for rel, entry in walk_entries(BASE_DIR, workers or WALK_WORKERS):
+                batch.append((rel, entry))
+                if len(batch) >= REFRESH_BATCH:
+                    changed += self._refresh_batch(batch)
+                    batch = []
+            changed += self._refresh_batch(batch)
+            removed = conn.execute(
+                "DELETE FROM entries WHERE path NOT IN (SELECT path FROM seen)"
+            ).rowcount
+        return changed, removed
+
+    def _refresh_batch(self, batch) -> int:
+        if not batch:
+            return 0
+        conn = self.conn
+        conn.executemany("INSERT INTO seen VALUES (?)", [(rel,) for rel, _ in batch])
+        known = {
+            row[0]: row[1:]
+            for row in conn.execute(
+                "SELECT path, size, mtime_ns, inode, is_dir FROM entries "
+                f"WHERE path IN ({','.join('?' * len(batch))})",
+                [rel for rel, _ in batch],
+            )
+        }
+        rows = []
+        for rel, entry in batch:
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if known.get(rel) != (st.st_size, st.st_mtime_ns, st.st_ino, int(is_dir)):
+                rows.append(self._row(rel, st, is_dir))
+        conn.executemany(_UPSERT, rows)
+        return len(rows)
+
+
+metadataIndex = MetadataIndex()
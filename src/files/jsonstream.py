@@ -0,0 +1,244 @@
+import codecs
+import json
+import re
+from json.decoder import scanstring
+
+READ_SIZE = 64 * 1024
+
+_WS = re.compile(r"[ \t\n\r]*")
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(\.\d+)?([eE][-+]?\d+)?")
+_CONSTANTS = {
+    "true": True,
+    "false": False,
+    "null": None,
+    "NaN": float("nan"),
+    "Infinity": float("inf"),
+    "-Infinity": float("-inf"),
+}
+
+_VALUE, _KEY, _AFTER = range(3)
+
+
+class _Reader:
+    """Sliding text window over a binary file handle."""
+
+    def __init__(self, fh, read_size: int):
+        self._fh = fh
+        self._read_size = read_size
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self._fh.read(self._read_size)
+        self.eof = not chunk
+        self.buf = self.buf[self.pos :] + self._decoder.decode(chunk, final=self.eof)
+        self.pos = 0
+        return True
+
+    def error(self, msg: str):
+        return json.JSONDecodeError(msg, self.buf, self.pos)
+
+    def peek(self) -> str:
+        while True:
+            self.pos = _WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def ensure(self, n: int):
+        while len(self.buf) - self.pos < n and self.fill():
+            pass
+
+    def read_string(self) -> str:
+        scanned = self.pos + 1
+        while True:
+            end = self.buf.find('"', scanned)
+            if end == -1:
+                scanned = len(self.buf) - self.pos
+                if not self.fill():
+                    raise self.error("Unterminated string")
+                continue
+            k = end - 1
+            while self.buf[k] == "\\":
+                k -= 1
+            if (end - 1 - k) % 2 == 0:
+                break
+            scanned = end + 1
+        value, self.pos = scanstring(self.buf, self.pos + 1)
+        return value
+
+    def read_number(self):
+        while True:
+            m = _NUMBER.match(self.buf, self.pos)
+            if m and m.end() < len(self.buf) and self.buf[m.end()] not in ".eE+-":
+                break
+            if not m and len(self.buf) - self.pos >= len("-Infinity"):
+                break
+            if not self.fill():
+                break
+        if not m:
+            return self.read_constant()
+        self.pos = m.end()
+        if m.group(1) or m.group(2):
+            return float(m.group())
+        return int(m.group())
+
+    def read_constant(self):
+        self.ensure(len("-Infinity"))
+        for text, value in _CONSTANTS.items():
+            if self.buf.startswith(text, self.pos):
+                self.pos += len(text)
+                return value
+        raise self.error("Expecting value")
+
+
+def iter_events(fh, read_size: int = READ_SIZE):
+    """Tokenize a JSON document from a binary file handle without loading it.
+
+    Yields ``(kind, value)`` pairs where kind is one of ``start_map``,
+    ``map_key``, ``end_map``, ``start_array``, ``end_array`` or ``value``.
+    """
+    r = _Reader(fh, read_size)
+    stack = []
+    state = _VALUE
+    while True:
+        c = r.peek()
+        if state == _VALUE:
+            if c == "{" or c == "[":
+                r.pos += 1
+                kind = "map" if c == "{" else "array"
+                yield "start_" + kind, None
+                if r.peek() == ("}" if kind == "map" else "]"):
+                    r.pos += 1
+                    yield "end_" + kind, None
+                    state = _AFTER
+                else:
+                    stack.append(kind)
+                    state = _KEY if kind == "map" else _VALUE
+                continue
+            if c == '"':
+                yield "value", r.read_string()
+            elif c == "-" or c.isdigit():
+                yield "value", r.read_number()
+            elif c:
+                yield "value", r.read_constant()
+            else:
+                raise r.error("Expecting value")
+            state = _AFTER
+        elif state == _KEY:
+            if c != '"':
+                raise r.error("Expecting property name enclosed in double quotes")
+            key = r.read_string()
+            if r.peek() != ":":
+                raise r.error("Expecting ':' delimiter")
+            r.pos += 1
+            yield "map_key", key
+            state = _VALUE
+        else:
+            if not stack:
+                if c:
+                    raise r.error("Extra data")
+                return
+            if c == ",":
+                r.pos += 1
+                state = _KEY if stack[-1] == "map" else _VALUE
+            elif c == ("}" if stack[-1] == "map" else "]"):
+                r.pos += 1
+                yield "end_" + stack.pop(), None
+            else:
+                raise r.error("Expecting ',' delimiter")
+
+
+def _skip_value(events, first):
+    if first[0] not in ("start_map", "start_array"):
+        return
+    depth = 1
+    for kind, _ in events:
+        if kind in ("start_map", "start_array"):
+            depth += 1
+        elif kind in ("end_map", "end_array"):
+            depth -= 1
+            if depth == 0:
+                return
+
+
+def select_pointer(events, pointer: str):
+    """Narrow an event stream down to the subtree at a JSON pointer (RFC 6901).
+
+    Siblings of the path are skipped without being materialized, and the stream
+    is not consumed past the end of the selected value.
+    """
+    if pointer and not pointer.startswith("/"):
+        raise LookupError(f"Invalid JSON pointer: {pointer}")
+    tokens = [t.replace("~1", "/").replace("~0", "~") for t in pointer.split("/")[1:]]
+    events = iter(events)
+    event = next(events)
+    for token in tokens:
+        if event[0] == "start_map":
+            while True:
+                kind, key = next(events)
+                if kind == "end_map":
+                    raise LookupError(f"Path not found: {pointer}")
+                event = next(events)
+                if key == token:
+                    break
+                _skip_value(events, event)
+        elif event[0] == "start_array" and token.isdigit():
+            index = int(token)
+            for i in range(index + 1):
+                event = next(events)
+                if event[0] == "end_array":
+                    raise LookupError(f"Path not found: {pointer}")
+                if i < index:
+                    _skip_value(events, event)
+        else:
+            raise LookupError(f"Path not found: {pointer}")
+
+    yield event
+    if event[0] not in ("start_map", "start_array"):
+        return
+    depth = 1
+    for event in events:
+        yield event
+        if event[0] in ("start_map", "start_array"):
+            depth += 1
+        elif event[0] in ("end_map", "end_array"):
+            depth -= 1
+            if depth == 0:
+                return
+
+
+def dump_events(events, out, indent: int = 2):
+    """Write an event stream as text identical to ``json.dumps(..., indent=indent)``."""
+    pad = " " * indent
+    depth = 0
+    first = True
+    after_key = False
+    for kind, value in events:
+        if kind == "end_map" or kind == "end_array":
+            depth -= 1
+            if not first:
+                out.write("\n" + pad * depth)
+            out.write("}" if kind == "end_map" else "]")
+            first = False
+            continue
+        if after_key:
+            after_key = False
+        elif depth:
+            out.write(("\n" if first else ",\n") + pad * depth)
+        if kind == "start_map" or kind == "start_array":
+            out.write("{" if kind == "start_map" else "[")
+            depth += 1
+            first = True
+            continue
+        if kind == "map_key":
+            out.write(json.dumps(value) + ": ")
+            after_key = True
+        else:
+            out.write(json.dumps(value))
+        first = False
@@ -1,25 +1,121 @@
+import heapq
+import asyncio
+import contextlib
+import contextvars
+import errno
+import io
 import sys
 import os
-import json
+import secrets
+import tempfile
+import threading
 import zipfile
+from datetime import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from xml.etree.ElementTree import ParseError, tostring as xml_tostring
 from pathlib import Path
 from src.cli import (
+    STATE_DIR,
     resolve_secure_path,
     acquire_lock_for_path,
     AtomicWriter,
+    DURABILITY,
+    acquire_locks_for_paths,
+    batched_dir_sync,
+    clone_file,
+    copy_stored_format,
+    fsync_dir,
     ensure_valid_filename,
-    safe_load_json,
-    safe_load_xml,
+    safe_iter_json,
+    safe_iter_xml,
+    dump_xml,
     MAX_UPLOAD_SIZE,
+    MAX_STREAM_UPLOAD_SIZE,
     ZIP_MAX_FILES,
+    copy_stream,
+    PayloadTooLarge,
+    send_file_range,
     inspect_zip_safety,
+    ZipBudget,
+    ZIP_WORKERS,
+    deflate_zip_member,
+    ZipArchiveWriter,
+    ExtractBudget,
+    extract_zip_member,
+    WALK_WORKERS,
+    entry_info,
+    walk_entries,
+    external_sorted,
 )
-from src.operations.operations import Operations
+from src.blobs.compression import codec_for, compress_stream
+from src.blobs.store import STORAGE_BACKEND, blobStore
+from src.files.delta import Signature, deltaWriter, signatureCache
+from src.files.index import metadataIndex
+from src.files.jsonstream import dump_events
 from src.operations.enum import OperationType
-from src.files.accessor import fileAccessor
 from src.core.auth import is_authenticated
-from src.operations.accessor import operationsAccessor
-from src.files.files import Files
+from src.search.index import textIndex
+
+
+class FileUndo:
+    """What each path held before a command changed it, to put back if the
+    command's metadata fails to save.
+
+    Originals are kept as hard links in a private directory under STATE_DIR,
+    or next to the file when that is on another filesystem.
+    """
+
+    def __init__(self):
+        self.saved: dict[Path, Path | None] = {}
+        self._dir = None
+
+    def keep(self, p: Path):
+        """Remember p as it is now; call under p's lock before changing it."""
+        if p in self.saved or (p.exists() and not p.is_file()):
+            return
+        if self._dir is None:
+            STATE_DIR.mkdir(parents=True, exist_ok=True)
+            self._dir = Path(tempfile.mkdtemp(prefix="undo-", dir=STATE_DIR))
+        backup = self._dir / str(len(self.saved))
+        try:
+            os.link(p, backup)
+        except FileNotFoundError:
+            backup = None
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            backup = p.with_name(f".{p.name}.{secrets.token_hex(6)}")
+            os.link(p, backup)
+        self.saved[p] = backup
+
+    def restore(self, owner):
+        """Put every path back as it was and reindex it; call under the locks."""
+        for p, backup in self.saved.items():
+            try:
+                if backup is None:
+                    p.unlink(missing_ok=True)
+                    metadataIndex.remove(p)
+                else:
+                    os.replace(backup, p)
+                    metadataIndex.record(p, owner=owner)
+            except OSError as e:
+                print(f"Error restoring {p}: {e}")
+        self.saved.clear()
+        self.discard()
+
+    def discard(self):
+        """Drop the originals still kept."""
+        for backup in self.saved.values():
+            if backup is not None:
+                backup.unlink(missing_ok=True)
+        self.saved.clear()
+        if self._dir is not None:
+            try:
+                self._dir.rmdir()
+            except OSError:
+                pass
+            self._dir = None
 
 
 class FileManager:
@@ -30,14 +126,55 @@ class FileManager:
             return
 
         p = resolve_secure_path(args.path or ".")
-        if p.is_dir():
-            for child in sorted(p.iterdir()):
-                stat = child.stat()
-                tag = "[DIR]" if child.is_dir() else "     "
-                print(f"{tag} {child.name:40} {stat.st_size:10}")
+        if not p.is_dir():
+            print("Not a directory:", p)
+            return
+        if args.unsorted and args.cursor is not None:
+            print("--cursor requires sorted output")
+            return
+
+        await asyncio.to_thread(self._list, p, args)
 
+    def _list(self, p, args):
+        if args.from_index:
+            query = (
+                metadataIndex.descendants if args.recursive else metadataIndex.children
+            )
+            limit = -1 if args.limit is None else args.limit + 1
+            self._print_listing_rows(query(p, args.cursor, limit), args)
+        elif args.recursive:
+            entries = walk_entries(p, args.workers or WALK_WORKERS)
+            self._print_listing(entries, args)
         else:
-            print("Not a directory:", p)
+            with os.scandir(p) as it:
+                self._print_listing(((e.name, e) for e in it), args)
+
+    def _print_listing(self, entries, args):
+        rows = ((name, *entry_info(entry)) for name, entry in entries)
+        if args.cursor is not None:
+            rows = (row for row in rows if row[0] > args.cursor)
+        if args.unsorted:
+            selected = rows
+        elif args.limit is not None:
+            selected = heapq.nsmallest(args.limit + 1, rows)
+        else:
+            selected = external_sorted(rows)
+        self._print_listing_rows(selected, args)
+
+    def _print_listing_rows(self, selected, args):
+        shown = 0
+        last = None
+        for name, is_dir, size in selected:
+            if args.limit is not None and shown >= args.limit:
+                if args.unsorted:
+                    print(f"... output truncated at {shown} entries")
+                else:
+                    print("Next cursor:", last)
+                break
+            tag = "[DIR]" if is_dir else "     "
+            print(f"{tag} {name:40} {size:10}")
+            shown += 1
+            last = name
 
     async def read(self, args):
         user = is_authenticated()
@@ -49,25 +186,77 @@ class FileManager:
         if not p.exists():
             print("File not found")
             return
-        if p.stat().st_size > MAX_UPLOAD_SIZE:
+        try:
+            size = blobStore.stored_size(p)
+        except ValueError as e:
+            print(e)
+            return
+        offset = args.offset or 0
+        if offset < 0 or (args.length is not None and args.length < 0):
+            print("Offset and length must be non-negative")
+            return
+        if offset > size:
+            print("Offset beyond end of file")
+            return
+        length = size - offset
+        if args.length is not None:
+            length = min(length, args.length)
+        if args.format in ("json", "xml"):
+            if offset or args.length is not None:
+                print("--offset/--length are not supported for json and xml")
+                return
+        elif args.format != "raw" and length > MAX_UPLOAD_SIZE:
             print("File too large")
             return
-        async with acquire_lock_for_path(p):
-            with open(p, "rb") as f:
-                data = f.read()
-            if args.format == "text":
-                print(data.decode(errors="replace"))
-            elif args.format == "json":
-                print(json.dumps(safe_load_json(data.decode()), indent=2))
-            elif args.format == "xml":
-                el = safe_load_xml(data.decode())
-                import xml.etree.ElementTree as ET
-
-                print(ET.tostring(el, encoding="unicode"))
-            else:
-                print(f"Binary file, {len(data)} bytes")
+        async with acquire_lock_for_path(p, shared=True):
+            await asyncio.to_thread(self._read, p, args, offset, length)
+
+    @staticmethod
+    def _read(p, args, offset, length):
+        with blobStore.open(p) as f:
+            if args.format == "raw":
+                sys.stdout.flush()
+                send_file_range(f, sys.stdout.buffer, offset, length)
+                return
+            if args.format == "binary":
+                print(f"Binary file, {length} bytes")
+                return
+            try:
+                if args.format == "json":
+                    dump_events(safe_iter_json(f, args.select or ""), sys.stdout)
+                    print()
+                    return
+                if args.format == "xml":
+                    if args.select:
+                        found = False
+                        for el in safe_iter_xml(f, args.select):
+                            el.tail = None
+                            print(xml_tostring(el, encoding="unicode"))
+                            found = True
+                        if not found:
+                            print("Path not found:", args.select)
+                    else:
+                        dump_xml(f, sys.stdout)
+                        print()
+                    return
+            except LookupError as e:
+                print(e)
+                return
+            except (ValueError, ParseError) as e:
+                # Whatever was printed before the error is left as it is.
+                print()
+                print(f"Invalid {args.format.upper()}: {e}")
+                return
+            f.seek(offset)
+            data = f.read(length)
+        print(data.decode(errors="replace"))
 
     async def write(self, args):
+        from src.blobs.accessor import blobAccessor
+        from src.core.databaseAccessor import db
+        from src.files.accessor import fileAccessor
+        from src.usage.accessor import usageAccessor
+
         user = is_authenticated()
         if not user:
             print("Not authenticated")
@@ -76,47 +265,223 @@ class FileManager:
         p = resolve_secure_path(args.path)
         ensure_valid_filename(p.name)
         file_name = p.name
-        file = await fileAccessor.fetch_by_name(file_name)
-        if file and file.user_id != user:
+        file = await fileAccessor.fetch_by_name(file_name, user)
+        if not file and await fileAccessor.fetch_all_by_name(file_name):
             print("Permission denied: you can only modify your own files")
             return
 
+        # The quota is checked before any data is read: the stream is capped at
+        # what is left of it, and a source file that cannot fit is refused.
+        limit = MAX_STREAM_UPLOAD_SIZE if args.stream else MAX_UPLOAD_SIZE
+        room = await usageAccessor.room(user, file.file_size if file else 0)
+        quota_bound = room is not None and room < limit
+        if quota_bound:
+            limit = room
+
         if args.from_file:
             src = Path(args.from_file)
             if not src.exists():
                 print("Source file not found")
                 return
-            data = src.read_bytes()
+            source = open(src, "rb")
+            size = os.fstat(source.fileno()).st_size
+            if quota_bound and size > room:
+                source.close()
+                print(f"Quota exceeded: {size} bytes, {room} available")
+                return
         else:
-            data = sys.stdin.buffer.read()
+            source = sys.stdin.buffer
+            size = None
+
+        undo = FileUndo()
+        try:
+            # Held until the row is saved, so that a failed save can put back
+            # exactly what this write replaced.
+            async with acquire_lock_for_path(p):
+                # Looked up again under the lock: the file may have been
+                # recorded meanwhile, e.g. by watch, and is then updated.
+                file = await fileAccessor.fetch_by_name(file_name, user)
+                if not file and await fileAccessor.fetch_all_by_name(file_name):
+                    print("Permission denied: you can only modify your own files")
+                    return
+                undo.keep(p)
+                try:
+                    if args.delta and not (args.dedup or STORAGE_BACKEND == "dedup"):
+                        stored = await asyncio.to_thread(
+                            self.store_delta, p, source, limit, args.compress
+                        )
+                    else:
+                        stored = await asyncio.to_thread(
+                            self.store_content,
+                            p,
+                            source,
+                            limit,
+                            args.dedup,
+                            size,
+                            args.compress,
+                        )
+                except PayloadTooLarge as e:
+                    print(
+                        f"Quota exceeded: {room} bytes available" if quota_bound else e
+                    )
+                    return
+                except ValueError as e:
+                    print(e)
+                    return
+                if stored is None:
+                    print("Unchanged:", p)
+                    return
 
-        if len(data) > MAX_UPLOAD_SIZE:
-            print("Data too large")
+                file_size, digest, new_blocks, old_blocks = stored
+                physical_size = blobStore.physical_size(p)
+                print("Wrote:", p)
+                print(f"Size: {file_size} bytes, sha256: {digest}")
+                if physical_size < file_size:
+                    print(f"Stored compressed: {physical_size} bytes")
+                metadataIndex.record(p, owner=user, sha256=digest)
+                try:
+                    async with db.session():
+                        await blobAccessor.add_refs(new_blocks)
+                        freed = await blobAccessor.release(old_blocks)
+                        await self.save_file_metadata(
+                            file, file_name, file_size, user, physical_size, digest
+                        )
+                except Exception as e:
+                    print("Error saving metadata:", e)
+                    undo.restore(user)
+                    await self.discard_blocks(new_blocks)
+                    return
+                await self.index_text([p])
+        finally:
+            undo.discard()
+            if source is not sys.stdin.buffer:
+                source.close()
+        blobStore.remove_blobs(freed)
+
+    @staticmethod
+    async def discard_blocks(blocks):
+        """Remove the blobs of blocks that no file took a reference to.
+
+        Used after the metadata of a write that stored them failed to save.
+        """
+        from src.blobs.accessor import blobAccessor
+        from src.core.databaseAccessor import db
+
+        try:
+            async with db.session():
+                unused = await blobAccessor.unreferenced(h for h, _ in blocks)
+        except Exception as e:
+            print("Error removing unused blocks:", e)
             return
-
-        async with acquire_lock_for_path(p):
+        blobStore.remove_blobs(unused)
+
+    @staticmethod
+    async def index_text(paths):
+        """Bring the text index up to date for paths, in a worker thread.
+
+        Called once the metadata is saved. A failure only leaves the index
+        stale until ``search --reindex``, so it is reported, not raised.
+        """
+        try:
+            await asyncio.to_thread(textIndex.update_many, paths)
+        except Exception as e:
+            print("Error updating text index:", e)
+
+    def store_content(
+        self,
+        p: Path,
+        source,
+        limit: int,
+        dedup: bool = False,
+        size=None,
+        compress=None,
+    ):
+        """Write source to p, plain, compressed or as a blob manifest.
+
+        Blocking and thread-safe. size, when known, is used to preallocate
+        the file. compress names a codec (or "none"); by default the
+        COMPRESSION policy decides, and dedup takes precedence over both.
+        Returns (size, sha256, new blocks, replaced blocks), or None when a
+        deduplicated write matches what is already stored.
+        """
+        codec = codec_for(p, compress)
+        old_blocks = blobStore.manifest_blocks(p)
+        if dedup or STORAGE_BACKEND == "dedup":
+            with batched_dir_sync():
+                created = []
+                manifest = blobStore.write_blocks(source, limit, created)
+                if old_blocks and manifest["blocks"] == old_blocks:
+                    return None
+                try:
+                    with AtomicWriter(p, "wb") as f:
+                        blobStore.write_manifest(f, manifest)
+                except BaseException:
+                    blobStore.remove_blobs(created)
+                    raise
+            return manifest["size"], manifest["sha256"], manifest["blocks"], old_blocks
+        if codec:
             with AtomicWriter(p, "wb") as f:
-                f.write(data)
+                file_size, digest = compress_stream(source, f, codec, limit)
+            return file_size, digest, [], old_blocks
+        size = size if size is not None and size <= limit else None
+        with AtomicWriter(p, "wb", size=size) as f:
+            file_size, digest = copy_stream(source, f, limit)
+        return file_size, digest, [], old_blocks
+
+    def store_delta(self, p: Path, source, limit: int, compress=None):
+        """Like store_content, but reuse the blocks p already has (rsync-style).
+
+        Matching blocks are copied from the stored file instead of rewritten.
+        Missing, deduplicated and compressed files are written normally.
+        """
+        if (
+            not p.is_file()
+            or not blobStore.is_plain(p)
+            or codec_for(p, compress) is not None
+        ):
+            return self.store_content(p, source, limit, compress=compress)
+        with open(p, "rb") as old, AtomicWriter(p, "wb") as f:
+            file_size, digest, reused, signature = deltaWriter.write(
+                p, old.fileno(), source, f.fileno(), limit
+            )
+        signature.stat_key = Signature.key_of(p.stat())
+        signatureCache.put(p, signature)
+        print(f"Delta: reused {reused} of {file_size} bytes")
+        return file_size, digest, [], []
+
+    async def save_file_metadata(
+        self, file, file_name, file_size, user, physical_size=None, checksum=None
+    ):
+        from src.files.accessor import fileAccessor
+        from src.files.files import Files
+        from src.operations.audit import auditLog
 
-        print("Wrote:", p)
-        file_size = p.stat().st_size
         if file:
-            file = await fileAccessor.update(file_size, file_name)
+            file = await fileAccessor.update(
+                file_size, file_name, user, physical_size, checksum
+            )
             if file:
-                operation = Operations(
-                    type=OperationType.UPDATE, file_id=file.id, user_id=user
-                )
-                await operationsAccessor.create(operation)
+                auditLog.record(OperationType.UPDATE, file.id, user)
         else:
-            file_in = Files(file_name=file_name, file_size=file_size, user_id=user)
+            file_in = Files(
+                file_name=file_name,
+                file_size=file_size,
+                physical_size=physical_size,
+                checksum=checksum,
+                user_id=user,
+            )
             file = await fileAccessor.create(file_in)
             if file:
-                operation = Operations(
-                    type=OperationType.CREATE, file_id=file.id, user_id=user
-                )
-                await operationsAccessor.create(operation)
+                auditLog.record(OperationType.CREATE, file.id, user)
+        return file
 
     async def delete(self, args):
+        from src.blobs.accessor import blobAccessor
+        from src.core.databaseAccessor import db
+        from src.files.accessor import fileAccessor
+        from src.operations.accessor import operationsAccessor
+        from src.operations.operations import Operations
+
         user = is_authenticated()
         if not user:
             print("Not authenticated")
@@ -130,7 +495,7 @@ class FileManager:
         async with acquire_lock_for_path(p):
             try:
                 file_name = p.name
-                files = await fileAccessor.fetch_by_name(file_name)
+                files = await fileAccessor.fetch_all_by_name(file_name)
 
                 if not files:
                     print("No file records found in DB")
@@ -140,19 +505,188 @@ class FileManager:
                     print("Permission denied: you can only delete your own files")
                     return
 
-                for file in files_to_delete:
-                    operation = Operations(
-                        type=OperationType.DELETE, file_id=file.id, user_id=user
+                blocks = blobStore.manifest_blocks(p)
+                async with db.session():
+                    await operationsAccessor.create_many(
+                        Operations(
+                            type=OperationType.DELETE, file_id=file.id, user_id=user
+                        )
+                        for file in files_to_delete
                     )
-                    await operationsAccessor.create(operation)
-                await fileAccessor.delete(file_name, user_id=user)
+                    await fileAccessor.delete(file_name, user_id=user)
+                    freed = await blobAccessor.release(blocks)
 
                 os.remove(p)
+                blobStore.remove_blobs(freed)
+                metadataIndex.remove(p)
+                await self.index_text([p])
                 print("Deleted", p)
 
             except Exception as e:
                 print("Error deleting file:", e)
 
+    async def copy(self, args):
+        from src.blobs.accessor import blobAccessor
+        from src.core.databaseAccessor import db
+        from src.files.accessor import fileAccessor
+        from src.files.files import Files
+        from src.operations.accessor import operationsAccessor
+        from src.operations.operations import Operations
+        from src.usage.accessor import usageAccessor
+
+        user = is_authenticated()
+        if not user:
+            print("Not authenticated")
+            return
+
+        src = resolve_secure_path(args.src)
+        dst = resolve_secure_path(args.dst)
+        ensure_valid_filename(dst.name)
+        if not src.is_file():
+            print("Source not found")
+            return
+        rows = await fileAccessor.fetch_all_by_name(dst.name)
+        own = next((f for f in rows if f.user_id == user), None)
+        # The copy has the same content, so it inherits the source's checksum
+        # when the source's rows agree on one.
+        checksums = {f.checksum for f in await fileAccessor.fetch_all_by_name(src.name)}
+        checksum = checksums.pop() if len(checksums) == 1 else None
+        if rows and own is None:
+            print("Permission denied: you can only modify your own files")
+            return
+        room = await usageAccessor.room(user, own.file_size if own else 0)
+        if room is not None and blobStore.stored_size(src) > room:
+            print(f"Quota exceeded: {room} bytes available")
+            return
+
+        async with acquire_locks_for_paths([(src, True), (dst, False)]):
+            if dst.exists():
+                print("Destination already exists")
+                return
+            try:
+                method = await asyncio.to_thread(self._copy_file, src, dst)
+            except OSError as e:
+                print("Error copying file:", e)
+                return
+            blocks = blobStore.manifest_blocks(dst)
+            size = blobStore.stored_size(dst)
+            physical_size = blobStore.physical_size(dst)
+            try:
+                async with db.session():
+                    await blobAccessor.add_refs(blocks)
+                    if own:
+                        files = await fileAccessor.update_many(
+                            {dst.name: (size, physical_size, checksum)}, user
+                        )
+                        op_type = OperationType.UPDATE
+                    else:
+                        files = await fileAccessor.create_many(
+                            [
+                                Files(
+                                    file_name=dst.name,
+                                    file_size=size,
+                                    physical_size=physical_size,
+                                    checksum=checksum,
+                                    user_id=user,
+                                )
+                            ]
+                        )
+                        op_type = OperationType.CREATE
+                    await operationsAccessor.create_many(
+                        Operations(type=op_type, file_id=f.id, user_id=user)
+                        for f in files
+                    )
+            except Exception as e:
+                dst.unlink(missing_ok=True)
+                print("Error saving metadata:", e)
+                return
+
+        metadataIndex.record(dst, owner=user)
+        await self.index_text([dst])
+        print(f"Copied {src} -> {dst} ({size} bytes, {method})")
+
+    @staticmethod
+    def _copy_file(src: Path, dst: Path) -> str:
+        with open(src, "rb") as s, AtomicWriter(dst, "wb") as d:
+            method = clone_file(s.fileno(), d.fileno())
+            copy_stored_format(s.fileno(), d.fileno())
+            return method
+
+    async def move(self, args):
+        from src.core.databaseAccessor import db
+        from src.files.accessor import fileAccessor
+        from src.operations.accessor import operationsAccessor
+        from src.operations.operations import Operations
+
+        user = is_authenticated()
+        if not user:
+            print("Not authenticated")
+            return
+
+        src = resolve_secure_path(args.src)
+        dst = resolve_secure_path(args.dst)
+        ensure_valid_filename(dst.name)
+        if not src.is_file():
+            print("Source not found")
+            return
+        rows = await fileAccessor.fetch_all_by_name(src.name)
+        own = next((f for f in rows if f.user_id == user), None)
+        if own is None:
+            print("Permission denied: you can only move your own files")
+            return
+        stale = None
+        if dst.name != src.name:
+            rows = await fileAccessor.fetch_all_by_name(dst.name)
+            stale = next((f for f in rows if f.user_id == user), None)
+            if rows and stale is None:
+                print("Permission denied: you can only modify your own files")
+                return
+
+        async with acquire_locks_for_paths([(src, False), (dst, False)]):
+            if dst.exists():
+                print("Destination already exists")
+                return
+            try:
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                os.rename(src, dst)
+            except OSError as e:
+                if e.errno == errno.EXDEV:
+                    print("Cannot move across filesystems; use copy and delete")
+                else:
+                    print("Error moving file:", e)
+                return
+            try:
+                async with db.session():
+                    if stale:
+                        # A record left behind for a name that is no longer on disk.
+                        await fileAccessor.delete(dst.name, user_id=user)
+                    file = own
+                    if dst.name != src.name:
+                        file = await fileAccessor.rename(src.name, dst.name, user)
+                    await operationsAccessor.create_many(
+                        [
+                            Operations(
+                                type=OperationType.UPDATE, file_id=file.id, user_id=user
+                            )
+                        ]
+                    )
+            except Exception as e:
+                os.rename(dst, src)
+                print("Error saving metadata:", e)
+                return
+            if DURABILITY == "full":
+                fsync_dir(dst.parent)
+                if src.parent != dst.parent:
+                    fsync_dir(src.parent)
+
+        metadataIndex.remove(src)
+        metadataIndex.record(dst, owner=user)
+        try:
+            await asyncio.to_thread(textIndex.rename, src, dst)
+        except Exception as e:
+            print("Error updating text index:", e)
+        print(f"Moved {src} -> {dst}")
+
     async def create_zip(self, args):
         user = is_authenticated()
         if not user:
@@ -168,21 +702,56 @@ class FileManager:
             print("Source not found")
             return
 
-        with zipfile.ZipFile(dst, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-            nfiles = 0
-            for root, dirs, files in os.walk(src):
-                for fname in files:
-                    full = Path(root) / fname
-                    rel = full.relative_to(src)
-                    if full.stat().st_size > MAX_UPLOAD_SIZE:
-                        raise ValueError(f"File {full} too large to include")
-                    zf.write(full, arcname=str(rel))
-                    nfiles += 1
-                    if nfiles > ZIP_MAX_FILES:
-                        raise ValueError("Too many files to archive")
-        with zipfile.ZipFile(dst, "r") as zf:
-            inspect_zip_safety(zf)
-        print("Created zip", dst)
+        members = []
+        for root, dirs, files in os.walk(src):
+            for fname in files:
+                full = Path(root) / fname
+                if blobStore.stored_size(full) > MAX_UPLOAD_SIZE:
+                    print(f"File {full} too large to include")
+                    return
+                members.append((full, str(full.relative_to(src))))
+                if len(members) > ZIP_MAX_FILES:
+                    print("Too many files to archive")
+                    return
+
+        workers = max(1, args.workers or ZIP_WORKERS)
+        budget = ZipBudget()
+
+        def append_next(pending, zf):
+            zinfo, payload = pending.popleft().result()
+            budget.add(zinfo.filename, zinfo.file_size, zinfo.compress_size)
+            zf.add(zinfo, payload)
+
+        try:
+            with AtomicWriter(dst, "wb") as fh, ZipArchiveWriter(fh) as zf:
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    pending = deque()
+                    try:
+                        for full, arcname in members:
+                            pending.append(
+                                pool.submit(
+                                    deflate_zip_member,
+                                    full,
+                                    arcname,
+                                    blobStore.read_bytes,
+                                )
+                            )
+                            if len(pending) >= 2 * workers:
+                                append_next(pending, zf)
+                        while pending:
+                            append_next(pending, zf)
+                    except BaseException:
+                        for future in pending:
+                            future.cancel()
+                        raise
+        except ValueError as e:
+            print("Refusing to create zip:", e)
+            return
+        metadataIndex.record(dst, owner=user)
+        print(
+            f"Created zip {dst}: {budget.files} files, "
+            f"{budget.uncompressed} -> {budget.compressed} bytes"
+        )
 
     async def extract_zip(self, args):
         user = is_authenticated()
@@ -195,6 +764,7 @@ class FileManager:
         if not zipp.exists():
             print("Zip not found")
             return
+        members = []
         with zipfile.ZipFile(zipp, "r") as zf:
             try:
                 inspect_zip_safety(zf)
@@ -210,10 +780,78 @@ class FileManager:
                 if not str(target).startswith(str(outdir)):
                     print("Unsafe entry in zip (path traversal):", info.filename)
                     return
-            zf.extractall(path=outdir)
-        print("Extracted zip to", outdir)
+                members.append((info, target))
+
+        # Directories this extraction creates, removed again if it fails.
+        new_dirs = set()
+        for info, target in members:
+            d = target if info.is_dir() else target.parent
+            while (d == outdir or outdir in d.parents) and not d.exists():
+                new_dirs.add(d)
+                d = d.parent
+
+        workers = max(1, args.workers or ZIP_WORKERS)
+        budget = ExtractBudget()
+        local = threading.local()
+        handles = []
+        created = []
+
+        def extract(info, target):
+            zf = getattr(local, "zf", None)
+            if zf is None:
+                zf = local.zf = zipfile.ZipFile(zipp, "r")
+                handles.append(zf)
+            existed = target.exists()
+            extract_zip_member(zf, info, target, budget)
+            if not existed and not info.is_dir():
+                created.append(target)
+
+        try:
+            with batched_dir_sync(), ThreadPoolExecutor(max_workers=workers) as pool:
+                # One copy per task: a Context can only be entered by one
+                # thread at a time. Each copy still shares the _DirSyncs.
+                futures = [
+                    pool.submit(contextvars.copy_context().run, extract, *m)
+                    for m in members
+                ]
+                try:
+                    for future in futures:
+                        future.result()
+                except BaseException:
+                    budget.cancelled.set()
+                    for future in futures:
+                        future.cancel()
+                    raise
+        except BaseException as e:
+            for target in created:
+                target.unlink(missing_ok=True)
+            for d in sorted(new_dirs, key=lambda d: len(d.parts), reverse=True):
+                try:
+                    d.rmdir()
+                except OSError:
+                    pass
+            if isinstance(e, (ValueError, zipfile.BadZipFile)):
+                print("Refusing to extract zip:", e)
+                return
+            if isinstance(e, OSError):
+                print("Error extracting zip:", e)
+                return
+            raise
+        finally:
+            for zf in handles:
+                zf.close()
+        for info, target in members:
+            metadataIndex.record(target, owner=user)
+        await self.index_text([target for _, target in members])
+        print(
+            f"Extracted zip to {outdir}: {len(members)} entries, {budget.total} bytes"
+        )
 
     async def create_file(self, args):
+        from src.blobs.accessor import blobAccessor
+        from src.core.databaseAccessor import db
+        from src.usage.accessor import usageAccessor
+
         user = is_authenticated()
         if not user:
             print("Not authenticated")
@@ -227,38 +865,125 @@ class FileManager:
             return
 
         data = (args.content or "").encode()
+        room = await usageAccessor.room(user)
+        if room is not None and len(data) > room:
+            print(f"Quota exceeded: {room} bytes available")
+            return
 
-        lock = acquire_lock_for_path(p)
-        async with lock:
-            with AtomicWriter(p, mode="wb") as fh:
-                fh.write(data)
+        undo = FileUndo()
+        try:
+            # Held until the row is saved, as in write.
+            async with acquire_lock_for_path(p):
+                if p.exists():
+                    print("Error: file already exists.")
+                    return
+                undo.keep(p)
+                try:
+                    _, digest, blocks, _ = await asyncio.to_thread(
+                        self.store_content,
+                        p,
+                        io.BytesIO(data),
+                        len(data),
+                        args.dedup,
+                        len(data),
+                        args.compress,
+                    )
+                except ValueError as e:
+                    print(e)
+                    return
 
+                metadataIndex.record(p, owner=user, sha256=digest)
+                try:
+                    async with db.session():
+                        await blobAccessor.add_refs(blocks)
+                        await self.save_file_metadata(
+                            None,
+                            p.name,
+                            len(data),
+                            user,
+                            blobStore.physical_size(p),
+                            digest,
+                        )
+                except Exception as e:
+                    print("Error saving metadata:", e)
+                    undo.restore(user)
+                    await self.discard_blocks(blocks)
+                    return
+                await self.index_text([p])
+        finally:
+            undo.discard()
         print(f"Created file: {p}")
-        file_name = p.name
-        file_size = p.stat().st_size
-        file_in = Files(file_name=file_name, file_size=file_size, user_id=user)
-        file = await fileAccessor.create(file_in)
-        if file:
-            operation = Operations(
-                type=OperationType.CREATE, file_id=file.id, user_id=user
-            )
-            await operationsAccessor.create(operation)
 
-    async def show_logs(self, args=None):
+    async def index(self, args):
         user = is_authenticated()
         if not user:
             print("Not authenticated")
+            return
 
-        operations = await operationsAccessor.fetch_all()
+        if args.action == "refresh":
+            changed, removed = metadataIndex.refresh(args.workers)
+            print(f"Index refreshed: {changed} updated, {removed} removed")
+        elif args.action == "stats":
+            p = resolve_secure_path(args.name or ".")
+            count, total = metadataIndex.stats(p)
+            print(f"{p}: {count} files, {total} bytes")
+        else:
+            if not args.name:
+                print("find requires a file name")
+                return
+            found = False
+            for path, size, mtime_ns, owner, sha256 in metadataIndex.lookup(args.name):
+                print(f"{path:40} {size:10} owner={owner} sha256={sha256}")
+                found = True
+            if not found:
+                print("No indexed files named", args.name)
 
-        if not operations:
-            print("No operations found")
+    async def show_logs(self, args=None):
+        from src.operations.accessor import operationsAccessor
+
+        user = is_authenticated()
+        if not user:
+            print("Not authenticated")
+            return
+
+        if args.limit is not None and args.limit < 1:
+            print("Limit must be positive")
             return
 
-        for op in operations:
-            timestamp = op.created_at.strftime("%d.%m.%y %H:%M")
-            file_name = getattr(op.file, "file_name", "unknown")
-            print(f"{timestamp} - {op.type} {file_name} by {op.user.username}")
+        after = None
+        if args.cursor:
+            try:
+                created_at, _, op_id = args.cursor.rpartition(",")
+                after = (datetime.fromisoformat(created_at), int(op_id))
+            except ValueError:
+                print("Invalid cursor:", args.cursor)
+                return
+
+        rows = operationsAccessor.stream_logs(
+            username=args.user,
+            type=args.type,
+            since=args.since,
+            until=args.until,
+            file_name=args.file,
+            after=after,
+            limit=args.limit + 1 if args.limit is not None else None,
+        )
+        count = 0
+        last = None
+        # Closed explicitly so that stopping early releases the cursor and
+        # its session right away, not whenever the generator is collected.
+        async with contextlib.aclosing(rows):
+            async for created_at, op_id, op_type, file_name, username in rows:
+                if count == args.limit:
+                    print(f"Next cursor: {last[0].isoformat()},{last[1]}")
+                    break
+                timestamp = created_at.strftime("%d.%m.%y %H:%M")
+                print(f"{timestamp} - {op_type} {file_name} by {username}")
+                count += 1
+                last = (created_at, op_id)
+
+        if not count:
+            print("No operations found")
 
 
 fileManager = FileManager()
@@ -0,0 +1,329 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from src.cli import (
+    BASE_DIR,
+    STATE_DIR,
+    STREAM_CHUNK_SIZE,
+    WALK_WORKERS,
+    resolve_secure_path,
+    walk_entries,
+)
+from src.core.auth import is_authenticated
+from src.core.config import config
+
+VERIFY_STATE_PATH = Path(
+    getattr(config.static, "VERIFY_STATE_PATH", STATE_DIR / "verify.sqlite3")
+)
+VERIFY_WORKERS = getattr(config.static, "VERIFY_WORKERS", os.cpu_count() or 1)
+# Bytes per second across all workers; None reads as fast as the disks allow.
+VERIFY_BANDWIDTH = getattr(config.static, "VERIFY_BANDWIDTH", None)
+VERIFY_NICE = getattr(config.static, "VERIFY_NICE", 10)
+VERIFY_BATCH_FILES = 256
+VERIFY_BATCH_BYTES = 64 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS verified (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    checksum TEXT NOT NULL
+);
+"""
+
+
+def _like_prefix(rel: str) -> str:
+    escaped = rel.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "/%"
+
+
+def _advise(f, advice: str):
+    """posix_fadvise the whole of f's file, where the platform allows it."""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        os.posix_fadvise(f.fileno(), 0, 0, getattr(os, advice))
+    except OSError:
+        # Manifest and compressed readers have no single file descriptor.
+        pass
+
+
+def _init_worker():
+    # Without an explicit I/O class the kernel derives a process's I/O
+    # priority from its nice value, so live requests are served first.
+    if VERIFY_NICE:
+        try:
+            os.nice(VERIFY_NICE)
+        except OSError:
+            pass
+
+
+def hash_files(files, rate: float | None):
+    """SHA-256 of the logical content of files, a list of (path, label).
+
+    Runs in a worker process, reading at most ``rate`` bytes per second when
+    given. Pages read are dropped from the page cache afterwards so a full
+    pass does not evict the working set. Returns (label, size, sha256, error)
+    tuples; sha256 is None when the file could not be read.
+    """
+    from src.blobs.store import blobStore
+
+    started = time.monotonic()
+    total = 0
+    results = []
+    for path, label in files:
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with blobStore.open(Path(path)) as f:
+                _advise(f, "POSIX_FADV_SEQUENTIAL")
+                while chunk := f.read(STREAM_CHUNK_SIZE):
+                    digest.update(chunk)
+                    size += len(chunk)
+                    total += len(chunk)
+                    if rate:
+                        ahead = total / rate - (time.monotonic() - started)
+                        if ahead > 0:
+                            time.sleep(ahead)
+                _advise(f, "POSIX_FADV_DONTNEED")
+        except (OSError, ValueError) as e:
+            results.append((label, size, None, str(e)))
+            continue
+        results.append((label, size, digest.hexdigest(), None))
+    return results
+
+
+class VerifyState:
+    """Size, mtime and inode of each file when it last verified, in SQLite.
+
+    A file whose stat still matches, and whose recorded checksum is still the
+    one it verified against, is not read again.
+    """
+
+    def __init__(self, path: Path = VERIFY_STATE_PATH):
+        self.path = path
+        self._conn: sqlite3.Connection | None = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Used from whichever worker thread the command runs in.
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def load(self, rel_root: str) -> dict:
+        """Map each path under rel_root to (size, mtime_ns, inode, checksum)."""
+        if rel_root:
+            where = "path LIKE ? ESCAPE '\\'"
+            params = (_like_prefix(rel_root),)
+        else:
+            where, params = "1", ()
+        return {
+            row[0]: row[1:]
+            for row in self.conn.execute(
+                "SELECT path, size, mtime_ns, inode, checksum "
+                f"FROM verified WHERE {where}",
+                params,
+            )
+        }
+
+    def save(self, verified, forget):
+        """Store (path, size, mtime_ns, inode, checksum) rows, drop paths."""
+        with self.conn as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO verified VALUES (?, ?, ?, ?, ?)", verified
+            )
+            conn.executemany(
+                "DELETE FROM verified WHERE path = ?", ((p,) for p in forget)
+            )
+
+
+verifyState = VerifyState()
+
+
+class VerifyManager:
+    """Rehashes stored files and compares them with the recorded checksums.
+
+    Files are matched to their rows by name, walked in parallel and hashed
+    in batches by a pool of low-priority worker processes, with an optional
+    bandwidth cap shared between them. Files unchanged since they last
+    verified are skipped unless --all is given.
+    """
+
+    async def verify(self, args):
+        from src.files.accessor import fileAccessor
+
+        user = is_authenticated()
+        if not user:
+            print("Not authenticated")
+            return
+
+        p = resolve_secure_path(args.path or ".")
+        if not p.is_dir():
+            print("Not a directory:", p)
+            return
+        if args.bandwidth is not None and args.bandwidth <= 0:
+            print("--bandwidth must be positive")
+            return
+        rate = args.bandwidth * 1024 * 1024 if args.bandwidth else VERIFY_BANDWIDTH
+
+        expected = {}
+        unrecorded = {}
+        for row_id, name, owner, checksum in await fileAccessor.fetch_checksums():
+            checks = expected.setdefault(name, set())
+            if checksum is not None:
+                checks.add(checksum)
+            elif owner == user:
+                unrecorded[name] = row_id
+        if not args.record:
+            unrecorded = {}
+
+        started = time.perf_counter()
+        counts, recorded = await asyncio.to_thread(
+            self._run, p, expected, unrecorded, rate, args
+        )
+        elapsed = time.perf_counter() - started
+        if recorded:
+            await fileAccessor.set_checksums(
+                {unrecorded[name]: digest for name, digest in recorded.items()}
+            )
+            print(f"Recorded {len(recorded)} checksums")
+        rate_mb = counts["bytes"] / (1024 * 1024) / elapsed if elapsed else 0
+        print(
+            f"{counts['ok']} verified, {counts['mismatched']} mismatched, "
+            f"{counts['failed']} unreadable, {counts['unchanged']} unchanged, "
+            f"{counts['unrecorded']} without checksum, "
+            f"{counts['untracked']} untracked in {elapsed:.2f}s ({rate_mb:.1f} MB/s)"
+        )
+
+    def _run(self, root, expected, unrecorded, rate, args):
+        rel_root = root.relative_to(BASE_DIR).as_posix()
+        rel_root = "" if rel_root == "." else rel_root
+        known = verifyState.load(rel_root)
+        counts = dict.fromkeys(
+            ("ok", "mismatched", "failed", "unchanged", "unrecorded", "untracked"),
+            0,
+        )
+        counts["bytes"] = 0
+        stats = {}
+        seen = set()
+
+        def candidates():
+            """(path, label, size) of the files that need hashing."""
+            for rel, entry in walk_entries(root, args.workers or WALK_WORKERS):
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                label = f"{rel_root}/{rel}" if rel_root else rel
+                seen.add(label)
+                if entry.name not in expected:
+                    counts["untracked"] += 1
+                    continue
+                if not expected[entry.name] and entry.name not in unrecorded:
+                    counts["unrecorded"] += 1
+                    continue
+                st = entry.stat(follow_symlinks=False)
+                key = (st.st_size, st.st_mtime_ns, st.st_ino)
+                last = known.get(label)
+                if (
+                    not args.all
+                    and last is not None
+                    and last[:3] == key
+                    and last[3] in expected[entry.name]
+                ):
+                    counts["unchanged"] += 1
+                    continue
+                stats[label] = key
+                yield entry.path, label, st.st_size
+
+        verified, forget = [], []
+        recorded = {}
+        conflicting = set()
+        files = candidates()
+        try:
+            for label, size, digest, error in self._hash(files, rate, args):
+                name = label.rpartition("/")[2]
+                checks = expected[name]
+                counts["bytes"] += size
+                if digest is None:
+                    counts["failed"] += 1
+                    print(f"Unreadable: {label}: {error}")
+                    forget.append(label)
+                elif checks and digest not in checks:
+                    counts["mismatched"] += 1
+                    print(
+                        f"Mismatch: {label}: sha256 {digest}, "
+                        f"recorded {', '.join(sorted(checks))}"
+                    )
+                    forget.append(label)
+                else:
+                    counts["ok"] += 1
+                    verified.append((name, (label, *stats[label], digest)))
+                    if name in unrecorded:
+                        if recorded.setdefault(name, digest) != digest:
+                            conflicting.add(name)
+        finally:
+            files.close()
+        forget += [label for label in known if label not in seen]
+        for name in conflicting:
+            del recorded[name]
+        # Drop files that only matched a checksum that is not recorded after all.
+        verified = [
+            row
+            for name, row in verified
+            if row[4] in expected[name] or name in recorded
+        ]
+        verifyState.save(verified, forget)
+        return counts, recorded
+
+    @staticmethod
+    def _hash(files, rate, args):
+        """Hash files in a process pool, yielding results as batches finish."""
+        workers = max(1, args.workers or VERIFY_WORKERS)
+        worker_rate = rate / workers if rate else None
+        pending = set()
+        # forkserver: the walk's threads are running, so don't fork this process.
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("forkserver"),
+            initializer=_init_worker,
+        )
+        try:
+            exhausted = False
+            while True:
+                # Keep two batches per worker queued so none of them idles.
+                while not exhausted and len(pending) < 2 * workers:
+                    batch = []
+                    batch_bytes = 0
+                    for path, label, size in files:
+                        batch.append((path, label))
+                        batch_bytes += size
+                        if (
+                            len(batch) >= VERIFY_BATCH_FILES
+                            or batch_bytes >= VERIFY_BATCH_BYTES
+                        ):
+                            break
+                    else:
+                        exhausted = True
+                    if batch:
+                        pending.add(pool.submit(hash_files, batch, worker_rate))
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+verifyManager = VerifyManager()
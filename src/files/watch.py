@@ -0,0 +1,490 @@
+import asyncio
+import errno
+import itertools
+import os
+import signal
+import stat
+from collections import defaultdict
+from pathlib import Path
+
+from src.blobs.store import blobStore
+from src.cli import (
+    BASE_DIR,
+    WALK_WORKERS,
+    acquire_locks_for_paths,
+    ensure_valid_filename,
+    walk_entries,
+)
+from src.core.auth import is_authenticated
+from src.core.config import config
+from src.core.databaseAccessor import db
+from src.files.accessor import fileAccessor
+from src.files.files import Files
+from src.files.index import metadataIndex
+from src.files.inotify import (
+    IN_CLOSE_WRITE,
+    IN_CREATE,
+    IN_DELETE,
+    IN_DELETE_SELF,
+    IN_EXCL_UNLINK,
+    IN_IGNORED,
+    IN_ISDIR,
+    IN_MOVED_FROM,
+    IN_MOVED_TO,
+    IN_ONLYDIR,
+    IN_Q_OVERFLOW,
+    Inotify,
+)
+from src.files.manager import fileManager
+from src.files.verify import hash_files
+from src.operations.accessor import operationsAccessor
+from src.operations.enum import OperationType
+from src.operations.operations import Operations
+
+WATCH_DEBOUNCE = getattr(config.static, "WATCH_DEBOUNCE", 0.5)
+WATCH_MAX_DELAY = getattr(config.static, "WATCH_MAX_DELAY", 5.0)
+WATCH_BATCH_FILES = getattr(config.static, "WATCH_BATCH_FILES", 1000)
+
+_DIR_MASK = (
+    IN_CLOSE_WRITE
+    | IN_CREATE
+    | IN_DELETE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_DELETE_SELF
+    | IN_ONLYDIR
+    | IN_EXCL_UNLINK
+)
+
+
+class Watcher:
+    """Recursive inotify watch of a tree, collecting the paths that changed.
+
+    Events only mark paths dirty; what happened to a path is decided when the
+    batch is applied, by looking at it then. A burst of events on one file
+    (create, writes, rename over it) therefore costs one metadata change.
+    The exception is a file renamed within the tree: its two events are
+    paired by cookie and kept as a move, so the row can follow it.
+    """
+
+    def __init__(self, root: Path = BASE_DIR):
+        self.root = root
+        self.inotify = Inotify()
+        self.dirs: dict[int, Path] = {}
+        self.dirty: set[Path] = set()
+        # Destination -> source of files renamed within the tree.
+        self.moves: dict[Path, Path] = {}
+        # Cookie -> source of renames whose IN_MOVED_TO has not arrived yet.
+        self._moved_from: dict[int, Path] = {}
+        self.overflowed = False
+        self.stopped = False
+        self.changed = asyncio.Event()
+        self._limit_reported = False
+
+    def _add(self, path: Path):
+        try:
+            self.dirs[self.inotify.add_watch(path, _DIR_MASK)] = path
+        except OSError as e:
+            if e.errno == errno.ENOSPC:
+                if not self._limit_reported:
+                    print(
+                        "inotify watch limit reached, see fs.inotify.max_user_watches"
+                    )
+                    self._limit_reported = True
+            elif e.errno not in (errno.ENOENT, errno.ENOTDIR):
+                raise
+
+    def watch_tree(self, top: Path, mark: bool = False):
+        """Watch top and every directory below it; with mark, its files are dirty."""
+        self._add(top)
+        for _, entry in walk_entries(top, WALK_WORKERS):
+            if entry.is_dir(follow_symlinks=False):
+                self._add(Path(entry.path))
+            elif mark:
+                self.dirty.add(Path(entry.path))
+        if mark:
+            self.changed.set()
+
+    def _unwatch_tree(self, top: Path):
+        for wd, path in list(self.dirs.items()):
+            if path == top or top in path.parents:
+                self.inotify.rm_watch(wd)
+                del self.dirs[wd]
+
+    def reconcile(self):
+        """Mark the files that differ from the metadata index, after missed events."""
+        known = metadataIndex.file_stats()
+        self._add(self.root)
+        for rel, entry in walk_entries(self.root, WALK_WORKERS):
+            if entry.is_dir(follow_symlinks=False):
+                self._add(Path(entry.path))
+                continue
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            if known.pop(rel, None) != (st.st_size, st.st_mtime_ns):
+                self.dirty.add(Path(entry.path))
+        self.dirty.update(self.root / rel for rel in known)
+        self.changed.set()
+
+    def handle(self):
+        """Read the queued events; called by the event loop when there are some."""
+        for wd, mask, cookie, name in self.inotify.read():
+            if mask & IN_Q_OVERFLOW:
+                self.overflowed = True
+                continue
+            if mask & IN_IGNORED:
+                self.dirs.pop(wd, None)
+                continue
+            parent = self.dirs.get(wd)
+            if parent is None or not name:
+                continue
+            p = parent / name
+            if not mask & IN_ISDIR:
+                if mask & IN_MOVED_FROM:
+                    self._moved_from[cookie] = p
+                elif mask & IN_MOVED_TO and cookie in self._moved_from:
+                    self._moved(self._moved_from.pop(cookie), p)
+                else:
+                    self.dirty.add(p)
+            elif mask & (IN_CREATE | IN_MOVED_TO):
+                # Files may land in a new directory before it is watched.
+                self.watch_tree(p, mark=True)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self._unwatch_tree(p)
+                self.dirty.update(
+                    p / rel
+                    for rel, is_dir, _ in metadataIndex.descendants(p)
+                    if not is_dir
+                )
+        self.changed.set()
+
+    def _moved(self, src: Path, dst: Path):
+        # A file renamed again keeps its first name as the source.
+        src = self.moves.pop(src, src)
+        if src in self.dirty:
+            self.dirty.discard(src)
+            self.dirty.add(dst)
+        if dst in self.moves:
+            # Renamed over a file that was itself moved here.
+            self.dirty.add(self.moves.pop(dst))
+        if src == dst:
+            self.dirty.add(dst)
+        else:
+            self.moves[dst] = src
+
+    def take_moves(self) -> dict[Path, Path]:
+        """Remove and return the moves; renames out of the tree become dirty."""
+        self.dirty.update(self._moved_from.values())
+        self._moved_from.clear()
+        moves, self.moves = self.moves, {}
+        return moves
+
+    def take(self, limit: int) -> set[Path]:
+        """Remove and return up to limit of the dirty paths."""
+        paths = set(itertools.islice(self.dirty, limit))
+        self.dirty -= paths
+        return paths
+
+    def stop(self):
+        self.stopped = True
+        self.changed.set()
+
+    async def settled(self):
+        """Wait for changes, then until none arrive for WATCH_DEBOUNCE seconds.
+
+        Waits at most WATCH_MAX_DELAY after the first change, and no longer
+        once WATCH_BATCH_FILES paths are pending, so a steady stream of events
+        is still applied in bounded batches.
+        """
+        await self.changed.wait()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + WATCH_MAX_DELAY
+        while (
+            len(self.dirty) < WATCH_BATCH_FILES
+            and not self.overflowed
+            and not self.stopped
+        ):
+            self.changed.clear()
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(
+                    self.changed.wait(), min(WATCH_DEBOUNCE, remaining)
+                )
+            except TimeoutError:
+                break
+        self.changed.clear()
+
+
+class WatchManager:
+    """Keeps the files table in step with changes made to BASE_DIR by other
+    programs, from inotify events rather than periodic rescans.
+
+    New files are recorded as the watching user's; files that already have
+    rows are updated whoever owns them, and deleted files lose their rows.
+    Renamed files keep their rows, owners and history. Each batch is applied
+    with the bulk accessor statements in one transaction, falling back to one
+    file at a time if it fails. Paths are locked while they are synced, so a
+    file a CLI command is still writing is only looked at once it is done.
+    """
+
+    async def watch(self, args):
+        user = is_authenticated()
+        if not user:
+            print("Not authenticated")
+            return
+
+        try:
+            watcher = Watcher()
+        except OSError as e:
+            print("Cannot watch:", e)
+            return
+        loop = asyncio.get_running_loop()
+        with watcher.inotify:
+            watcher.watch_tree(BASE_DIR)
+            loop.add_reader(watcher.inotify.fd, watcher.handle)
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(sig, watcher.stop)
+            try:
+                print(f"Watching {len(watcher.dirs)} directories under {BASE_DIR}")
+                if args.scan:
+                    watcher.reconcile()
+                while True:
+                    await watcher.settled()
+                    if watcher.overflowed:
+                        print("Event queue overflowed, rescanning")
+                        watcher.overflowed = False
+                        watcher.reconcile()
+                    # Changes already collected are still applied after a stop.
+                    moves = watcher.take_moves()
+                    if moves:
+                        watcher.dirty.update(await self._move(moves, user))
+                    while watcher.dirty:
+                        await self._sync(watcher.take(WATCH_BATCH_FILES), user)
+                    if watcher.stopped:
+                        break
+            finally:
+                loop.remove_reader(watcher.inotify.fd)
+                for sig in (signal.SIGINT, signal.SIGTERM):
+                    loop.remove_signal_handler(sig)
+            print("Watch stopped")
+
+    async def _move(self, moves, user) -> set[Path]:
+        """Rename the rows of moved files; return the paths to sync instead.
+
+        A move is synced as a delete and a create when its file is no longer
+        where it went, the new name already has rows, the old name is still
+        in use, or its rows can't be renamed. Moves within one name need no
+        row change and are synced too, which finds nothing to do.
+        """
+        paths = {p for move in moves.items() for p in move}
+        async with acquire_locks_for_paths([(p, True) for p in paths]):
+            rows = defaultdict(list)
+            for f in await fileAccessor.fetch_by_names({p.name for p in paths}):
+                rows[f.file_name].append(f)
+            renames = []
+            names = set()
+            unapplied = set()
+            for dst, src in moves.items():
+                if (
+                    src.name == dst.name
+                    or not rows[src.name]
+                    or rows[dst.name]
+                    or {src.name, dst.name} & names
+                    or not dst.is_file()
+                    or dst.is_symlink()
+                    or os.path.lexists(src)
+                    or self._still_stored(src)
+                ):
+                    unapplied.update((src, dst))
+                    continue
+                try:
+                    ensure_valid_filename(dst.name)
+                except ValueError as e:
+                    print(f"Skipping {dst}: {e}")
+                    unapplied.add(src)
+                    continue
+                renames.append((src, dst))
+                names.update((src.name, dst.name))
+
+            if renames:
+                try:
+                    async with db.session():
+                        renamed = []
+                        for src, dst in renames:
+                            for f in rows[src.name]:
+                                f = await fileAccessor.rename(
+                                    src.name, dst.name, f.user_id
+                                )
+                                if f is not None:
+                                    renamed.append(f)
+                        await operationsAccessor.create_many(
+                            Operations(
+                                type=OperationType.UPDATE, file_id=f.id, user_id=user
+                            )
+                            for f in renamed
+                        )
+                except Exception as e:
+                    print("Error saving renames:", e)
+                    return paths
+                for src, dst in renames:
+                    f = rows[src.name][0]
+                    metadataIndex.remove(src)
+                    metadataIndex.record(dst, owner=f.user_id, sha256=f.checksum)
+                await fileManager.index_text([p for move in renames for p in move])
+                print(f"Renamed {len(renames)} files")
+        return unapplied
+
+    async def _sync(self, paths, user):
+        # Shared locks: a CLI command writing one of these paths saves its
+        # row before the file is looked at, and doesn't race this batch's.
+        async with acquire_locks_for_paths([(p, True) for p in paths]):
+            await self._sync_locked(paths, user)
+
+    async def _sync_locked(self, paths, user):
+        present, gone = [], []
+        for p in paths:
+            try:
+                st = os.lstat(p)
+            except FileNotFoundError:
+                gone.append(p)
+                continue
+            except OSError:
+                continue
+            if stat.S_ISREG(st.st_mode):
+                present.append(p)
+
+        found = {}
+        hashed = await asyncio.to_thread(
+            hash_files, [(str(p), p) for p in present], None
+        )
+        for p, size, digest, error in hashed:
+            if digest is None:
+                if os.path.lexists(p):
+                    print(f"Cannot read {p}: {error}")
+                continue
+            try:
+                ensure_valid_filename(p.name)
+                found[p.name] = (p, (size, blobStore.physical_size(p), digest))
+            except (OSError, ValueError) as e:
+                print(f"Skipping {p}: {e}")
+        removed = {
+            p.name: p for p in gone if p.name not in found and not self._still_stored(p)
+        }
+
+        rows = defaultdict(list)
+        if found or removed:
+            for f in await fileAccessor.fetch_by_names([*found, *removed]):
+                rows[f.file_name].append(f)
+        changes = []
+        for name, (p, sizes) in found.items():
+            if not rows[name]:
+                changes.append((OperationType.CREATE, name, sizes))
+            elif any(
+                (f.file_size, f.physical_size, f.checksum) != sizes for f in rows[name]
+            ):
+                changes.append((OperationType.UPDATE, name, sizes))
+        changes += [
+            (OperationType.DELETE, name, None) for name in removed if rows[name]
+        ]
+
+        failed = set()
+        if changes:
+            try:
+                await self._save(changes, rows, user)
+            except Exception as e:
+                if len(changes) == 1:
+                    print(f"Error saving metadata for {changes[0][1]}: {e}")
+                    failed.add(changes[0][1])
+                else:
+                    for change in changes:
+                        try:
+                            await self._save([change], rows, user)
+                        except Exception as e:
+                            print(f"Error saving metadata for {change[1]}: {e}")
+                            failed.add(change[1])
+
+        # Left stale for failed files, so a later rescan picks them up again.
+        synced = []
+        for name, (p, sizes) in found.items():
+            if name not in failed:
+                owner = rows[name][0].user_id if rows[name] else user
+                metadataIndex.record(p, owner=owner, sha256=sizes[2])
+                synced.append(p)
+        for p in gone:
+            if p.name not in failed:
+                metadataIndex.remove(p)
+                synced.append(p)
+        await fileManager.index_text(synced)
+
+        counts = defaultdict(int)
+        for op, name, _ in changes:
+            if name not in failed:
+                counts[op] += 1
+        if changes:
+            print(
+                f"Synced {len(paths)} paths: "
+                f"{counts[OperationType.CREATE]} created, "
+                f"{counts[OperationType.UPDATE]} updated, "
+                f"{counts[OperationType.DELETE]} deleted"
+            )
+
+    @staticmethod
+    def _still_stored(p: Path) -> bool:
+        """Whether another file under BASE_DIR still carries p's name."""
+        rel = metadataIndex.relpath(p)
+        return any(
+            path != rel and (BASE_DIR / path).is_file()
+            for path, *_ in metadataIndex.lookup(p.name)
+        )
+
+    @staticmethod
+    async def _save(changes, rows, user):
+        """Apply (operation, name, sizes) changes with bulk statements."""
+        created, updated, deleted = [], defaultdict(dict), defaultdict(list)
+        for op, name, sizes in changes:
+            if op == OperationType.CREATE:
+                created.append(
+                    Files(
+                        file_name=name,
+                        file_size=sizes[0],
+                        physical_size=sizes[1],
+                        checksum=sizes[2],
+                        user_id=user,
+                    )
+                )
+            elif op == OperationType.UPDATE:
+                for f in rows[name]:
+                    updated[f.user_id][name] = sizes
+            else:
+                for f in rows[name]:
+                    deleted[f.user_id].append(name)
+
+        async with db.session():
+            await operationsAccessor.create_many(
+                Operations(type=OperationType.DELETE, file_id=f.id, user_id=user)
+                for op, name, _ in changes
+                if op == OperationType.DELETE
+                for f in rows[name]
+            )
+            for owner, names in deleted.items():
+                await fileAccessor.delete_many(names, owner)
+            files = []
+            for owner, sizes in updated.items():
+                files += [
+                    (OperationType.UPDATE, f)
+                    for f in await fileAccessor.update_many(sizes, owner)
+                ]
+            files += [
+                (OperationType.CREATE, f)
+                for f in await fileAccessor.create_many(created)
+            ]
+            await operationsAccessor.create_many(
+                Operations(type=op, file_id=f.id, user_id=user) for op, f in files
+            )
+
+
+watchManager = WatchManager()
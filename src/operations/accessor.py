@@ -1,7 +1,9 @@
 from sqlalchemy.orm import selectinload
 
+from src.files.files import Files
 from src.operations.operations import Operations
-from sqlalchemy import insert, select
+from src.users.users import User
+from sqlalchemy import insert, select, tuple_
 from src.core.databaseAccessor import db
 
 
@@ -19,6 +21,19 @@ class OperationAccessor:
         result = await db.execute(stmt)
         return result.scalar_one()
 
+    async def create_many(self, operations_in) -> None:
+        """Insert several operations with one multi-row INSERT."""
+        rows = [
+            {
+                "type": operation_in.type,
+                "file_id": operation_in.file_id,
+                "user_id": operation_in.user_id,
+            }
+            for operation_in in operations_in
+        ]
+        if rows:
+            await db.execute(insert(Operations).values(rows))
+
     async def fetch_all(self) -> list[Operations] | None:
         stmt = select(Operations).options(
             selectinload(Operations.file), selectinload(Operations.user)
@@ -26,5 +41,47 @@ class OperationAccessor:
         result = await db.execute(stmt)
         return result.scalars().all()
 
+    def stream_logs(
+        self,
+        username=None,
+        type=None,
+        since=None,
+        until=None,
+        file_name=None,
+        after=None,
+        limit=None,
+    ):
+        """Stream (created_at, id, type, file_name, username) rows in keyset order.
+
+        after is the (created_at, id) of the last row already seen.
+        """
+        stmt = (
+            select(
+                Operations.created_at,
+                Operations.id,
+                Operations.type,
+                Files.file_name,
+                User.username,
+            )
+            .join(Files, Operations.file_id == Files.id)
+            .join(User, Operations.user_id == User.id)
+            .order_by(Operations.created_at, Operations.id)
+        )
+        if username is not None:
+            stmt = stmt.where(User.username == username)
+        if type is not None:
+            stmt = stmt.where(Operations.type == type)
+        if since is not None:
+            stmt = stmt.where(Operations.created_at >= since)
+        if until is not None:
+            stmt = stmt.where(Operations.created_at < until)
+        if file_name is not None:
+            stmt = stmt.where(Files.file_name == file_name)
+        if after is not None:
+            stmt = stmt.where(tuple_(Operations.created_at, Operations.id) > after)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return db.stream(stmt)
+
 
 operationsAccessor = OperationAccessor()
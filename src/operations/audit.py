@@ -0,0 +1,86 @@
+import asyncio
+import contextvars
+
+from src.core.config import config
+from src.operations.accessor import operationsAccessor
+from src.operations.operations import Operations
+
+AUDIT_BATCH_SIZE = getattr(config.static, "AUDIT_BATCH_SIZE", 500)
+AUDIT_FLUSH_INTERVAL = getattr(config.static, "AUDIT_FLUSH_INTERVAL", 1.0)
+
+
+class AuditLog:
+    """Queues ``Operations`` records and writes them in multi-row batches.
+
+    A background task flushes the queue once it reaches ``batch_size`` or after
+    ``flush_interval`` seconds, whichever comes first. ``close`` must be awaited
+    before the database is disconnected so nothing queued is lost.
+
+    Only use this for operations whose file row outlives the flush; DELETE
+    records have to be written in the same transaction as the delete.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = AUDIT_BATCH_SIZE,
+        flush_interval: float = AUDIT_FLUSH_INTERVAL,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: list[Operations] = []
+        self._full = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._closing = False
+
+    def record(self, type, file_id, user_id):
+        self._pending.append(Operations(type=type, file_id=file_id, user_id=user_id))
+        if len(self._pending) >= self.batch_size:
+            self._full.set()
+        if self._task is None or self._task.done():
+            # Run outside the caller's context so flushes never join (or outlive)
+            # the db.session() that happened to be active when recording.
+            self._task = asyncio.create_task(self._run(), context=contextvars.Context())
+
+    async def _run(self):
+        while self._pending:
+            if not self._closing:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.flush_interval)
+                except TimeoutError:
+                    pass
+            try:
+                await self.flush()
+            except Exception as e:
+                print("Error writing audit log:", e)
+                return
+
+    async def flush(self):
+        async with self._lock:
+            self._full.clear()
+            while self._pending:
+                batch = self._pending[: self.batch_size]
+                await operationsAccessor.create_many(batch)
+                del self._pending[: len(batch)]
+
+    async def close(self):
+        """Let the background task finish and write everything still queued.
+
+        The task is not cancelled: cancelling it during a flush could drop
+        rows already sent or write a batch twice.
+        """
+        self._closing = True
+        try:
+            if self._task is not None and not self._task.done():
+                self._full.set()
+                await self._task
+        finally:
+            self._closing = False
+        self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            print("Error writing audit log:", e)
+
+
+auditLog = AuditLog()
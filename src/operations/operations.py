@@ -1,5 +1,5 @@
 from src.core.models.models import BaseModel
-from sqlalchemy import DateTime, func, BigInteger, ForeignKey
+from sqlalchemy import DateTime, func, BigInteger, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from src.operations.enum import OperationType
 
@@ -12,6 +12,13 @@ if typing.TYPE_CHECKING:
 
 class Operations(BaseModel):
     __tablename__ = "operations"
+    # Keyset pagination of the log runs on (created_at, id), optionally
+    # narrowed to one user or one file.
+    __table_args__ = (
+        Index("ix_operations_created_at_id", "created_at", "id"),
+        Index("ix_operations_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_operations_file_id_created_at_id", "file_id", "created_at", "id"),
+    )
 
     created_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
     type: Mapped[OperationType]
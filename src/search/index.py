@@ -0,0 +1,325 @@
+import re
+import sqlite3
+import threading
+from collections import defaultdict
+from pathlib import Path
+
+from src.blobs.store import blobStore
+from src.cli import BASE_DIR, MAX_UPLOAD_SIZE, STATE_DIR, WALK_WORKERS, walk_entries
+from src.core.config import config
+
+TEXT_INDEX_PATH = STATE_DIR / "textindex.sqlite3"
+TEXT_INDEX_SUFFIXES = frozenset(
+    getattr(config.static, "TEXT_INDEX_SUFFIXES", (".txt", ".json", ".xml"))
+)
+TEXT_INDEX_MAX_SIZE = getattr(config.static, "TEXT_INDEX_MAX_SIZE", MAX_UPLOAD_SIZE)
+MAX_TERM_LENGTH = 64
+
+_TOKEN = re.compile(r"\w+")
+_QUERY_PART = re.compile(r'"([^"]*)"|(\S+)')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    doc INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (term, doc)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_postings_doc ON postings (doc);
+"""
+
+
+def encode_varints(values) -> bytes:
+    """LEB128-encode non-negative integers."""
+    out = bytearray()
+    for v in values:
+        while v >= 0x80:
+            out.append(v & 0x7F | 0x80)
+            v >>= 7
+        out.append(v)
+    return bytes(out)
+
+
+def decode_varints(data: bytes) -> list[int]:
+    values = []
+    v = shift = 0
+    for byte in data:
+        v |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(v)
+            v = shift = 0
+    return values
+
+
+def encode_postings(hits) -> bytes:
+    """Pack ascending (position, offset) pairs as delta-encoded varints."""
+    deltas = []
+    last_pos = last_off = 0
+    for pos, off in hits:
+        deltas += (pos - last_pos, off - last_off)
+        last_pos, last_off = pos, off
+    return encode_varints(deltas)
+
+
+def decode_postings(data: bytes) -> list[tuple[int, int]]:
+    values = decode_varints(data)
+    hits = []
+    pos = off = 0
+    for i in range(0, len(values), 2):
+        pos += values[i]
+        off += values[i + 1]
+        hits.append((pos, off))
+    return hits
+
+
+def tokenize(text: str):
+    """Yield (term, position, offset) for the words of text.
+
+    Terms are lower-cased; position counts words (so phrases can be checked
+    for adjacency) and offset is the word's character offset in the
+    lower-cased text, which matches the original for nearly all scripts.
+    """
+    for pos, m in enumerate(_TOKEN.finditer(text.lower())):
+        term = m.group()
+        if len(term) <= MAX_TERM_LENGTH:
+            yield term, pos, m.start()
+
+
+def build_postings(text: str) -> dict[str, bytes]:
+    """Encoded postings of every term of text (the bulk form of tokenize)."""
+    hits = defaultdict(list)
+    for pos, m in enumerate(_TOKEN.finditer(text.lower())):
+        hits[m.group()].append((pos, m.start()))
+    return {
+        term: encode_postings(h)
+        for term, h in hits.items()
+        if len(term) <= MAX_TERM_LENGTH
+    }
+
+
+def parse_query(query: str) -> list[list[str]]:
+    """Split a query into phrases; "quoted words" stay together."""
+    phrases = []
+    for quoted, word in _QUERY_PART.findall(query):
+        terms = [term for term, _, _ in tokenize(quoted or word)]
+        if terms:
+            phrases.append(terms)
+    return phrases
+
+
+class TextIndex:
+    """Inverted index of the text, JSON and XML files under BASE_DIR.
+
+    Each (term, file) row holds the term's word positions and character
+    offsets in that file as delta-encoded varints, so a file is re-indexed
+    by replacing only its own rows. Kept current by the FileManager write,
+    create, copy, move and delete paths; ``refresh`` catches up with files
+    changed by other means.
+    """
+
+    def __init__(self, path: Path = TEXT_INDEX_PATH):
+        self.path = path
+        # One connection per thread: commands index from worker threads.
+        self._local = threading.local()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = self._local.conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+        return conn
+
+    @staticmethod
+    def relpath(p: Path) -> str:
+        return Path(p).relative_to(BASE_DIR).as_posix()
+
+    @staticmethod
+    def indexable(p: Path) -> bool:
+        return p.suffix.lower() in TEXT_INDEX_SUFFIXES
+
+    def update(self, p: Path):
+        """(Re)index p after it was written; drops it if it no longer qualifies."""
+        with self.conn as conn:
+            self._update(conn, p)
+
+    def update_many(self, paths):
+        """(Re)index or drop each of paths, in one transaction."""
+        with self.conn as conn:
+            for p in paths:
+                self._update(conn, p)
+
+    def _update(self, conn, p: Path):
+        if not self.indexable(p) or not p.is_file():
+            self._remove(conn, p)
+            return
+        st = p.stat()
+        with blobStore.open(p) as f:
+            data = f.read(TEXT_INDEX_MAX_SIZE + 1)
+        if len(data) > TEXT_INDEX_MAX_SIZE:
+            self._remove(conn, p)
+            return
+        postings = build_postings(data.decode(errors="replace"))
+        rel = self.relpath(p)
+        row = conn.execute(
+            "INSERT INTO docs (path, size, mtime_ns) VALUES (?, ?, ?) "
+            "ON CONFLICT (path) DO UPDATE SET "
+            "size = excluded.size, mtime_ns = excluded.mtime_ns "
+            "RETURNING id",
+            (rel, st.st_size, st.st_mtime_ns),
+        ).fetchone()
+        doc = row[0]
+        conn.execute("DELETE FROM postings WHERE doc = ?", (doc,))
+        conn.executemany(
+            "INSERT INTO postings (term, doc, data) VALUES (?, ?, ?)",
+            ((term, doc, blob) for term, blob in sorted(postings.items())),
+        )
+
+    def remove(self, p: Path):
+        with self.conn as conn:
+            self._remove(conn, p)
+
+    def _remove(self, conn, p: Path):
+        row = conn.execute(
+            "SELECT id FROM docs WHERE path = ?", (self.relpath(p),)
+        ).fetchone()
+        if row:
+            conn.execute("DELETE FROM postings WHERE doc = ?", row)
+            conn.execute("DELETE FROM docs WHERE id = ?", row)
+
+    def rename(self, src: Path, dst: Path):
+        """Follow a move; postings stay with the document id."""
+        self.remove(dst)
+        if not self.indexable(dst):
+            self.remove(src)
+            return
+        with self.conn as conn:
+            moved = conn.execute(
+                "UPDATE docs SET path = ? WHERE path = ?",
+                (self.relpath(dst), self.relpath(src)),
+            ).rowcount
+        if not moved:
+            self.update(dst)
+
+    def refresh(self, workers: int | None = None) -> tuple[int, int]:
+        """Index files whose size or mtime changed; returns (indexed, removed)."""
+        known = {
+            path: (size, mtime_ns)
+            for path, size, mtime_ns in self.conn.execute(
+                "SELECT path, size, mtime_ns FROM docs"
+            )
+        }
+        indexed = 0
+        seen = set()
+        with self.conn as conn:
+            for rel, entry in walk_entries(BASE_DIR, workers or WALK_WORKERS):
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                p = Path(entry.path)
+                if not self.indexable(p):
+                    continue
+                seen.add(rel)
+                st = entry.stat(follow_symlinks=False)
+                if known.get(rel) != (st.st_size, st.st_mtime_ns):
+                    self._update(conn, p)
+                    indexed += 1
+            removed = [rel for rel in known if rel not in seen]
+            for rel in removed:
+                self._remove(conn, BASE_DIR / rel)
+        return indexed, len(removed)
+
+    def _docs_with(self, term: str, docs=None) -> dict:
+        """Map doc id to the decoded postings of term, optionally within docs."""
+        if docs is None:
+            rows = self.conn.execute(
+                "SELECT doc, data FROM postings WHERE term = ?", (term,)
+            )
+            return {doc: decode_postings(data) for doc, data in rows}
+        found = {}
+        docs = list(docs)
+        for i in range(0, len(docs), 500):
+            chunk = docs[i : i + 500]
+            rows = self.conn.execute(
+                "SELECT doc, data FROM postings "
+                f"WHERE term = ? AND doc IN ({','.join('?' * len(chunk))})",
+                (term, *chunk),
+            )
+            found.update((doc, decode_postings(data)) for doc, data in rows)
+        return found
+
+    def _phrase(self, terms: list[str], docs=None) -> dict:
+        """Map doc id to the offsets where the phrase starts."""
+        counts = {
+            term: self.conn.execute(
+                "SELECT count(*) FROM postings WHERE term = ?", (term,)
+            ).fetchone()[0]
+            for term in set(terms)
+        }
+        postings = {}
+        for term in sorted(counts, key=counts.get):
+            postings[term] = self._docs_with(term, docs)
+            docs = set(postings[term])
+            if not docs:
+                return {}
+        found = {}
+        for doc in docs:
+            first = postings[terms[0]][doc]
+            later = [{pos for pos, _ in postings[t][doc]} for t in terms[1:]]
+            offsets = [
+                off
+                for pos, off in first
+                if all(pos + i + 1 in positions for i, positions in enumerate(later))
+            ]
+            if offsets:
+                found[doc] = offsets
+        return found
+
+    def query(self, query: str, root: Path):
+        """Yield (path relative to root, first offset, hit count), by path.
+
+        Every phrase of the query must occur in the file; hits and the
+        offset are those of the first phrase.
+        """
+        phrases = parse_query(query)
+        if not phrases:
+            return
+        docs = None
+        first = None
+        for terms in sorted(phrases, key=len, reverse=True):
+            found = self._phrase(terms, docs)
+            if terms == phrases[0] and first is None:
+                first = found
+            docs = set(found)
+            if not docs:
+                return
+        rel_root = self.relpath(root)
+        prefix = "" if rel_root == "." else rel_root + "/"
+        paths = {}
+        doc_ids = list(docs)
+        for i in range(0, len(doc_ids), 500):
+            chunk = doc_ids[i : i + 500]
+            paths.update(
+                self.conn.execute(
+                    "SELECT id, path FROM docs "
+                    f"WHERE id IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+            )
+        for doc, path in sorted(paths.items(), key=lambda item: item[1]):
+            if path.startswith(prefix):
+                offsets = first[doc]
+                yield path[len(prefix) :], offsets[0], len(offsets)
+
+
+textIndex = TextIndex()
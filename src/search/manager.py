@@ -0,0 +1,195 @@
+import asyncio
+import fnmatch
+import multiprocessing
+import os
+import re
+import sys
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from src.cli import WALK_WORKERS, resolve_secure_path, walk_entries
+from src.core.auth import is_authenticated
+from src.core.config import config
+from src.search.scan import compile_pattern, scan_files
+
+SEARCH_WORKERS = getattr(config.static, "SEARCH_WORKERS", os.cpu_count() or 1)
+SEARCH_BATCH_FILES = getattr(config.static, "SEARCH_BATCH_FILES", 64)
+
+
+class SearchManager:
+    """Finds files under a directory by name and/or content.
+
+    Names are matched while a parallel scandir walk runs; files that pass
+    the name filter are handed in batches to a process pool that scans them
+    through mmap. Output stops as soon as --max-results lines are printed.
+    With --indexed, term and phrase queries are answered from the text
+    index instead, without reading any file.
+    """
+
+    async def search(self, args):
+        user = is_authenticated()
+        if not user:
+            print("Not authenticated")
+            return
+
+        p = resolve_secure_path(args.path or ".")
+        if not p.is_dir():
+            print("Not a directory:", p)
+            return
+        if args.name is None and args.content is None:
+            print("Give --name and/or --content")
+            return
+        if args.max_results is not None and args.max_results <= 0:
+            print("--max-results must be positive")
+            return
+        try:
+            name_match = self._name_matcher(args)
+            if args.content is not None:
+                compile_pattern(args.content.encode(), args.regex, args.ignore_case)
+        except re.error as e:
+            print("Invalid pattern:", e)
+            return
+
+        if args.indexed:
+            if args.content is None or args.regex or args.zip:
+                print("--indexed needs --content and no --regex or --zip")
+                return
+            await asyncio.to_thread(self._run_indexed, p, name_match, args)
+            return
+
+        started = time.perf_counter()
+        found, scanned, skipped = await asyncio.to_thread(
+            self._run, p, name_match, args
+        )
+        elapsed = time.perf_counter() - started
+        summary = f"{found} matches in {elapsed:.2f}s"
+        if args.content is not None:
+            summary += f" ({scanned} files searched, {skipped} skipped)"
+        if args.max_results is not None and found >= args.max_results:
+            summary += ", stopped at --max-results"
+        print(summary)
+
+    @staticmethod
+    def _run_indexed(root, name_match, args):
+        from src.search.index import textIndex
+
+        started = time.perf_counter()
+        if args.reindex:
+            indexed, removed = textIndex.refresh(args.workers)
+            print(f"Text index refreshed: {indexed} indexed, {removed} removed")
+        found = 0
+        for label, offset, hits in textIndex.query(args.content, root):
+            if args.max_results is not None and found >= args.max_results:
+                break
+            if name_match is None or name_match(label.rpartition("/")[2]):
+                print(f"{label}:{offset}: {hits} hits")
+                found += 1
+        elapsed = time.perf_counter() - started
+        print(f"{found} files in {elapsed:.2f}s (indexed)")
+
+    @staticmethod
+    def _name_matcher(args):
+        if args.name is None:
+            return None
+        flags = re.IGNORECASE if args.ignore_case else 0
+        if args.name_regex:
+            return re.compile(args.name, flags).search
+        return re.compile(fnmatch.translate(args.name), flags).match
+
+    def _run(self, root, name_match, args):
+        """Walk root and print matches; returns (matches, files, skipped)."""
+        limit = args.max_results
+        names_only = args.content is None
+
+        def candidates():
+            """Regular files passing the name filter, as (path, label)."""
+            for rel, entry in walk_entries(root, args.workers or WALK_WORKERS):
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                if name_match is None or name_match(entry.name):
+                    yield entry.path, rel
+                if names_only and args.zip and entry.name.lower().endswith(".zip"):
+                    yield from self._zip_members(entry.path, rel, name_match)
+
+        files = candidates()
+        try:
+            if not names_only:
+                return self._scan(files, args, limit)
+            found = 0
+            for _, label in files:
+                if limit is not None and found >= limit:
+                    break
+                print(label)
+                found += 1
+            return found, 0, 0
+        finally:
+            files.close()
+
+    @staticmethod
+    def _zip_members(path, rel, name_match):
+        """Members of a zip whose names match, labelled "archive!member"."""
+        try:
+            with zipfile.ZipFile(path) as zf:
+                names = [i.filename for i in zf.infolist() if not i.is_dir()]
+        except (OSError, zipfile.BadZipFile):
+            return
+        for name in names:
+            if name_match(name.rpartition("/")[2]):
+                yield None, f"{rel}!{name}"
+
+    def _scan(self, files, args, limit):
+        found = scanned = skipped = 0
+        pattern = args.content.encode()
+        workers = max(1, args.workers or SEARCH_WORKERS)
+        pending = set()
+        # forkserver: the walk's threads are running, so don't fork this process.
+        pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("forkserver")
+        )
+        try:
+            exhausted = False
+            while True:
+                # Keep two batches per worker queued so none of them idles.
+                while not exhausted and len(pending) < 2 * workers:
+                    batch = []
+                    for path, label in files:
+                        batch.append((path, label))
+                        if len(batch) >= SEARCH_BATCH_FILES:
+                            break
+                    else:
+                        exhausted = True
+                    if batch:
+                        scanned += len(batch)
+                        budget = sys.maxsize if limit is None else limit - found
+                        pending.add(
+                            pool.submit(
+                                scan_files,
+                                batch,
+                                pattern,
+                                args.regex,
+                                args.ignore_case,
+                                args.zip,
+                                budget,
+                            )
+                        )
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    matches, missed = future.result()
+                    skipped += missed
+                    for label, offset, line in matches:
+                        if limit is not None and found >= limit:
+                            break
+                        text = line.decode(errors="replace").rstrip("\r")
+                        print(f"{label}:{offset}: {text}")
+                        found += 1
+                if limit is not None and found >= limit:
+                    break
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        return found, scanned, skipped
+
+
+searchManager = SearchManager()
@@ -0,0 +1,126 @@
+import functools
+import mmap
+import os
+import re
+import zipfile
+from pathlib import Path
+
+from src.cli import MAX_UPLOAD_SIZE, stored_format
+from src.core.config import config
+
+SEARCH_MEMORY_LIMIT = getattr(config.static, "SEARCH_MEMORY_LIMIT", MAX_UPLOAD_SIZE)
+SNIPPET_LENGTH = 200
+
+_ZIP_PREFIX = b"PK\x03\x04"
+
+
+@functools.lru_cache(maxsize=8)
+def compile_pattern(pattern: bytes, regex: bool, ignore_case: bool):
+    """bytes for a plain case-sensitive search, else a compiled bytes regex."""
+    if not regex and not ignore_case:
+        return pattern
+    return re.compile(
+        pattern if regex else re.escape(pattern),
+        re.IGNORECASE if ignore_case else 0,
+    )
+
+
+def find_matches(buf, matcher, limit: int) -> list:
+    """(offset, line text) of up to ``limit`` matches in buf, one per line.
+
+    buf may be bytes or an mmap; matcher is what compile_pattern returns.
+    """
+    found = []
+    pos = 0
+    end = len(buf)
+    while len(found) < limit and pos <= end:
+        if isinstance(matcher, bytes):
+            start = buf.find(matcher, pos)
+            if start < 0:
+                break
+        else:
+            m = matcher.search(buf, pos)
+            if m is None:
+                break
+            start = m.start()
+        line_start = buf.rfind(b"\n", 0, start) + 1
+        line_end = buf.find(b"\n", start)
+        if line_end < 0:
+            line_end = end
+        # Long lines (minified JSON) are cut to a window around the match.
+        lo = max(line_start, start - SNIPPET_LENGTH // 2)
+        line = buf[lo : min(line_end, lo + SNIPPET_LENGTH)]
+        found.append((start, bytes(line)))
+        pos = line_end + 1
+    return found
+
+
+def _read_limited(f) -> bytes | None:
+    data = f.read(SEARCH_MEMORY_LIMIT + 1)
+    return None if len(data) > SEARCH_MEMORY_LIMIT else data
+
+
+def _scan_zip(path: str, label: str, matcher, limit: int, results: list) -> int:
+    skipped = 0
+    with zipfile.ZipFile(path) as zf:
+        for info in zf.infolist():
+            if len(results) >= limit:
+                break
+            if info.is_dir():
+                continue
+            if info.file_size > SEARCH_MEMORY_LIMIT:
+                skipped += 1
+                continue
+            with zf.open(info) as member:
+                data = _read_limited(member)
+            if data is None:
+                skipped += 1
+                continue
+            member_label = f"{label}!{info.filename}"
+            for offset, line in find_matches(data, matcher, limit - len(results)):
+                results.append((member_label, offset, line))
+    return skipped
+
+
+def _scan_file(path: str, label: str, matcher, zips: bool, limit: int, results):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if stored_format(f.fileno()) is not None:
+                # Manifests and compressed files: search the logical content.
+                from src.blobs.store import blobStore
+
+                with blobStore.open(Path(path)) as content:
+                    data = _read_limited(content)
+                if data is None:
+                    return 1
+                buf = data
+            elif zips and mm[: len(_ZIP_PREFIX)] == _ZIP_PREFIX:
+                return _scan_zip(path, label, matcher, limit, results)
+            else:
+                buf = mm
+            for offset, line in find_matches(buf, matcher, limit - len(results)):
+                results.append((label, offset, line))
+    return 0
+
+
+def scan_files(files, pattern: bytes, regex: bool, ignore_case: bool, zips, limit):
+    """Search the contents of files, a list of (path, label) pairs.
+
+    Runs in a worker process. Returns (matches, skipped): matches are
+    (label, offset, line) tuples, at most ``limit`` of them; skipped counts
+    the files and zip members that could not be read, or would have to be
+    decoded in memory beyond SEARCH_MEMORY_LIMIT.
+    """
+    matcher = compile_pattern(pattern, regex, ignore_case)
+    results = []
+    skipped = 0
+    for path, label in files:
+        if len(results) >= limit:
+            break
+        try:
+            skipped += _scan_file(path, label, matcher, zips, limit, results)
+        except (OSError, ValueError, zipfile.BadZipFile):
+            skipped += 1
+    return results, skipped
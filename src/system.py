@@ -2,7 +2,6 @@ import asyncio
 import shutil
 from pathlib import Path
 from src.core.config import config
-from src.core.databaseAccessor import db
 
 BASE_DIR = Path(getattr(config.static, "BASE_DIR", Path.cwd() / "storage")).resolve()
 
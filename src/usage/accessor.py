@@ -0,0 +1,95 @@
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from src.core.databaseAccessor import db
+from src.files.files import Files
+from src.usage.usage import UserUsage
+from src.users.users import User
+
+
+class UsageAccessor:
+    async def room(self, user_id, replaced: int = 0) -> int | None:
+        """Bytes user_id may still store, counting ``replaced`` bytes being
+        overwritten as free; None when the user has no quota.
+        """
+        stmt = select(UserUsage.used_bytes, UserUsage.quota_bytes).where(
+            UserUsage.user_id == user_id
+        )
+        row = (await db.execute(stmt)).one_or_none()
+        if row is None or row.quota_bytes is None:
+            return None
+        return max(0, row.quota_bytes - row.used_bytes + replaced)
+
+    async def fetch_quotas(self, username=None) -> list:
+        """(username, used bytes, quota bytes) for every user, or one."""
+        stmt = (
+            select(User.username, UserUsage.used_bytes, UserUsage.quota_bytes)
+            .outerjoin(UserUsage, UserUsage.user_id == User.id)
+            .order_by(User.username)
+        )
+        if username:
+            stmt = stmt.where(User.username == username)
+        result = await db.execute(stmt)
+        return list(result.all())
+
+    async def set_quota(self, user_id, quota_bytes: int | None):
+        stmt = insert(UserUsage).values(user_id=user_id, quota_bytes=quota_bytes)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UserUsage.user_id],
+            set_={"quota_bytes": stmt.excluded.quota_bytes},
+        )
+        await db.execute(stmt)
+
+    async def fetch_all(self, username=None) -> list:
+        """(username, file count, used bytes, physical bytes), largest first."""
+        stmt = (
+            select(
+                User.username,
+                UserUsage.file_count,
+                UserUsage.used_bytes,
+                UserUsage.physical_bytes,
+            )
+            .join(UserUsage, UserUsage.user_id == User.id)
+            .order_by(UserUsage.used_bytes.desc(), User.username)
+        )
+        if username:
+            stmt = stmt.where(User.username == username)
+        result = await db.execute(stmt)
+        return list(result.all())
+
+    async def recount(self) -> int:
+        """Rebuild every counter from the files table; returns rows corrected."""
+        totals = select(
+            Files.user_id,
+            func.count().label("file_count"),
+            func.coalesce(func.sum(Files.file_size), 0).label("used_bytes"),
+            func.coalesce(
+                func.sum(func.coalesce(Files.physical_size, Files.file_size)), 0
+            ).label("physical_bytes"),
+        ).group_by(Files.user_id)
+        async with db.session():
+            cleared = await db.execute(
+                update(UserUsage)
+                .where(UserUsage.user_id.not_in(select(Files.user_id)))
+                .where((UserUsage.file_count != 0) | (UserUsage.used_bytes != 0))
+                .values(file_count=0, used_bytes=0, physical_bytes=0)
+            )
+            stmt = insert(UserUsage).from_select(
+                ["user_id", "file_count", "used_bytes", "physical_bytes"], totals
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[UserUsage.user_id],
+                set_={
+                    "file_count": stmt.excluded.file_count,
+                    "used_bytes": stmt.excluded.used_bytes,
+                    "physical_bytes": stmt.excluded.physical_bytes,
+                },
+                where=(UserUsage.used_bytes != stmt.excluded.used_bytes)
+                | (UserUsage.file_count != stmt.excluded.file_count)
+                | (UserUsage.physical_bytes != stmt.excluded.physical_bytes),
+            )
+            result = await db.execute(stmt)
+        return cleared.rowcount + result.rowcount
+
+
+usageAccessor = UsageAccessor()
@@ -0,0 +1,151 @@
+import os
+import sqlite3
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from src.cli import BASE_DIR, STATE_DIR, WALK_WORKERS
+from src.core.config import config
+
+DU_CACHE_PATH = Path(
+    getattr(config.static, "DU_CACHE_PATH", STATE_DIR / "dirsizes.sqlite3")
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    files INTEGER NOT NULL,
+    children TEXT NOT NULL
+);
+"""
+
+
+def _like_prefix(rel: str) -> str:
+    escaped = rel.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "/%"
+
+
+def _scan_dir(path: Path, cached):
+    """Return ((mtime_ns, inode, size, files, children), rescanned) for path.
+
+    size and files cover the directory's own non-directory entries; children
+    is its subdirectory names joined with "/". The cached row is returned as
+    is while the directory's mtime and inode still match it. The stat is
+    taken before the scan, so a change racing with it only costs a rescan
+    next time.
+    """
+    st = os.stat(path, follow_symlinks=False)
+    if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_ino):
+        return cached, False
+    size = files = 0
+    children = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    children.append(entry.name)
+                    continue
+                size += entry.stat(follow_symlinks=False).st_size
+            except OSError:
+                continue
+            files += 1
+    return (st.st_mtime_ns, st.st_ino, size, files, "/".join(children)), True
+
+
+class DirSizeCache:
+    """Per-directory sizes of BASE_DIR, cached in SQLite and keyed by mtime.
+
+    Adding, removing or replacing an entry (every write here goes through an
+    atomic rename) bumps its directory's mtime, so a directory whose mtime and
+    inode are unchanged is not scanned again: a repeated ``du`` costs one stat
+    per directory. Files modified in place by other programs are only picked
+    up once their directory changes.
+    """
+
+    def __init__(self, path: Path = DU_CACHE_PATH):
+        self.path = path
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Used from whichever worker thread du runs in; _lock serializes it.
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def tree(self, root: Path, workers: int | None = None):
+        """Return ({directory: (bytes, files)}, number of directories rescanned).
+
+        The map covers root and every directory below it, keyed by path
+        relative to BASE_DIR; each total includes its subdirectories.
+        """
+        rel_root = root.relative_to(BASE_DIR).as_posix()
+        rel_root = "" if rel_root == "." else rel_root
+        if rel_root:
+            where = "path = ? OR path LIKE ? ESCAPE '\\'"
+            params = (rel_root, _like_prefix(rel_root))
+        else:
+            where, params = "1", ()
+        with self._lock:
+            cached = {
+                row[0]: row[1:]
+                for row in self.conn.execute(
+                    "SELECT path, mtime_ns, inode, size, files, children "
+                    f"FROM dirs WHERE {where}",
+                    params,
+                )
+            }
+
+        rows = {}
+        changed = []
+        pool = ThreadPoolExecutor(max_workers=workers or WALK_WORKERS)
+        try:
+            pending = {pool.submit(_scan_dir, root, cached.get(rel_root)): rel_root}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    rel = pending.pop(future)
+                    try:
+                        row, rescanned = future.result()
+                    except OSError:
+                        continue
+                    rows[rel] = row
+                    if rescanned:
+                        changed.append((rel, *row))
+                    for name in filter(None, row[4].split("/")):
+                        child = f"{rel}/{name}" if rel else name
+                        scan = pool.submit(
+                            _scan_dir, BASE_DIR / child, cached.get(child)
+                        )
+                        pending[scan] = child
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        gone = [(rel,) for rel in cached if rel not in rows]
+        with self._lock, self.conn as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?, ?, ?)", changed
+            )
+            conn.executemany("DELETE FROM dirs WHERE path = ?", gone)
+
+        totals = {}
+        for rel in sorted(rows, key=lambda r: r.count("/") + bool(r), reverse=True):
+            _, _, size, files, children = rows[rel]
+            for name in filter(None, children.split("/")):
+                sub = totals.get(f"{rel}/{name}" if rel else name)
+                if sub:
+                    size += sub[0]
+                    files += sub[1]
+            totals[rel] = (size, files)
+        return totals, len(changed)
+
+
+dirSizeCache = DirSizeCache()
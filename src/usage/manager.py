@@ -0,0 +1,127 @@
+import asyncio
+import time
+
+from src.cli import resolve_secure_path
+from src.core.auth import is_authenticated
+from src.core.config import config
+from src.usage.dirsizes import dirSizeCache
+
+ADMIN_USERS = frozenset(getattr(config.static, "ADMIN_USERS", ()))
+
+
+class UsageManager:
+    async def du(self, args):
+        user = is_authenticated()
+        if not user:
+            print("Not authenticated")
+            return
+
+        p = resolve_secure_path(args.path or ".")
+        if not p.is_dir():
+            print("Not a directory:", p)
+            return
+        if args.depth < 0:
+            print("--depth must be non-negative")
+            return
+        started = time.perf_counter()
+        tree, rescanned = await asyncio.to_thread(dirSizeCache.tree, p, args.workers)
+        elapsed = time.perf_counter() - started
+        if not tree:
+            print("Cannot read directory:", p)
+            return
+
+        root = min(tree, key=len)
+        base = root.count("/") + bool(root)
+        rows = []
+        for rel, (size, files) in tree.items():
+            if rel.count("/") + bool(rel) - base <= args.depth:
+                rows.append((rel, size, files))
+        if args.sort == "size":
+            rows.sort(key=lambda row: (-row[1], row[0]))
+        else:
+            rows.sort()
+        for rel, size, files in rows:
+            print(f"{size:>14} {files:>8}  {rel or '.'}")
+        print(f"{len(tree)} directories in {elapsed:.2f}s ({rescanned} rescanned)")
+
+    async def usage(self, args):
+        from src.usage.accessor import usageAccessor
+        from src.users.accessor import userAccessor
+
+        user = is_authenticated()
+        if not user:
+            print("Not authenticated")
+            return
+
+        me = await userAccessor.fetch_by_id(user)
+        if me is None:
+            print("Not authenticated")
+            return
+        is_admin = me.username in ADMIN_USERS
+        username = args.user or (None if is_admin else me.username)
+        if not is_admin and (username != me.username or args.recount):
+            print("Permission denied: only admins can view other usage or recount")
+            return
+
+        if args.recount:
+            corrected = await usageAccessor.recount()
+            print(f"Usage recounted: {corrected} counters corrected")
+        rows = await usageAccessor.fetch_all(username)
+        if not rows:
+            print("No usage recorded")
+            return
+        print(f"{'user':20} {'files':>8} {'bytes':>14} {'on disk':>14}")
+        for username, count, used, physical in rows:
+            print(f"{username:20} {count:>8} {used:>14} {physical:>14}")
+
+    async def quota(self, args):
+        from src.usage.accessor import usageAccessor
+        from src.users.accessor import userAccessor
+
+        user = is_authenticated()
+        if not user:
+            print("Not authenticated")
+            return
+
+        me = await userAccessor.fetch_by_id(user)
+        if me is None:
+            print("Not authenticated")
+            return
+        is_admin = me.username in ADMIN_USERS
+        username = args.username or (None if is_admin else me.username)
+        if not is_admin and (username != me.username or args.set is not None):
+            print("Permission denied: only admins can view or set other quotas")
+            return
+
+        if args.set is not None:
+            if not username:
+                print("--set requires a username")
+                return
+            target = await userAccessor.fetch_by_username(username)
+            if target is None:
+                print("User not found:", username)
+                return
+            if args.set == "none":
+                limit = None
+            elif args.set.isdigit():
+                limit = int(args.set)
+            else:
+                print("--set takes a number of bytes or 'none'")
+                return
+            await usageAccessor.set_quota(target.id, limit)
+            print(f"Quota for {username} set to {args.set}")
+
+        rows = await usageAccessor.fetch_quotas(username)
+        if not rows:
+            print("User not found:", username)
+            return
+        print(f"{'user':20} {'used':>14} {'quota':>14} {'free':>14}")
+        for name, used, limit in rows:
+            used = used or 0
+            if limit is None:
+                print(f"{name:20} {used:>14} {'none':>14} {'-':>14}")
+            else:
+                print(f"{name:20} {used:>14} {limit:>14} {max(0, limit - used):>14}")
+
+
+usageManager = UsageManager()
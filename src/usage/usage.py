@@ -0,0 +1,23 @@
+from src.core.models.models import BaseModel
+from sqlalchemy import BigInteger, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class UserUsage(BaseModel):
+    """Running totals of each user's files, and their quota.
+
+    Maintained by the ``files_usage`` trigger on ``files`` (see the migration
+    that creates this table), so every insert, update and delete adjusts them
+    in its own transaction. The trigger also rejects changes that grow
+    used_bytes past quota_bytes; NULL means no quota.
+    """
+
+    __tablename__ = "user_usage"
+
+    user_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("users.id", ondelete="CASCADE"), unique=True
+    )
+    file_count: Mapped[int] = mapped_column(BigInteger, server_default="0")
+    used_bytes: Mapped[int] = mapped_column(BigInteger, server_default="0")
+    physical_bytes: Mapped[int] = mapped_column(BigInteger, server_default="0")
+    quota_bytes: Mapped[int | None] = mapped_column(BigInteger)
@@ -1,5 +1,5 @@
 from src.users.accessor import userAccessor
-from src.core.auth import remove_authenticated_user, authenticate
+from src.core.auth import authenticate
 from src.users.errors import InvalidPasswordError, UserNotFoundError
 from src.users.users import User
 
@@ -14,10 +14,6 @@ class UserManager:
         except Exception as e:
             print("Error creating user:", e)
 
-    def logout(self, args):
-        remove_authenticated_user()
-        print("User logged out")
-
     async def login(self, args):
         try:
             user = await authenticate(args.username, args.password)
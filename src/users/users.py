@@ -16,7 +16,7 @@ class User(BaseModel):
     __tablename__ = "users"
 
     username: Mapped[str] = mapped_column(
-        String(config.static.USERNAME_MAX_LENGTH), nullable=False
+        String(config.static.USERNAME_MAX_LENGTH), nullable=False, unique=True
     )
     password: Mapped[str] = mapped_column(
         String(config.static.PASSWORD_MAX_LENGTH), nullable=False
@@ -0,0 +1,99 @@
+"""Shared fixtures.
+
+Files are written to a scratch BASE_DIR (and STATE_DIR) set up before
+src.cli is first imported. The database is the one configured through
+the POSTGRES__* environment variables, migrated to head; tests that use
+it are skipped when it is unreachable.
+"""
+
+import asyncio
+import itertools
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from src.core.config import config
+
+_ROOT = Path(tempfile.mkdtemp(prefix="filemgr-tests-"))
+config.static.BASE_DIR = _ROOT / "storage"
+config.static.STATE_DIR = _ROOT / ".filemgr"
+
+from sqlalchemy import insert, text  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+
+from src.cli import BASE_DIR  # noqa: E402
+from src.core.databaseAccessor import db  # noqa: E402
+
+_names = itertools.count()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _scratch_root():
+    yield
+    shutil.rmtree(_ROOT, ignore_errors=True)
+
+
+@pytest.fixture
+def storage():
+    """BASE_DIR, emptied again after the test."""
+    yield BASE_DIR
+    for entry in BASE_DIR.iterdir():
+        if entry.is_dir() and not entry.is_symlink():
+            shutil.rmtree(entry)
+        else:
+            entry.unlink()
+
+
+class _Rollback(Exception):
+    pass
+
+
+@pytest.fixture(scope="session")
+def database():
+    async def probe():
+        engine = create_async_engine(config.database.url)
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1 FROM alembic_version"))
+        finally:
+            await engine.dispose()
+
+    try:
+        asyncio.run(probe())
+    except Exception as e:
+        pytest.skip(f"database unavailable: {e}")
+
+
+@pytest.fixture
+def rolled_back(database):
+    """Run an async callable in one session that is rolled back afterwards."""
+
+    async def run(call):
+        await db.connect()
+        try:
+            async with db.session():
+                raise _Rollback(await call())
+        except _Rollback as e:
+            return e.args[0]
+        finally:
+            await db.disconnect()
+
+    return lambda call: asyncio.run(run(call))
+
+
+@pytest.fixture
+def make_user():
+    """Async callable inserting a throwaway user; returns its id."""
+    from src.users.users import User
+
+    async def make() -> int:
+        name = f"test-{os.getpid()}-{next(_names)}"
+        result = await db.execute(
+            insert(User).values(username=name, password="!").returning(User.id)
+        )
+        return result.scalar_one()
+
+    return make
@@ -0,0 +1,93 @@
+"""AtomicWriter on both temporary-file paths, and its durability levels."""
+
+import errno
+import os
+
+import pytest
+
+from src import cli
+from src.cli import AtomicWriter, batched_dir_sync
+
+
+@pytest.fixture(params=["tmpfile", "mkstemp"])
+def method(request, monkeypatch):
+    monkeypatch.setattr(cli, "_TMPFILE_LINKABLE", {})
+    if request.param == "mkstemp":
+        monkeypatch.setattr(cli, "_tmpfile_linkable", lambda directory: False)
+    elif not cli._tmpfile_linkable(cli.BASE_DIR.parent):
+        pytest.skip("O_TMPFILE cannot be linked in here")
+    return request.param
+
+
+@pytest.fixture
+def synced(monkeypatch):
+    dirs = []
+    monkeypatch.setattr(cli, "fsync_dir", dirs.append)
+    return dirs
+
+
+def test_replaces_the_target(tmp_path, method):
+    target = tmp_path / "f"
+    target.write_bytes(b"old")
+    with AtomicWriter(target, "wb") as f:
+        f.write(b"new")
+        assert target.read_bytes() == b"old"
+    assert target.read_bytes() == b"new"
+    assert os.listdir(tmp_path) == ["f"]
+
+
+def test_failure_keeps_the_old_content(tmp_path, method):
+    target = tmp_path / "f"
+    target.write_bytes(b"old")
+    with pytest.raises(RuntimeError):
+        with AtomicWriter(target, "wb") as f:
+            f.write(b"partial")
+            raise RuntimeError
+    assert target.read_bytes() == b"old"
+    assert os.listdir(tmp_path) == ["f"]
+
+
+def test_preallocation_is_trimmed(tmp_path, method):
+    target = tmp_path / "sub" / "f"
+    with AtomicWriter(target, "wb", size=1 << 20) as f:
+        f.write(b"short")
+    assert target.read_bytes() == b"short"
+
+
+def test_link_failure_falls_back_to_a_copy(tmp_path, monkeypatch):
+    monkeypatch.setattr(cli, "_TMPFILE_LINKABLE", {})
+    if not cli._tmpfile_linkable(tmp_path):
+        pytest.skip("O_TMPFILE cannot be linked in here")
+
+    def refuse(*args, **kwargs):
+        raise OSError(errno.EPERM, "no linking")
+
+    target = tmp_path / "f"
+    with AtomicWriter(target, "wb") as f:
+        f.write(b"data" * 1000)
+        monkeypatch.setattr(os, "link", refuse)
+    assert target.read_bytes() == b"data" * 1000
+    assert os.listdir(tmp_path) == ["f"]
+    assert not cli._tmpfile_linkable(tmp_path)
+
+
+@pytest.mark.parametrize("durability, syncs", [("none", 0), ("data", 0), ("full", 1)])
+def test_durability(tmp_path, synced, durability, syncs):
+    with AtomicWriter(tmp_path / "f", "wb", durability=durability) as f:
+        f.write(b"x")
+    assert synced == [tmp_path] * syncs
+
+
+def test_batched_dir_sync_syncs_each_directory_once(tmp_path, synced):
+    with batched_dir_sync():
+        with batched_dir_sync():
+            for name in ("a", "b", "c", "d/e"):
+                with AtomicWriter(tmp_path / name, "wb", durability="full") as f:
+                    f.write(b"x")
+        assert synced == []
+    assert sorted(synced) == [tmp_path, tmp_path / "d"]
+
+
+def test_unknown_durability(tmp_path):
+    with pytest.raises(ValueError, match="Unknown durability"):
+        AtomicWriter(tmp_path / "f", durability="sometimes")
@@ -0,0 +1,84 @@
+"""The batched audit-log writer, with the accessor replaced by a recorder."""
+
+import asyncio
+import contextvars
+
+import pytest
+
+from src.operations import audit
+from src.operations.audit import AuditLog
+from src.operations.enum import OperationType
+
+caller = contextvars.ContextVar("caller", default=None)
+
+
+@pytest.fixture
+def written(monkeypatch):
+    batches = []
+
+    async def create_many(batch):
+        assert caller.get() is None, "flushed inside the caller's context"
+        batches.append([op.file_id for op in batch])
+
+    monkeypatch.setattr(audit.operationsAccessor, "create_many", create_many)
+    return batches
+
+
+def test_close_writes_everything_in_batches(written):
+    async def run():
+        log = AuditLog(batch_size=3, flush_interval=60)
+        caller.set("session")
+        for i in range(7):
+            log.record(OperationType.CREATE, i, 1)
+        await log.close()
+
+    asyncio.run(run())
+    assert written == [[0, 1, 2], [3, 4, 5], [6]]
+
+
+def test_flushes_after_the_interval(written):
+    async def run():
+        log = AuditLog(batch_size=100, flush_interval=0.01)
+        log.record(OperationType.UPDATE, 1, 1)
+        await asyncio.sleep(0.2)
+        flushed = list(written)
+        await log.close()
+        return flushed
+
+    assert asyncio.run(run()) == [[1]]
+
+
+def test_full_batch_is_written_without_waiting(written):
+    async def run():
+        log = AuditLog(batch_size=2, flush_interval=60)
+        log.record(OperationType.CREATE, 1, 1)
+        log.record(OperationType.CREATE, 2, 1)
+        await asyncio.sleep(0.05)
+        flushed = list(written)
+        await log.close()
+        return flushed
+
+    assert asyncio.run(run()) == [[1, 2]]
+
+
+def test_failed_batch_is_kept_for_close(monkeypatch, capsys):
+    batches = []
+    failures = [RuntimeError("database is down")]
+
+    async def create_many(batch):
+        if failures:
+            raise failures.pop()
+        batches.append([op.file_id for op in batch])
+
+    monkeypatch.setattr(audit.operationsAccessor, "create_many", create_many)
+
+    async def run():
+        log = AuditLog(batch_size=2, flush_interval=60)
+        log.record(OperationType.CREATE, 1, 1)
+        log.record(OperationType.CREATE, 2, 1)
+        await asyncio.sleep(0.05)
+        await log.close()
+
+    asyncio.run(run())
+    assert "Error writing audit log: database is down" in capsys.readouterr().out
+    assert batches == [[1, 2]]
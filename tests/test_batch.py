@@ -0,0 +1,73 @@
+"""batch, with the database accessors replaced by in-memory stand-ins."""
+
+import asyncio
+import json
+
+import pytest
+
+from src.cli import acquire_lock_for_path
+from src.core.buildParser import build_parser
+from src.files import batch
+from src.files.batch import BatchManager, batchManager
+from src.files.manager import fileManager
+
+
+async def _none(*args, **kwargs):
+    return None
+
+
+async def _nothing(*args, **kwargs):
+    return []
+
+
+@pytest.fixture
+def run_batch(storage, tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, "is_authenticated", lambda: 1)
+    monkeypatch.setattr(batch.fileAccessor, "fetch_by_names", _nothing)
+    monkeypatch.setattr(batch.usageAccessor, "room", _none)
+    monkeypatch.setattr(fileManager, "discard_blocks", _none)
+
+    def run(items):
+        manifest = tmp_path / "manifest.ndjson"
+        manifest.write_text("".join(json.dumps(item) + "\n" for item in items))
+        args = build_parser().parse_args(["batch", str(manifest)])
+        asyncio.run(batchManager.run(args))
+
+    return run
+
+
+def test_paths_stay_locked_until_metadata_is_saved(storage, run_batch, monkeypatch):
+    seen = []
+
+    async def apply_metadata(self, changes, rows, user):
+        try:
+            async with acquire_lock_for_path(storage / "a.txt", True, timeout=0.05):
+                seen.append("unlocked")
+        except TimeoutError:
+            seen.append("locked")
+        return []
+
+    monkeypatch.setattr(BatchManager, "_apply_metadata", apply_metadata)
+    run_batch([{"op": "write", "path": "a.txt", "content": "new"}])
+    assert seen == ["locked"]
+    assert (storage / "a.txt").read_text() == "new"
+
+
+def test_files_restored_when_metadata_fails(storage, run_batch, monkeypatch):
+    (storage / "a.txt").write_text("old")
+    (storage / "b.txt").write_text("gone")
+
+    async def apply_metadata(self, changes, rows, user):
+        raise RuntimeError("database down")
+
+    monkeypatch.setattr(BatchManager, "_apply_metadata", apply_metadata)
+    run_batch(
+        [
+            {"op": "write", "path": "a.txt", "content": "new"},
+            {"op": "create", "path": "c.txt", "content": "created"},
+            {"op": "delete", "path": "b.txt"},
+        ]
+    )
+    assert (storage / "a.txt").read_text() == "old"
+    assert (storage / "b.txt").read_text() == "gone"
+    assert not (storage / "c.txt").exists()
@@ -0,0 +1,96 @@
+"""The content-addressed blob store and its manifests."""
+
+import io
+import os
+
+import pytest
+
+from src.blobs.store import MANIFEST_MAGIC, BlobStore
+from src.cli import AtomicWriter
+
+BLOCK = 1024
+DATA = os.urandom(3 * BLOCK) + os.urandom(BLOCK // 2)
+
+
+def _xattrs_supported(path):
+    try:
+        os.setxattr(path, "user.filemgr.probe", b"1")
+    except OSError:
+        return False
+    return True
+
+
+@pytest.fixture
+def store(tmp_path):
+    if not _xattrs_supported(tmp_path):
+        pytest.skip("no user extended attributes on this filesystem")
+    return BlobStore(tmp_path / "blobs", block_size=BLOCK)
+
+
+@pytest.fixture
+def stored(store, tmp_path):
+    """A path holding the manifest of DATA."""
+    p = tmp_path / "file.bin"
+    manifest = store.write_blocks(io.BytesIO(DATA), len(DATA))
+    with AtomicWriter(p, "wb") as f:
+        store.write_manifest(f, manifest)
+    return p
+
+
+def test_identical_blocks_are_stored_once(store):
+    data = DATA[:BLOCK] * 3
+    created = []
+    manifest = store.write_blocks(io.BytesIO(data), len(data), created)
+    assert len(manifest["blocks"]) == 3 and len(created) == 1
+    again = []
+    assert store.write_blocks(io.BytesIO(data), len(data), again) == manifest
+    assert again == []
+
+
+def test_manifest_reads_back(store, stored):
+    assert store.stored_size(stored) == len(DATA)
+    assert not store.is_plain(stored)
+    assert store.read_bytes(stored) == DATA
+    assert len(store.manifest_blocks(stored)) == 4
+
+
+@pytest.mark.parametrize("offset", [0, 1, BLOCK - 1, BLOCK, 2 * BLOCK + 7, len(DATA)])
+def test_reads_across_block_boundaries(store, stored, offset):
+    with store.open(stored) as f:
+        f.seek(offset)
+        assert f.read(BLOCK + 3) == DATA[offset : offset + BLOCK + 3]
+        f.seek(-5, io.SEEK_END)
+        assert f.read() == DATA[-5:]
+
+
+def test_unmarked_content_is_never_a_manifest(store, stored, tmp_path):
+    # Uploaded bytes that look like a manifest are served as they are.
+    p = tmp_path / "upload.bin"
+    p.write_bytes(stored.read_bytes())
+    assert p.read_bytes().startswith(MANIFEST_MAGIC)
+    assert store.is_plain(p)
+    assert store.read_bytes(p) == p.read_bytes()
+
+
+@pytest.mark.parametrize(
+    "manifest",
+    [
+        b'{"size": 1, "blocks": [["../../../etc/passwd", 1]]}',
+        b'{"size": 5, "blocks": []}',
+        b'{"blocks": []}',
+        b"[]",
+    ],
+)
+def test_malformed_manifests_are_rejected(store, stored, manifest):
+    with open(stored, "r+b") as f:
+        f.truncate(0)
+        f.write(MANIFEST_MAGIC + manifest)
+    with pytest.raises(ValueError):
+        store.open(stored)
+
+
+def test_truncated_blob(store, stored):
+    h = store.manifest_blocks(stored)[1][0]
+    store.blob_path(h).write_bytes(b"short")
+    with pytest.raises(OSError, match="truncated"):
+        store.read_bytes(stored)
@@ -0,0 +1,76 @@
+"""clone_file and its fallbacks, as used by copy."""
+
+import errno
+import os
+
+import pytest
+
+from src import cli
+from src.cli import STORED_FORMAT_XATTR, clone_file, stored_format
+from src.files.manager import FileManager
+
+MiB = 1 << 20
+
+
+@pytest.fixture
+def sparse(tmp_path):
+    """4 MiB with data only in the first and last MiB."""
+    p = tmp_path / "sparse"
+    with open(p, "wb") as f:
+        f.write(b"head" * (MiB // 4))
+        f.seek(3 * MiB)
+        f.write(b"tail" * (MiB // 4))
+    return p
+
+
+def _clone(src, dst):
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        return clone_file(s.fileno(), d.fileno())
+
+
+def _no_reflink(monkeypatch):
+    def ioctl(*args):
+        raise OSError(errno.EOPNOTSUPP, "no reflinks")
+
+    monkeypatch.setattr(cli.fcntl, "ioctl", ioctl)
+
+
+def test_copy_file_range_keeps_holes(sparse, tmp_path, monkeypatch):
+    _no_reflink(monkeypatch)
+    dst = tmp_path / "copy"
+    assert _clone(sparse, dst) == "copy_file_range"
+    assert dst.read_bytes() == sparse.read_bytes()
+    assert dst.stat().st_blocks <= sparse.stat().st_blocks
+
+
+def test_sendfile_fallback(sparse, tmp_path, monkeypatch):
+    _no_reflink(monkeypatch)
+
+    def copy_file_range(*args):
+        raise OSError(errno.EXDEV, "cross-device")
+
+    monkeypatch.setattr(os, "copy_file_range", copy_file_range)
+    dst = tmp_path / "copy"
+    assert _clone(sparse, dst) == "sendfile"
+    assert dst.read_bytes() == sparse.read_bytes()
+
+
+def test_empty_and_hole_only_files(tmp_path, monkeypatch):
+    _no_reflink(monkeypatch)
+    for size in (0, 2 * MiB):
+        src = tmp_path / f"src{size}"
+        with open(src, "wb") as f:
+            f.truncate(size)
+        _clone(src, tmp_path / "dst")
+        assert (tmp_path / "dst").read_bytes() == bytes(size)
+
+
+def test_copy_keeps_the_stored_format(sparse, tmp_path):
+    try:
+        os.setxattr(sparse, STORED_FORMAT_XATTR, b"zlib")
+    except OSError:
+        pytest.skip("no user extended attributes on this filesystem")
+    dst = tmp_path / "copy"
+    FileManager._copy_file(sparse, dst)
+    assert stored_format(dst) == "zlib"
+    assert dst.read_bytes() == sparse.read_bytes()
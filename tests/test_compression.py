@@ -0,0 +1,72 @@
+"""The compressed storage tier: policy, round trips and seeking."""
+
+import io
+import os
+
+import pytest
+
+from src.blobs import compression
+from src.blobs.compression import CODECS, codec_for
+from src.blobs.store import blobStore
+from src.cli import STORED_FORMAT_XATTR
+from src.files.manager import fileManager
+
+DATA = b"".join(b"line %d of some compressible text\n" % i for i in range(50_000))
+
+
+@pytest.fixture
+def xattrs(storage):
+    probe = storage / ".probe"
+    probe.touch()
+    try:
+        os.setxattr(probe, "user.filemgr.probe", b"1")
+    except OSError:
+        pytest.skip("no user extended attributes on this filesystem")
+    finally:
+        probe.unlink()
+    return storage
+
+
+def _store(p, codec, data=DATA):
+    return fileManager.store_content(p, io.BytesIO(data), len(data), compress=codec)
+
+
+@pytest.mark.parametrize("codec", sorted(CODECS))
+def test_round_trip(xattrs, codec):
+    p = xattrs / "doc.txt"
+    size, _, _, _ = _store(p, codec)
+    assert size == len(DATA)
+    assert p.stat().st_size < len(DATA) // 4
+    assert blobStore.compressed_header(p) == (codec, len(DATA))
+    assert blobStore.stored_size(p) == len(DATA)
+    assert blobStore.read_bytes(p) == DATA
+
+
+@pytest.mark.parametrize("codec", sorted(CODECS))
+def test_seek_forward_and_back(xattrs, codec):
+    p = xattrs / "doc.txt"
+    _store(p, codec)
+    with blobStore.open(p) as f:
+        for offset in (len(DATA) // 2, 10, len(DATA) - 3, 0):
+            f.seek(offset)
+            assert f.read(100) == DATA[offset : offset + 100]
+
+
+def test_header_must_match_the_marked_codec(xattrs):
+    p = xattrs / "doc.txt"
+    _store(p, "zlib")
+    os.setxattr(p, STORED_FORMAT_XATTR, b"lzma")
+    with pytest.raises(ValueError, match="Invalid compressed file"):
+        blobStore.open(p)
+
+
+def test_policy(monkeypatch, tmp_path):
+    monkeypatch.setattr(compression, "COMPRESSION", None)
+    assert codec_for(tmp_path / "a.txt") is None
+    assert codec_for(tmp_path / "a.txt", "lzma") == "lzma"
+    monkeypatch.setattr(compression, "COMPRESSION", "zlib")
+    assert codec_for(tmp_path / "a.TXT") == "zlib"
+    assert codec_for(tmp_path / "a.bin") is None
+    assert codec_for(tmp_path / "a.txt", "none") is None
+    with pytest.raises(ValueError, match="not available"):
+        codec_for(tmp_path / "a.txt", "brotli")
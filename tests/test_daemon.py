@@ -0,0 +1,37 @@
+"""The serve daemon, on a socket in a temporary directory."""
+
+import asyncio
+import os
+import signal
+import stat
+
+from src.core.buildParser import build_parser
+from src.daemon import Daemon, forward_to_daemon
+from src.files import manager
+
+
+def test_socket_private_and_commands_forwarded(storage, tmp_path, monkeypatch, capfd):
+    monkeypatch.setattr(manager, "is_authenticated", lambda: 1)
+    (storage / "hello.txt").write_text("hi")
+    sock = tmp_path / "filemgr.sock"
+    umask = os.umask(0o022)
+    os.umask(umask)
+
+    async def run():
+        args = build_parser().parse_args(["serve", "--socket", str(sock)])
+        task = asyncio.create_task(Daemon().serve(args))
+        while not sock.exists():
+            await asyncio.sleep(0.01)
+        mode = stat.S_IMODE(os.stat(sock).st_mode)
+        status = await asyncio.to_thread(forward_to_daemon, ["list"], sock)
+        os.kill(os.getpid(), signal.SIGINT)
+        await task
+        return mode, status
+
+    mode, status = asyncio.run(run())
+    assert mode == 0o600
+    assert status == 0
+    assert "hello.txt" in capfd.readouterr().out
+    # The private umask was only in effect for the bind.
+    assert os.umask(umask) == umask
+    assert not sock.exists()
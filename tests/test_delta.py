@@ -0,0 +1,79 @@
+"""Rolling-checksum delta writes and the signature cache."""
+
+import hashlib
+import io
+import os
+import random
+
+import pytest
+
+from src.files.delta import DeltaWriter, Signature, SignatureCache
+
+BLOCK = 1024
+OLD = random.Random(0).randbytes(40 * BLOCK + 123)
+NEW = random.Random(1).randbytes(3 * BLOCK)
+
+CASES = {
+    "identical": (OLD, len(OLD) - len(OLD) % BLOCK),
+    "prepended": (b"xyz" + OLD, 38 * BLOCK),
+    # Up to a block inserted anywhere is re-synchronized after.
+    "inserted": (OLD[: 10 * BLOCK + 5] + NEW[:500] + OLD[10 * BLOCK + 5 :], 38 * BLOCK),
+    "appended": (OLD + NEW, 40 * BLOCK),
+    "truncated": (OLD[: 20 * BLOCK + 7], 20 * BLOCK),
+    "new": (NEW, 0),
+    "empty": (b"", 0),
+}
+
+
+@pytest.fixture
+def delta(tmp_path):
+    cache = SignatureCache(tmp_path / "signatures", block_size=BLOCK)
+    old = tmp_path / "old"
+    old.write_bytes(OLD)
+
+    def write(data):
+        out = tmp_path / "out"
+        with open(old, "rb") as fh, open(out, "wb") as dst:
+            result = DeltaWriter(cache).write(
+                old, fh.fileno(), io.BytesIO(data), dst.fileno(), len(data)
+            )
+        return out.read_bytes(), result
+
+    return write
+
+
+def _signature(data):
+    sig = Signature(BLOCK)
+    sig.update(data)
+    return sig.entries
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_output_and_reuse(delta, case):
+    data, at_least = CASES[case]
+    out, (size, digest, reused, signature) = delta(data)
+    assert out == data
+    assert (size, digest) == (len(data), hashlib.sha256(data).hexdigest())
+    assert at_least <= reused <= len(data)
+    assert signature.entries == _signature(data)
+
+
+def test_signature_is_fed_in_any_chunks():
+    sig = Signature(BLOCK)
+    for i in range(0, len(OLD), 333):
+        sig.update(OLD[i : i + 333])
+    assert sig.entries == _signature(OLD)
+    assert Signature.load(sig.dump()).entries == sig.entries
+
+
+def test_cache_follows_the_file(tmp_path):
+    cache = SignatureCache(tmp_path / "signatures", block_size=BLOCK)
+    p = tmp_path / "f"
+    p.write_bytes(OLD)
+    with open(p, "rb") as f:
+        first = cache.get(p, f.fileno())
+        assert cache.get(p, f.fileno()).dump() == first.dump()
+    p.write_bytes(NEW)
+    os.utime(p, ns=(0, 0))
+    with open(p, "rb") as f:
+        assert cache.get(p, f.fileno()).entries == _signature(NEW)
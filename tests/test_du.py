@@ -0,0 +1,75 @@
+"""du and the mtime-keyed directory size cache."""
+
+import asyncio
+
+import pytest
+
+from src.core.buildParser import build_parser
+from src.usage import manager
+from src.usage.dirsizes import DirSizeCache
+
+
+@pytest.fixture
+def tree(storage):
+    for rel, size in {"a": 1, "d/b": 10, "d/e/c": 100, "d/e/f/g": 1000}.items():
+        p = storage / rel
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_bytes(b"x" * size)
+    (storage / "empty").mkdir()
+    return storage
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DirSizeCache(tmp_path / "dirsizes.sqlite3")
+
+
+def test_totals_include_subdirectories(tree, cache):
+    totals, rescanned = cache.tree(tree, workers=3)
+    assert totals == {
+        "": (1111, 4),
+        "d": (1110, 3),
+        "d/e": (1100, 2),
+        "d/e/f": (1000, 1),
+        "empty": (0, 0),
+    }
+    assert rescanned == 5
+
+
+def test_only_changed_directories_are_rescanned(tree, cache):
+    cache.tree(tree)
+    assert cache.tree(tree)[1] == 0
+
+    (tree / "d/e/new").write_bytes(b"x" * 5)
+    totals, rescanned = cache.tree(tree)
+    assert rescanned == 1
+    assert totals["d"] == (1115, 4) and totals[""] == (1116, 5)
+
+
+def test_removed_directories_leave_the_cache(tree, cache):
+    cache.tree(tree)
+    (tree / "d/e/f/g").unlink()
+    (tree / "d/e/f").rmdir()
+    totals, _ = cache.tree(tree / "d")
+    assert "d/e/f" not in totals and totals["d"] == (110, 2)
+    assert cache.conn.execute("SELECT count(*) FROM dirs").fetchone() == (4,)
+
+
+@pytest.fixture
+def du(tree, cache, monkeypatch, capsys):
+    monkeypatch.setattr(manager, "is_authenticated", lambda: 1)
+    monkeypatch.setattr(manager, "dirSizeCache", cache)
+
+    def run(*options):
+        args = build_parser().parse_args(["du", *options])
+        asyncio.run(manager.usageManager.du(args))
+        return [line.split() for line in capsys.readouterr().out.splitlines()]
+
+    return run
+
+
+def test_du_depth_and_sort(du):
+    rows = du("--depth", "1", "--sort", "size")
+    assert [row[2] for row in rows[:-1]] == [".", "d", "empty"]
+    assert [row[2] for row in du("d", "--depth", "5")[:-1]] == ["d", "d/e", "d/e/f"]
+    assert du("--depth", "-1") == [["--depth", "must", "be", "non-negative"]]
@@ -0,0 +1,105 @@
+"""extract-zip and its decompressed-byte budget."""
+
+import asyncio
+import os
+import stat
+import zipfile
+
+import pytest
+
+from src import cli
+from src.cli import UMASK, ExtractBudget, extract_zip_member
+from src.core.buildParser import build_parser
+from src.files import manager
+from src.files.manager import fileManager
+
+FILES = {
+    "a.txt": b"alpha\n" * 10,
+    "dir/b.bin": os.urandom(100_000),
+    "dir/sub/c.txt": b"",
+}
+
+
+def _zip(path, members, mode=None):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members.items():
+            info = zipfile.ZipInfo(name)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            if mode is not None:
+                info.create_system = 3
+                info.external_attr = mode << 16
+            zf.writestr(info, data)
+    return path
+
+
+@pytest.fixture
+def extract(storage, monkeypatch, capsys):
+    monkeypatch.setattr(manager, "is_authenticated", lambda: 1)
+
+    def run(members, *options, mode=None):
+        _zip(storage / "in.zip", members, mode)
+        args = build_parser().parse_args(["extract-zip", "in.zip", *options])
+        asyncio.run(fileManager.extract_zip(args))
+        return capsys.readouterr().out
+
+    return run
+
+
+@pytest.mark.parametrize("workers", ["1", "4"])
+def test_extracts_every_member(storage, extract, workers):
+    out = extract(FILES, "--outdir", "out", "--workers", workers)
+    assert "Extracted zip" in out
+    for name, data in FILES.items():
+        assert (storage / "out" / name).read_bytes() == data
+
+
+def test_keeps_the_recorded_permissions(storage, extract):
+    extract({"script.sh": b"#!/bin/sh\n"}, mode=0o750)
+    mode = stat.S_IMODE((storage / "script.sh").stat().st_mode)
+    assert mode == 0o750 & ~UMASK
+
+
+@pytest.mark.parametrize("name", ["../evil.txt", "dir/../../evil.txt", "/evil.txt"])
+def test_refuses_paths_outside_outdir(storage, extract, name):
+    out = extract({name: b"x"}, "--outdir", "out")
+    assert "Unsafe entry in zip" in out
+    assert not (storage.parent / "evil.txt").exists()
+
+
+def test_failed_extraction_leaves_nothing_behind(storage, extract, monkeypatch):
+    # The budget runs out on the last member, after the others are written.
+    monkeypatch.setattr(cli, "ZIP_MAX_TOTAL_EXTRACTED_SIZE", 150_000)
+    monkeypatch.setattr(manager, "inspect_zip_safety", lambda zf: None)
+    members = {"new/a.bin": os.urandom(100_000), "new/deep/b.bin": os.urandom(100_000)}
+    out = extract(members, "--workers", "1")
+    assert "Total extracted size too large" in out
+    assert sorted(p.name for p in storage.iterdir()) == ["in.zip"]
+
+
+def test_member_checks_the_ratio_of_what_it_decompresses(tmp_path):
+    # Even when nothing inspected the archive's headers beforehand.
+    archive = _zip(tmp_path / "bomb.zip", {"zeros": bytes(2_000_000)})
+    target = tmp_path / "zeros"
+    with zipfile.ZipFile(archive) as zf:
+        info = zf.getinfo("zeros")
+        with pytest.raises(ValueError, match="Suspicious compression ratio"):
+            extract_zip_member(zf, info, target, ExtractBudget())
+    assert not target.exists()
+
+
+def test_cancelled_extraction_stops(tmp_path):
+    archive = _zip(tmp_path / "in.zip", FILES)
+    budget = ExtractBudget()
+    budget.cancelled.set()
+    with zipfile.ZipFile(archive) as zf:
+        with pytest.raises(ValueError, match="cancelled"):
+            extract_zip_member(zf, zf.getinfo("a.txt"), tmp_path / "a.txt", budget)
+    assert not (tmp_path / "a.txt").exists()
+
+
+def test_extract_budget_counts_across_threads(monkeypatch):
+    monkeypatch.setattr(cli, "ZIP_MAX_TOTAL_EXTRACTED_SIZE", 10)
+    budget = ExtractBudget()
+    budget.consume(6)
+    with pytest.raises(ValueError, match="Total extracted size too large"):
+        budget.consume(5)
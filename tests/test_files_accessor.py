@@ -0,0 +1,53 @@
+"""FileAccessor against the test database (see conftest.py)."""
+
+from src.files.accessor import fileAccessor
+from src.files.files import Files
+
+
+def test_file_size_above_int32(rolled_back, make_user):
+    size = 5 * 2**30
+
+    async def run():
+        user = await make_user()
+        await fileAccessor.create(
+            Files(file_name="big.bin", file_size=size, user_id=user)
+        )
+        return (await fileAccessor.fetch_by_name("big.bin", user)).file_size
+
+    assert rolled_back(run) == size
+
+
+def test_same_name_for_two_users(rolled_back, make_user):
+    async def sizes(*users):
+        rows = [await fileAccessor.fetch_by_name("shared.txt", u) for u in users]
+        return [(f.user_id, f.file_size) for f in rows]
+
+    async def run():
+        alice, bob = await make_user(), await make_user()
+        for user, size in ((alice, 1), (bob, 2)):
+            await fileAccessor.create(
+                Files(file_name="shared.txt", file_size=size, user_id=user)
+            )
+        before = await sizes(alice, bob)
+        updated = await fileAccessor.update(10, "shared.txt", bob)
+        return alice, bob, before, updated.user_id, await sizes(alice, bob)
+
+    alice, bob, before, updated, after = rolled_back(run)
+    assert before == [(alice, 1), (bob, 2)]
+    assert updated == bob
+    assert after == [(alice, 1), (bob, 10)]
+
+
+def test_fetch_by_name_of_another_user(rolled_back, make_user):
+    async def run():
+        owner, other = await make_user(), await make_user()
+        await fileAccessor.create(
+            Files(file_name="mine.txt", file_size=1, user_id=owner)
+        )
+        return (
+            await fileAccessor.fetch_by_name("mine.txt", other),
+            await fileAccessor.update(5, "mine.txt", other),
+            (await fileAccessor.fetch_by_name("mine.txt", owner)).file_size,
+        )
+
+    assert rolled_back(run) == (None, None, 1)
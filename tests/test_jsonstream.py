@@ -0,0 +1,87 @@
+"""The streaming JSON tokenizer, pointer selection and pretty-printer."""
+
+import io
+import json
+
+import pytest
+
+from src.files.jsonstream import dump_events, iter_events, select_pointer
+
+DOC = {
+    "name": 'quote " and backslash \\',
+    "unicode": "żółw ☃ \U0001f600",
+    "numbers": [0, -1, 12345678901234567890, 1.5, -2.5e-3, 1e10],
+    "constants": [True, False, None],
+    "empty": {"map": {}, "array": []},
+    "a/b": {"~c": "escaped pointer tokens"},
+    "nested": [[{"deep": [1, [2, [3]]]}]],
+}
+
+
+def _dump(data: bytes, pointer: str = "", read_size: int = 64 * 1024) -> str:
+    events = iter_events(io.BytesIO(data), read_size)
+    if pointer:
+        events = select_pointer(events, pointer)
+    out = io.StringIO()
+    dump_events(events, out)
+    return out.getvalue()
+
+
+@pytest.mark.parametrize("read_size", [1, 2, 3, 7, 64 * 1024])
+def test_matches_json_dumps_at_any_read_size(read_size):
+    # Small reads split strings, escapes, numbers and constants across chunks.
+    data = json.dumps(DOC, ensure_ascii=False).encode()
+    assert _dump(data, read_size=read_size) == json.dumps(DOC, indent=2)
+
+
+def test_byte_order_mark_and_whitespace():
+    assert _dump(b'\xef\xbb\xbf \n\t{"a" : [ 1 , 2 ] }\r\n') == json.dumps(
+        {"a": [1, 2]}, indent=2
+    )
+
+
+@pytest.mark.parametrize(
+    "pointer, expected",
+    [
+        ("/name", DOC["name"]),
+        ("/numbers/3", 1.5),
+        ("/a~1b/~0c", "escaped pointer tokens"),
+        ("/nested/0/0/deep/1", [2, [3]]),
+        ("/empty", DOC["empty"]),
+    ],
+)
+def test_select_pointer(pointer, expected):
+    data = json.dumps(DOC).encode()
+    assert _dump(data, pointer, read_size=5) == json.dumps(expected, indent=2)
+
+
+@pytest.mark.parametrize(
+    "pointer", ["/missing", "/numbers/99", "/numbers/x", "/name/0", "no-slash"]
+)
+def test_select_pointer_not_found(pointer):
+    with pytest.raises(LookupError):
+        _dump(json.dumps(DOC).encode(), pointer)
+
+
+def test_select_pointer_stops_after_the_value():
+    # Whatever follows the selected value is never read.
+    assert _dump(b'{"a": [1, 2], "b": oops', "/a") == json.dumps([1, 2], indent=2)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"",
+        b"{",
+        b'{"a": [1, 2,',
+        b'{"a" 1}',
+        b"{a: 1}",
+        b"[1 2]",
+        b'"unterminated',
+        b"[tru]",
+        b"[1] [2]",
+    ],
+)
+def test_malformed_documents_raise_value_error(data):
+    with pytest.raises(ValueError):
+        _dump(data, read_size=4)
@@ -0,0 +1,70 @@
+"""Every store path stops with PayloadTooLarge once it reads past its limit."""
+
+import io
+
+import pytest
+
+from src.blobs.compression import compress_stream
+from src.blobs.store import BlobStore
+from src.cli import PayloadTooLarge, copy_stream
+from src.files.delta import deltaWriter
+
+DATA = b"0123456789" * 1000
+
+
+class _Reader(io.BytesIO):
+    """Counts how much of the source was consumed."""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.consumed = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.consumed += len(data)
+        return data
+
+    def readinto(self, b):
+        n = super().readinto(b)
+        self.consumed += n
+        return n
+
+
+def test_copy_stream(tmp_path):
+    src = _Reader(DATA)
+    with pytest.raises(PayloadTooLarge, match="Data too large"):
+        copy_stream(src, io.BytesIO(), 2048, chunk_size=1024)
+    # Stops at the first chunk past the limit instead of draining the source.
+    assert src.consumed == 3072
+    assert copy_stream(io.BytesIO(DATA), io.BytesIO(), len(DATA))[0] == len(DATA)
+
+
+def test_compress_stream(tmp_path):
+    with open(tmp_path / "out", "wb") as dst:
+        with pytest.raises(PayloadTooLarge):
+            compress_stream(io.BytesIO(DATA), dst, "zlib", len(DATA) - 1)
+
+
+def test_write_blocks_removes_what_it_wrote(tmp_path):
+    store = BlobStore(tmp_path / "blobs", block_size=1024)
+    created = []
+    with pytest.raises(PayloadTooLarge):
+        store.write_blocks(io.BytesIO(DATA), len(DATA) - 1, created)
+    assert created
+    assert not any(store.blob_path(h).exists() for h in created)
+
+
+def test_delta_write(tmp_path):
+    old = tmp_path / "old"
+    old.write_bytes(DATA)
+    with open(old, "rb") as fh, open(tmp_path / "new", "wb") as dst:
+        with pytest.raises(PayloadTooLarge):
+            deltaWriter.write(
+                old, fh.fileno(), io.BytesIO(DATA * 2), dst.fileno(), len(DATA)
+            )
+
+
+def test_is_a_value_error():
+    # Callers that only know about ValueError still see the same message.
+    with pytest.raises(ValueError, match="^Data too large$"):
+        copy_stream(io.BytesIO(DATA), io.BytesIO(), 1)
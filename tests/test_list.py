@@ -0,0 +1,80 @@
+"""list: sorted and unsorted output, pagination and the recursive walker."""
+
+import asyncio
+import random
+
+import pytest
+
+from src.cli import external_sorted, walk_entries
+from src.core.buildParser import build_parser
+from src.files import manager
+from src.files.manager import fileManager
+
+NAMES = [f"f{i:03}" for i in range(25)]
+
+
+@pytest.fixture
+def tree(storage):
+    for name in NAMES:
+        (storage / name).write_bytes(b"x" * len(name))
+    (storage / "d" / "e").mkdir(parents=True)
+    (storage / "d" / "in_d").write_bytes(b"12")
+    (storage / "d" / "e" / "in_e").write_bytes(b"")
+    (storage / "d" / "loop").symlink_to(storage)
+    return storage
+
+
+@pytest.fixture
+def listing(monkeypatch, capsys):
+    monkeypatch.setattr(manager, "is_authenticated", lambda: 1)
+
+    def run(*options):
+        args = build_parser().parse_args(["list", *options])
+        asyncio.run(fileManager.list(args))
+        return capsys.readouterr().out.splitlines()
+
+    return run
+
+
+def _names(lines):
+    return [line[6:].split()[0] for line in lines if line[:1] in ("[", " ")]
+
+
+def test_sorted_listing(tree, listing):
+    assert _names(listing()) == sorted([*NAMES, "d"])
+
+
+def test_pages_cover_every_entry_once(tree, listing):
+    seen = []
+    options = ["--limit", "7"]
+    while True:
+        lines = listing(*options)
+        seen += _names(lines)
+        if not lines[-1].startswith("Next cursor: "):
+            break
+        options = ["--limit", "7", "--cursor", lines[-1].split(": ", 1)[1]]
+    assert seen == sorted([*NAMES, "d"])
+
+
+def test_unsorted_listing_is_truncated(tree, listing):
+    lines = listing("--unsorted", "--limit", "5")
+    assert len(_names(lines)) == 5
+    assert lines[-1] == "... output truncated at 5 entries"
+    assert listing("--unsorted", "--cursor", "x") == ["--cursor requires sorted output"]
+
+
+@pytest.mark.parametrize("workers", ["1", "8"])
+def test_recursive_listing(tree, listing, workers):
+    names = _names(listing("-r", "--workers", workers))
+    assert names == sorted([*NAMES, "d", "d/e", "d/e/in_e", "d/in_d", "d/loop"])
+
+
+def test_walk_entries_does_not_follow_symlinks(tree):
+    paths = {rel for rel, _ in walk_entries(tree / "d", workers=2)}
+    assert paths == {"e", "e/in_e", "in_d", "loop"}
+
+
+@pytest.mark.parametrize("chunk_items", [1, 3, 10, 1000])
+def test_external_sorted(chunk_items):
+    items = [(random.random(), str(i)) for i in range(200)]
+    assert list(external_sorted(items, chunk_items)) == sorted(items)
@@ -0,0 +1,150 @@
+"""The cross-process reader/writer lock manager."""
+
+import asyncio
+import gc
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+from src.cli import LockManager
+
+ROOT = Path(__file__).resolve().parent.parent
+A, B = Path("/a"), Path("/b")
+
+
+@pytest.fixture
+def locks(tmp_path):
+    return LockManager(tmp_path / "locks", slots=1024)
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_readers_share_and_writers_exclude(locks):
+    events = []
+
+    async def hold(name, shared, delay):
+        async with locks.lock(A, shared=shared):
+            events.append(f"+{name}")
+            await asyncio.sleep(delay)
+            events.append(f"-{name}")
+
+    async def run():
+        first = asyncio.gather(hold("r1", True, 0.05), hold("r2", True, 0.05))
+        await asyncio.sleep(0.01)
+        await asyncio.gather(first, hold("w", False, 0.01))
+
+    _run(run())
+    assert events[:2] == ["+r1", "+r2"]
+    assert events.index("+w") > max(events.index("-r1"), events.index("-r2"))
+
+
+def test_waiting_writer_goes_before_new_readers(locks):
+    events = []
+
+    async def hold(name, shared, start):
+        await asyncio.sleep(start)
+        async with locks.lock(A, shared=shared):
+            events.append(name)
+            await asyncio.sleep(0.03)
+
+    async def run():
+        await asyncio.gather(
+            hold("r1", True, 0), hold("w", False, 0.01), hold("r2", True, 0.02)
+        )
+
+    _run(run())
+    assert events == ["r1", "w", "r2"]
+
+
+def test_timeout(locks):
+    async def run():
+        async with locks.lock(A):
+            with pytest.raises(TimeoutError, match="a"):
+                async with locks.lock(A, shared=True, timeout=0.05):
+                    pass
+        # Nothing is left behind by the request that timed out.
+        async with locks.lock(A, timeout=0.05):
+            pass
+
+    _run(run())
+
+
+def test_lock_many_in_any_order_does_not_deadlock(locks):
+    async def run():
+        async def many(requests):
+            for _ in range(20):
+                async with locks.lock_many(requests, timeout=2):
+                    await asyncio.sleep(0)
+
+        await asyncio.gather(
+            many([(A, False), (B, False)]), many([(B, False), (A, False)])
+        )
+
+    _run(run())
+
+
+def test_lock_many_same_slot_once(tmp_path):
+    locks = LockManager(tmp_path / "locks", slots=1)
+
+    async def run():
+        async with locks.lock_many([(A, True), (B, False)], timeout=0.5):
+            assert locks._states[0].writer
+            assert not locks._states[0].readers
+
+    _run(run())
+
+
+def test_slot_states_are_dropped(locks):
+    async def run():
+        async with locks.lock(A):
+            pass
+
+    _run(run())
+    gc.collect()
+    assert len(locks._states) == 0
+
+
+async def _attempt(locks, p, timeout):
+    async with locks.lock(p, shared=True, timeout=timeout):
+        pass
+
+
+def test_excludes_other_processes(locks):
+    child = textwrap.dedent(
+        f"""
+        import asyncio, sys
+        from pathlib import Path
+        from src.cli import LockManager
+
+        async def main():
+            locks = LockManager(Path({str(locks.path)!r}), slots={locks.slots})
+            async with locks.lock(Path("/a")):
+                print("locked", flush=True)
+                sys.stdin.readline()
+
+        asyncio.run(main())
+        """
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-c", child],
+        cwd=ROOT,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        assert proc.stdout.readline() == "locked\n"
+
+        with pytest.raises(TimeoutError):
+            _run(_attempt(locks, A, 0.2))
+        # Another path is not affected.
+        _run(_attempt(locks, B, 0.2))
+    finally:
+        proc.stdin.close()
+        proc.wait(timeout=10)
+    _run(_attempt(locks, A, 2))
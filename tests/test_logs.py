@@ -0,0 +1,83 @@
+"""logs pages through the operations log, with the accessor stubbed out."""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.core.buildParser import build_parser
+from src.files import manager
+from src.files.manager import fileManager
+from src.operations.accessor import operationsAccessor
+
+START = datetime(2024, 5, 1, 12, 0)
+ROWS = [
+    (START + timedelta(minutes=i), i + 1, "CREATE", f"f{i}", "alice") for i in range(5)
+]
+
+
+@pytest.fixture
+def logs(monkeypatch, capsys):
+    calls = []
+
+    async def stream_logs(after=None, limit=None, **filters):
+        calls.append(dict(filters, after=after, limit=limit))
+        try:
+            for row in ROWS:
+                if after is None or row[:2] > after:
+                    yield row
+        finally:
+            calls[-1]["closed"] = True
+
+    monkeypatch.setattr(manager, "is_authenticated", lambda: 1)
+    monkeypatch.setattr(operationsAccessor, "stream_logs", stream_logs)
+
+    def run(*argv):
+        args = build_parser().parse_args(["logs", *argv])
+        asyncio.run(fileManager.show_logs(args))
+        return capsys.readouterr().out
+
+    run.calls = calls
+    return run
+
+
+def test_limit_prints_a_cursor_to_the_next_page(logs):
+    out = logs("--limit", "2", "--user", "alice", "--type", "create")
+    assert out.splitlines() == [
+        "01.05.24 12:00 - CREATE f0 by alice",
+        "01.05.24 12:01 - CREATE f1 by alice",
+        "Next cursor: 2024-05-01T12:01:00,2",
+    ]
+    # One more row than is shown is asked for, to know there is a next page.
+    [call] = logs.calls
+    assert call["limit"] == 3 and call["username"] == "alice"
+    assert call["type"] == "CREATE"
+    # Stopping early still closes the stream.
+    assert call["closed"]
+
+
+def test_cursor_resumes_after_the_last_row(logs):
+    out = logs("--limit", "2", "--cursor", "2024-05-01T12:01:00,2")
+    assert logs.calls[0]["after"] == (START + timedelta(minutes=1), 2)
+    assert out.splitlines() == [
+        "01.05.24 12:02 - CREATE f2 by alice",
+        "01.05.24 12:03 - CREATE f3 by alice",
+        "Next cursor: 2024-05-01T12:03:00,4",
+    ]
+    out = logs("--cursor", "2024-05-01T12:03:00,4")
+    assert "Next cursor" not in out
+    assert out.splitlines()[-1] == "01.05.24 12:04 - CREATE f4 by alice"
+
+
+def test_empty_page(logs):
+    assert logs("--cursor", "2024-05-01T12:04:00,5") == "No operations found\n"
+
+
+@pytest.mark.parametrize("cursor", ["nonsense", "2024-05-01T12:00:00,x", "5"])
+def test_invalid_cursor(logs, cursor):
+    assert logs("--cursor", cursor) == f"Invalid cursor: {cursor}\n"
+    assert not logs.calls
+
+
+def test_limit_must_be_positive(logs):
+    assert logs("--limit", "0") == "Limit must be positive\n"
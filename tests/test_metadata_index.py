@@ -0,0 +1,70 @@
+"""The SQLite metadata index of BASE_DIR."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.files.index import MetadataIndex
+
+
+@pytest.fixture
+def index(storage, tmp_path):
+    return MetadataIndex(tmp_path / "index.sqlite3")
+
+
+def _write(p, data=b"x"):
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_bytes(data)
+    return p
+
+
+def test_refresh_only_rewrites_what_changed(storage, index):
+    for name in ("a.txt", "d/b.txt", "d/e/c.txt"):
+        _write(storage / name)
+    assert index.refresh(workers=2) == (5, 0)
+    assert index.refresh() == (0, 0)
+
+    _write(storage / "a.txt", b"longer")
+    (storage / "d/e/c.txt").unlink()
+    changed, removed = index.refresh()
+    # a.txt, and the directory whose entries changed.
+    assert changed == 2 and removed == 1
+    assert index.file_stats() == {
+        "a.txt": (6, (storage / "a.txt").stat().st_mtime_ns),
+        "d/b.txt": (1, (storage / "d/b.txt").stat().st_mtime_ns),
+    }
+
+
+def test_record_adds_parent_directories(storage, index):
+    p = _write(storage / "x/y/z.txt", b"abc")
+    index.record(p, owner=7, sha256="f" * 64)
+    assert list(index.children(storage)) == [("x", 1, (storage / "x").stat().st_size)]
+    assert [row[0] for row in index.descendants(storage)] == ["x", "x/y", "x/y/z.txt"]
+    [(path, size, _, owner, sha256)] = index.lookup("z.txt")
+    assert (path, size, owner, sha256) == ("x/y/z.txt", 3, 7, "f" * 64)
+
+
+def test_children_pages(storage, index):
+    for i in range(10):
+        _write(storage / f"f{i}")
+    index.refresh()
+    first = [row[0] for row in index.children(storage, None, 4)]
+    rest = [row[0] for row in index.children(storage, first[-1])]
+    assert first + rest == [f"f{i}" for i in range(10)]
+
+
+def test_like_wildcards_in_names_are_literal(storage, index):
+    for name in ("a_b/in.txt", "axb/in.txt", "a%/in.txt", "aZZ/in.txt"):
+        _write(storage / name)
+    index.refresh()
+    assert [r[0] for r in index.descendants(storage / "a_b")] == ["in.txt"]
+    assert index.stats(storage / "a%") == (1, 1)
+    index.remove(storage / "a_b")
+    assert sorted(index.file_stats()) == ["a%/in.txt", "aZZ/in.txt", "axb/in.txt"]
+
+
+def test_record_from_many_threads(storage, index):
+    paths = [_write(storage / f"t/{i}") for i in range(64)]
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(index.record, paths))
+    assert index.stats(storage / "t") == (64, 64)
@@ -0,0 +1,93 @@
+"""The metadata lookups must be served by an index, not a sequential scan.
+
+Runs EXPLAIN against the test database (see conftest.py). Sequential scans
+are disabled for the session, so the planner only falls back to one when no
+index can answer the query, whatever the table sizes.
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.core.config import config
+from src.core.databaseAccessor import db
+from src.files.accessor import fileAccessor
+from src.operations.accessor import operationsAccessor
+from src.operations.enum import OperationType
+from src.users.accessor import userAccessor
+
+
+class _Captured(Exception):
+    pass
+
+
+async def _capture(call, monkeypatch):
+    """The statement an accessor call would execute, without running it."""
+    captured = []
+
+    async def execute(statement):
+        captured.append(statement)
+        raise _Captured
+
+    def stream(statement, batch_size=1000):
+        captured.append(statement)
+        return None
+
+    monkeypatch.setattr(db, "execute", execute)
+    monkeypatch.setattr(db, "stream", stream)
+    try:
+        await call()
+    except _Captured:
+        pass
+    return captured[0]
+
+
+async def _explain(statement) -> str:
+    sql = statement.compile(
+        dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+    )
+    engine = create_async_engine(config.database.url)
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SET enable_seqscan = off"))
+            rows = await conn.execute(text(f"EXPLAIN {sql}"))
+            return "\n".join(row[0] for row in rows)
+    finally:
+        await engine.dispose()
+
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+async def _stream_logs(**filters):
+    return operationsAccessor.stream_logs(**filters)
+
+
+QUERIES = {
+    "fetch_by_name": lambda: fileAccessor.fetch_by_name("report.txt", 1),
+    "fetch_all_by_name": lambda: fileAccessor.fetch_all_by_name("report.txt"),
+    "fetch_by_names": lambda: fileAccessor.fetch_by_names(["a.txt", "b.txt"]),
+    "fetch_by_username": lambda: userAccessor.fetch_by_username("alice"),
+    "logs": lambda: _stream_logs(limit=51),
+    "logs_by_user": lambda: _stream_logs(username="alice", limit=51),
+    "logs_by_file": lambda: _stream_logs(file_name="report.txt", limit=51),
+    "logs_by_type": lambda: _stream_logs(type=OperationType.CREATE, limit=51),
+    "logs_after_cursor": lambda: _stream_logs(
+        after=(datetime(2026, 1, 1), 100), limit=51
+    ),
+}
+
+
+@pytest.mark.parametrize("name", QUERIES)
+def test_uses_index(name, monkeypatch):
+    async def run():
+        statement = await _capture(QUERIES[name], monkeypatch)
+        return await _explain(statement)
+
+    plan = asyncio.run(run())
+    assert "Seq Scan" not in plan, plan
+    assert "Index" in plan, plan
@@ -0,0 +1,60 @@
+"""write refuses payloads past the quota, with the accessors stubbed out."""
+
+import asyncio
+import io
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from src.core.buildParser import build_parser
+from src.files import manager
+from src.files.accessor import fileAccessor
+from src.files.manager import fileManager
+from src.usage.accessor import usageAccessor
+
+
+@pytest.fixture
+def write(storage, monkeypatch, capsys):
+    room = {}
+
+    async def fetch_by_name(name, user_id):
+        p = storage / name
+        return SimpleNamespace(file_size=p.stat().st_size) if p.exists() else None
+
+    async def fetch_all_by_name(name):
+        return []
+
+    async def get_room(user, replaced=0):
+        return room["left"] + replaced
+
+    monkeypatch.setattr(manager, "is_authenticated", lambda: 1)
+    monkeypatch.setattr(fileAccessor, "fetch_by_name", fetch_by_name)
+    monkeypatch.setattr(fileAccessor, "fetch_all_by_name", fetch_all_by_name)
+    monkeypatch.setattr(usageAccessor, "room", get_room)
+
+    def run(left, *argv, stdin=b""):
+        room["left"] = left
+        monkeypatch.setattr(sys, "stdin", SimpleNamespace(buffer=io.BytesIO(stdin)))
+        args = build_parser().parse_args(["write", *argv])
+        asyncio.run(fileManager.write(args))
+        return capsys.readouterr().out
+
+    return run
+
+
+def test_source_file_over_quota_is_refused_before_reading(storage, tmp_path, write):
+    src = tmp_path / "src.bin"
+    src.write_bytes(b"x" * 100)
+    out = write(99, "f.bin", "--from-file", str(src))
+    assert out == "Quota exceeded: 100 bytes, 99 available\n"
+    assert not (storage / "f.bin").exists()
+
+
+def test_streamed_payload_over_quota_keeps_the_old_file(storage, write):
+    (storage / "f.bin").write_bytes(b"old")
+    # 3 bytes are freed by replacing the old content.
+    out = write(10, "f.bin", stdin=b"y" * 14)
+    assert out == "Quota exceeded: 13 bytes available\n"
+    assert (storage / "f.bin").read_bytes() == b"old"
+    assert sorted(p.name for p in storage.iterdir()) == ["f.bin"]
@@ -0,0 +1,77 @@
+"""send_file_range and read --offset/--length."""
+
+import asyncio
+import io
+
+import pytest
+
+from src.cli import send_file_range
+from src.core.buildParser import build_parser
+from src.files import manager
+from src.files.manager import fileManager
+
+DATA = bytes(range(256)) * 64
+
+RANGES = [(0, len(DATA)), (100, 1000), (len(DATA) - 10, 100), (len(DATA), 5)]
+
+
+@pytest.fixture
+def stored(tmp_path):
+    p = tmp_path / "data.bin"
+    p.write_bytes(DATA)
+    with open(p, "rb") as fh:
+        yield fh
+
+
+@pytest.mark.parametrize("offset, length", RANGES)
+def test_sendfile_to_a_file(stored, tmp_path, offset, length):
+    with open(tmp_path / "out", "wb") as out:
+        sent = send_file_range(stored, out, offset, length)
+    assert (tmp_path / "out").read_bytes() == DATA[offset : offset + length]
+    assert sent == len(DATA[offset : offset + length])
+
+
+@pytest.mark.parametrize("offset, length", RANGES)
+def test_append_only_output_falls_back_to_mmap(stored, tmp_path, offset, length):
+    # sendfile(2) refuses O_APPEND destinations.
+    with open(tmp_path / "out", "ab") as out:
+        send_file_range(stored, out, offset, length)
+    assert (tmp_path / "out").read_bytes() == DATA[offset : offset + length]
+
+
+@pytest.mark.parametrize("offset, length", RANGES)
+def test_streams_without_file_descriptors(stored, offset, length):
+    for fh in (stored, io.BytesIO(DATA)):
+        out = io.BytesIO()
+        send_file_range(fh, out, offset, length)
+        assert out.getvalue() == DATA[offset : offset + length]
+
+
+@pytest.fixture
+def read(storage, monkeypatch, capfdbinary):
+    monkeypatch.setattr(manager, "is_authenticated", lambda: 1)
+    (storage / "data.bin").write_bytes(DATA)
+
+    def run(*options):
+        args = build_parser().parse_args(["read", "data.bin", *options])
+        asyncio.run(fileManager.read(args))
+        return capfdbinary.readouterr().out
+
+    return run
+
+
+def test_read_raw_range(read):
+    out = read("--format", "raw", "--offset", "300", "--length", "50")
+    assert out == DATA[300:350]
+
+
+@pytest.mark.parametrize(
+    "options, message",
+    [
+        (["--offset", str(len(DATA) + 1)], b"Offset beyond end of file"),
+        (["--offset", "-1"], b"Offset and length must be non-negative"),
+        (["--format", "json", "--length", "1"], b"not supported for json and xml"),
+    ],
+)
+def test_read_rejects_bad_ranges(read, options, message):
+    assert message in read(*options)
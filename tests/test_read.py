@@ -0,0 +1,96 @@
+"""read --format json/xml on well-formed, nested and malformed documents."""
+
+import asyncio
+import io
+import tracemalloc
+from xml.etree.ElementTree import fromstring, tostring
+
+import pytest
+
+from src.cli import dump_xml, safe_iter_xml
+from src.core.buildParser import build_parser
+from src.files import manager
+from src.files.manager import fileManager
+
+_NESTED = (
+    b'<?xml version="1.0"?>\n'
+    b'<root a="1">top<items><item id="1">x &amp; y</item>t1<item/>  '
+    b"<deep><er><est>z</est></er>after</deep></items>tail<b>bb</b></root>"
+)
+
+
+def _dump(data):
+    out = io.StringIO()
+    dump_xml(io.BytesIO(data), out)
+    return out.getvalue()
+
+
+def test_dump_xml_keeps_nested_text_and_tails():
+    assert _dump(_NESTED) == tostring(fromstring(_NESTED), encoding="unicode")
+
+
+def test_dump_xml_memory_is_bounded_by_depth():
+    # One wrapper a couple of levels down holding many small records.
+    data = (
+        b"<root><items>"
+        + b"<item><name>n</name><value>v</value></item>" * 20_000
+        + b"</items></root>"
+    )
+    out = io.StringIO()
+    tracemalloc.start()
+    try:
+        dump_xml(io.BytesIO(data), out)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert out.getvalue() == data.decode()
+    # The output buffer itself grows with the document; the tree must not.
+    assert peak < 2 * len(data) + 4_000_000
+
+
+@pytest.mark.parametrize(
+    "path, expected",
+    [
+        ("/root/items/item", ['<item id="1">x &amp; y</item>', "<item />"]),
+        ("//est", ["<est>z</est>"]),
+        ("items/*", ['<item id="1">x &amp; y</item>', "<item />", "<deep>"]),
+        ("/items", []),
+    ],
+)
+def test_safe_iter_xml(path, expected):
+    found = []
+    for el in safe_iter_xml(io.BytesIO(_NESTED), path):
+        el.tail = None
+        found.append(tostring(el, encoding="unicode"))
+    assert [f[: len(e)] for f, e in zip(found, expected)] == expected
+    assert len(found) == len(expected)
+
+
+@pytest.fixture
+def read(storage, monkeypatch, capsys):
+    monkeypatch.setattr(manager, "is_authenticated", lambda: 1)
+
+    def run(name, data, fmt):
+        (storage / name).write_bytes(data)
+        args = build_parser().parse_args(["read", name, "--format", fmt])
+        asyncio.run(fileManager.read(args))
+        return capsys.readouterr().out
+
+    return run
+
+
+def test_read_nested_xml(read):
+    out = read("doc.xml", _NESTED, "xml")
+    assert out.strip() == tostring(fromstring(_NESTED), encoding="unicode")
+
+
+@pytest.mark.parametrize(
+    "name, data, fmt, message",
+    [
+        ("bad.json", b'{"a": [1, 2,', "json", "Invalid JSON: "),
+        ("bad.xml", b"<a><b></a>", "xml", "Invalid XML: mismatched tag"),
+    ],
+)
+def test_read_malformed_document(read, name, data, fmt, message):
+    out = read(name, data, fmt)
+    assert out.splitlines()[-1].startswith(message)
@@ -0,0 +1,100 @@
+"""search by name and content, and the scanner run in its worker processes."""
+
+import asyncio
+import zipfile
+
+import pytest
+
+from src.core.buildParser import build_parser
+from src.search import manager
+from src.search.manager import searchManager
+from src.search.scan import SNIPPET_LENGTH, compile_pattern, find_matches, scan_files
+
+TEXT = b"alpha beta\nGamma alpha\nnothing here\n"
+
+
+@pytest.mark.parametrize(
+    "pattern, regex, ignore_case, expected",
+    [
+        (b"alpha", False, False, [(0, b"alpha beta"), (17, b"Gamma alpha")]),
+        (b"gamma", False, True, [(11, b"Gamma alpha")]),
+        (rb"b\w+a", True, False, [(6, b"alpha beta")]),
+        (b"missing", False, False, []),
+    ],
+)
+def test_find_matches(pattern, regex, ignore_case, expected):
+    matcher = compile_pattern(pattern, regex, ignore_case)
+    assert find_matches(TEXT, matcher, 10) == expected
+    assert find_matches(TEXT, matcher, 1) == expected[:1]
+
+
+def test_one_match_per_line_and_long_lines_are_cut():
+    line = b"x" * 1000 + b"needle needle" + b"x" * 1000
+    [(offset, snippet)] = find_matches(line + b"\n", b"needle", 10)
+    assert offset == 1000
+    assert len(snippet) == SNIPPET_LENGTH and b"needle needle" in snippet
+
+
+def test_scan_files_looks_inside_zips(tmp_path):
+    archive = tmp_path / "a.zip"
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("in/doc.txt", TEXT)
+    files = [(str(archive), "a.zip"), (str(tmp_path / "gone"), "gone")]
+    matches, skipped = scan_files(files, b"gamma", False, True, True, 10)
+    assert matches == [("a.zip!in/doc.txt", 11, b"Gamma alpha")]
+    assert skipped == 1
+    assert scan_files(files, b"gamma", False, True, False, 10)[0] == []
+
+
+@pytest.fixture
+def tree(storage):
+    (storage / "docs").mkdir()
+    (storage / "docs" / "one.txt").write_bytes(TEXT)
+    (storage / "docs" / "two.log").write_bytes(b"beta\n" * 3)
+    (storage / "three.txt").write_bytes(b"")
+    return storage
+
+
+@pytest.fixture
+def search(tree, monkeypatch, capsys):
+    monkeypatch.setattr(manager, "is_authenticated", lambda: 1)
+
+    def run(*options):
+        args = build_parser().parse_args(["search", *options])
+        asyncio.run(searchManager.search(args))
+        return capsys.readouterr().out.splitlines()
+
+    return run
+
+
+def test_search_names(search):
+    assert sorted(search("--name", "*.txt")[:-1]) == ["docs/one.txt", "three.txt"]
+    assert search("--name", "^t.*g$", "--name-regex")[:-1] == ["docs/two.log"]
+
+
+def test_search_contents(search):
+    out = search("--content", "beta", "--workers", "2")
+    assert set(out[:-1]) == {
+        "docs/one.txt:6: alpha beta",
+        "docs/two.log:0: beta",
+        "docs/two.log:5: beta",
+        "docs/two.log:10: beta",
+    }
+    assert "(3 files searched, 0 skipped)" in out[-1]
+
+
+def test_search_stops_at_max_results(search):
+    out = search("--content", "beta", "--name", "*.log", "--max-results", "2")
+    assert len(out) == 3 and out[-1].endswith("stopped at --max-results")
+
+
+@pytest.mark.parametrize(
+    "options, message",
+    [
+        ([], "Give --name and/or --content"),
+        (["--content", "(", "--regex"], "Invalid pattern:"),
+        (["--name", "x", "--max-results", "0"], "--max-results must be positive"),
+    ],
+)
+def test_search_rejects_bad_options(search, options, message):
+    assert search(*options)[0].startswith(message)
@@ -0,0 +1,37 @@
+"""Commands that run without the database must not import it."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from src.core.buildParser import build_parser
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CHILD = """
+import sys
+from src.core.buildParser import build_parser
+
+sub = build_parser()._subparsers._group_actions[0].choices[sys.argv[1]]
+sub.get_default("func").load()
+print(sorted(m for m in sys.modules if m.split(".")[0] == "sqlalchemy")[:3])
+"""
+
+
+def _no_db_commands():
+    choices = build_parser()._subparsers._group_actions[0].choices
+    return [name for name, sub in choices.items() if not sub.get_default("needs_db")]
+
+
+@pytest.mark.parametrize("command", _no_db_commands())
+def test_handler_does_not_load_the_orm(command):
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD, command],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    assert out.strip() == "[]"
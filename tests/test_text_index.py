@@ -0,0 +1,87 @@
+"""The incremental full-text index."""
+
+import pytest
+
+from src.search.index import (
+    MAX_TERM_LENGTH,
+    TextIndex,
+    decode_postings,
+    decode_varints,
+    encode_postings,
+    encode_varints,
+    parse_query,
+    tokenize,
+)
+
+DOCS = {
+    "a.txt": "The quick brown fox jumps over the lazy dog. Quick!",
+    "sub/b.json": '{"text": "a brown quick fox"}',
+    "sub/c.xml": "<p>lazy afternoon</p>",
+    "skip.bin": "quick brown",
+}
+
+
+def test_varints_and_postings_round_trip():
+    values = [0, 1, 127, 128, 300, 2**35]
+    assert decode_varints(encode_varints(values)) == values
+    hits = [(0, 0), (3, 17), (4, 23), (1000, 70000)]
+    assert decode_postings(encode_postings(hits)) == hits
+
+
+def test_tokenize():
+    long = "x" * (MAX_TERM_LENGTH + 1)
+    assert list(tokenize(f"Hello, WORLD {long} again")) == [
+        ("hello", 0, 0),
+        ("world", 1, 7),
+        ("again", 3, 79),
+    ]
+    assert parse_query('fox "Quick  Brown" !') == [["fox"], ["quick", "brown"]]
+
+
+@pytest.fixture
+def index(storage, tmp_path):
+    paths = []
+    for rel, text in DOCS.items():
+        p = storage / rel
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_text(text)
+        paths.append(p)
+    index = TextIndex(tmp_path / "textindex.sqlite3")
+    index.update_many(paths)
+    return index
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("quick", [("a.txt", 4, 2), ("sub/b.json", 18, 1)]),
+        ("QUICK fox", [("a.txt", 4, 2), ("sub/b.json", 18, 1)]),
+        ('"quick brown"', [("a.txt", 4, 1)]),
+        ('"brown quick"', [("sub/b.json", 12, 1)]),
+        ('lazy "the lazy dog"', [("a.txt", 35, 1)]),
+        ("fox afternoon", []),
+        ("!!", []),
+    ],
+)
+def test_query(storage, index, query, expected):
+    assert list(index.query(query, storage)) == expected
+
+
+def test_query_below_a_directory(storage, index):
+    assert list(index.query("lazy", storage / "sub")) == [("c.xml", 3, 1)]
+
+
+def test_rename_and_remove(storage, index):
+    (storage / "a.txt").rename(storage / "moved.txt")
+    index.rename(storage / "a.txt", storage / "moved.txt")
+    assert [r[0] for r in index.query('"quick brown"', storage)] == ["moved.txt"]
+    index.remove(storage / "moved.txt")
+    assert list(index.query('"quick brown"', storage)) == []
+
+
+def test_refresh_catches_up_with_outside_changes(storage, index):
+    assert index.refresh() == (0, 0)
+    (storage / "sub/c.xml").write_text("<p>a quick one, and longer</p>")
+    (storage / "sub/b.json").unlink()
+    assert index.refresh(workers=2) == (1, 1)
+    assert [r[0] for r in index.query("quick", storage)] == ["a.txt", "sub/c.xml"]
@@ -0,0 +1,56 @@
+"""usage permissions, with the accessors replaced by stand-ins."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.core.buildParser import build_parser
+from src.usage import manager
+from src.usage.accessor import usageAccessor
+from src.users.accessor import userAccessor
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+
+    async def fetch_by_id(user_id):
+        return SimpleNamespace(id=user_id, username={1: "admin", 2: "bob"}[user_id])
+
+    async def fetch_all(username=None):
+        calls.append(("fetch_all", username))
+        return [(username or "everyone", 1, 10, 10)]
+
+    async def recount():
+        calls.append(("recount",))
+        return 0
+
+    monkeypatch.setattr(manager, "ADMIN_USERS", frozenset({"admin"}))
+    monkeypatch.setattr(userAccessor, "fetch_by_id", fetch_by_id)
+    monkeypatch.setattr(usageAccessor, "fetch_all", fetch_all)
+    monkeypatch.setattr(usageAccessor, "recount", recount)
+    return calls
+
+
+def _usage(monkeypatch, user, *argv):
+    monkeypatch.setattr(manager, "is_authenticated", lambda: user)
+    args = build_parser().parse_args(["usage", *argv])
+    asyncio.run(manager.usageManager.usage(args))
+
+
+def test_non_admin_sees_only_own_usage(monkeypatch, calls, capsys):
+    _usage(monkeypatch, 2)
+    assert calls == [("fetch_all", "bob")]
+
+
+@pytest.mark.parametrize("argv", [["--recount"], ["--user", "admin"]])
+def test_non_admin_refused(monkeypatch, calls, capsys, argv):
+    _usage(monkeypatch, 2, *argv)
+    assert calls == []
+    assert "Permission denied" in capsys.readouterr().out
+
+
+def test_admin_sees_everyone_and_recounts(monkeypatch, calls):
+    _usage(monkeypatch, 1, "--recount")
+    assert calls == [("recount",), ("fetch_all", None)]
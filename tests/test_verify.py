@@ -0,0 +1,121 @@
+"""verify rehashes files against recorded checksums, with the accessor stubbed."""
+
+import asyncio
+import hashlib
+import time
+
+import pytest
+
+from src.core.buildParser import build_parser
+from src.files import verify
+from src.files.accessor import fileAccessor
+from src.files.verify import VerifyState, hash_files, verifyManager
+
+
+def sha(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def test_hash_files_reports_digests_and_errors(tmp_path):
+    a = tmp_path / "a.txt"
+    a.write_bytes(b"hello")
+    results = hash_files([(str(a), "a.txt"), (str(tmp_path / "gone"), "gone")], None)
+    assert results[0] == ("a.txt", 5, sha(b"hello"), None)
+    label, size, digest, error = results[1]
+    assert (label, size, digest) == ("gone", 0, None)
+    assert error
+
+
+def test_hash_files_honours_the_rate(tmp_path):
+    a = tmp_path / "a.bin"
+    a.write_bytes(b"x" * 100_000)
+    started = time.monotonic()
+    [(_, size, digest, _)] = hash_files([(str(a), "a.bin")], 500_000)
+    assert (size, digest) == (100_000, sha(b"x" * 100_000))
+    assert time.monotonic() - started >= 0.15
+
+
+def test_state_load_is_scoped_to_a_prefix(tmp_path):
+    state = VerifyState(tmp_path / "verify.sqlite3")
+    state.save(
+        [
+            ("a_b/x", 1, 2, 3, "c1"),
+            ("aXb/y", 1, 2, 3, "c2"),
+            ("top", 1, 2, 3, "c3"),
+        ],
+        [],
+    )
+    # _ is escaped, so it does not match any single character.
+    assert state.load("a_b") == {"a_b/x": (1, 2, 3, "c1")}
+    assert len(state.load("")) == 3
+    state.save([], ["top"])
+    assert "top" not in state.load("")
+
+
+@pytest.fixture
+def run(storage, tmp_path, monkeypatch, capsys):
+    rows = []
+    recorded = {}
+
+    async def fetch_checksums():
+        return rows
+
+    async def set_checksums(checksums):
+        recorded.update(checksums)
+
+    monkeypatch.setattr(verify, "is_authenticated", lambda: 1)
+    monkeypatch.setattr(verify, "verifyState", VerifyState(tmp_path / "v.sqlite3"))
+    monkeypatch.setattr(fileAccessor, "fetch_checksums", fetch_checksums)
+    monkeypatch.setattr(fileAccessor, "set_checksums", set_checksums)
+
+    def run(*argv, checksums=()):
+        rows[:] = checksums
+        args = build_parser().parse_args(["verify", *argv, "--workers", "2"])
+        asyncio.run(verifyManager.verify(args))
+        return capsys.readouterr().out
+
+    run.recorded = recorded
+    return run
+
+
+def test_mismatch_and_untracked_are_reported(storage, run):
+    (storage / "good.txt").write_bytes(b"good")
+    (storage / "bad.txt").write_bytes(b"tampered")
+    (storage / "stray.txt").write_bytes(b"stray")
+    out = run(
+        checksums=[(1, "good.txt", 1, sha(b"good")), (2, "bad.txt", 1, sha(b"bad"))]
+    )
+    assert (
+        f"Mismatch: bad.txt: sha256 {sha(b'tampered')}, recorded {sha(b'bad')}" in out
+    )
+    assert "1 verified, 1 mismatched, 0 unreadable, 0 unchanged" in out
+    assert "1 untracked" in out
+
+
+def test_unchanged_files_are_skipped_unless_all(storage, run):
+    (storage / "a.txt").write_bytes(b"a")
+    checksums = [(1, "a.txt", 1, sha(b"a"))]
+    assert "1 verified" in run(checksums=checksums)
+    assert "0 verified, 0 mismatched, 0 unreadable, 1 unchanged" in run(
+        checksums=checksums
+    )
+    assert "1 verified" in run("--all", checksums=checksums)
+    # A rewrite changes the stat, so the file is read again.
+    (storage / "a.txt").write_bytes(b"b")
+    assert "1 mismatched" in run(checksums=checksums)
+
+
+def test_record_fills_in_own_missing_checksums(storage, run):
+    (storage / "mine.txt").write_bytes(b"mine")
+    (storage / "theirs.txt").write_bytes(b"theirs")
+    checksums = [(1, "mine.txt", 1, None), (2, "theirs.txt", 2, None)]
+    out = run(checksums=checksums)
+    assert "2 without checksum" in out
+    assert not run.recorded
+    out = run("--record", checksums=checksums)
+    assert "Recorded 1 checksums" in out
+    assert run.recorded == {1: sha(b"mine")}
+
+
+def test_bandwidth_must_be_positive(storage, run):
+    assert run("--bandwidth", "0") == "--bandwidth must be positive\n"
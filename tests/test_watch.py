@@ -0,0 +1,147 @@
+"""The inotify Watcher: dirty paths, paired renames and new directories."""
+
+import asyncio
+import os
+
+import pytest
+
+from src.files import watch
+from src.files.index import MetadataIndex
+from src.files.watch import Watcher
+
+
+@pytest.fixture
+def index(storage, tmp_path, monkeypatch):
+    index = MetadataIndex(tmp_path / "index.sqlite3")
+    monkeypatch.setattr(watch, "metadataIndex", index)
+    return index
+
+
+@pytest.fixture
+def watcher(storage, index):
+    try:
+        watcher = Watcher(storage)
+    except OSError as e:
+        pytest.skip(f"inotify unavailable: {e}")
+    with watcher.inotify:
+        watcher.watch_tree(storage)
+        yield watcher
+
+
+def test_writes_mark_paths_dirty(storage, watcher):
+    (storage / "a.txt").write_bytes(b"a")
+    (storage / "a.txt").write_bytes(b"aa")
+    (storage / "b.txt").write_bytes(b"b")
+    (storage / "b.txt").unlink()
+    watcher.handle()
+    assert watcher.dirty == {storage / "a.txt", storage / "b.txt"}
+    assert watcher.take(1) | watcher.take(10) == {storage / "a.txt", storage / "b.txt"}
+    assert not watcher.dirty
+
+
+def test_rename_within_the_tree_is_a_move(storage, watcher):
+    (storage / "a.txt").write_bytes(b"a")
+    watcher.handle()
+    watcher.take(10)
+    os.rename(storage / "a.txt", storage / "b.txt")
+    os.rename(storage / "b.txt", storage / "c.txt")
+    watcher.handle()
+    # Renamed twice, the file keeps its first name as the source.
+    assert watcher.take_moves() == {storage / "c.txt": storage / "a.txt"}
+    assert not watcher.dirty
+
+
+def test_dirty_file_follows_its_rename(storage, watcher):
+    (storage / "a.txt").write_bytes(b"a")
+    os.rename(storage / "a.txt", storage / "b.txt")
+    watcher.handle()
+    assert watcher.dirty == {storage / "b.txt"}
+    assert watcher.take_moves() == {storage / "b.txt": storage / "a.txt"}
+
+
+def test_rename_out_of_the_tree_becomes_dirty(storage, tmp_path, watcher):
+    (storage / "a.txt").write_bytes(b"a")
+    watcher.handle()
+    watcher.take(10)
+    os.rename(storage / "a.txt", tmp_path / "a.txt")
+    watcher.handle()
+    assert not watcher.dirty
+    assert watcher.take_moves() == {}
+    assert watcher.dirty == {storage / "a.txt"}
+
+
+def test_files_in_a_new_directory_are_dirty_and_watched(storage, tmp_path, watcher):
+    # Moved in whole, so its files produced no events of their own.
+    outside = tmp_path / "d"
+    (outside / "e").mkdir(parents=True)
+    (outside / "e/x.txt").write_bytes(b"x")
+    os.rename(outside, storage / "d")
+    watcher.handle()
+    assert watcher.dirty == {storage / "d/e/x.txt"}
+    assert set(watcher.dirs.values()) == {storage, storage / "d", storage / "d/e"}
+
+    watcher.take(10)
+    (storage / "d/e/y.txt").write_bytes(b"y")
+    watcher.handle()
+    assert watcher.dirty == {storage / "d/e/y.txt"}
+
+
+def test_removed_directory_marks_its_indexed_files(storage, index, watcher):
+    (storage / "d").mkdir()
+    watcher.handle()
+    (storage / "d/x.txt").write_bytes(b"x")
+    index.record(storage / "d/x.txt")
+    (storage / "d/x.txt").unlink()
+    (storage / "d").rmdir()
+    watcher.handle()
+    assert storage / "d/x.txt" in watcher.dirty
+    assert set(watcher.dirs.values()) == {storage}
+
+
+def test_reconcile_marks_what_differs_from_the_index(storage, index, watcher):
+    (storage / "same.txt").write_bytes(b"s")
+    (storage / "changed.txt").write_bytes(b"c")
+    (storage / "gone.txt").write_bytes(b"g")
+    for name in ("same.txt", "changed.txt", "gone.txt"):
+        index.record(storage / name)
+    (storage / "changed.txt").write_bytes(b"longer")
+    (storage / "gone.txt").unlink()
+    (storage / "new.txt").write_bytes(b"n")
+    watcher.reconcile()
+    assert watcher.dirty == {
+        storage / "changed.txt",
+        storage / "gone.txt",
+        storage / "new.txt",
+    }
+
+
+def test_settled_waits_for_events_to_stop(watcher, monkeypatch):
+    monkeypatch.setattr(watch, "WATCH_DEBOUNCE", 0.05)
+    monkeypatch.setattr(watch, "WATCH_MAX_DELAY", 0.3)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        # Keep changing every 20ms, so only the maximum delay ends the wait.
+        timer = None
+
+        def poke():
+            nonlocal timer
+            watcher.changed.set()
+            timer = loop.call_later(0.02, poke)
+
+        poke()
+        started = loop.time()
+        await watcher.settled()
+        timer.cancel()
+        return loop.time() - started
+
+    assert 0.25 <= asyncio.run(run()) < 1
+
+
+def test_settled_returns_at_once_when_stopped(watcher):
+    async def run():
+        watcher.stop()
+        await asyncio.wait_for(watcher.settled(), 1)
+
+    asyncio.run(run())
+    assert watcher.stopped
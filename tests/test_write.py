@@ -0,0 +1,73 @@
+"""write's chunked store path, fed from a pipe like stdin."""
+
+import hashlib
+import io
+import os
+import threading
+
+import pytest
+
+from src.cli import STREAM_CHUNK_SIZE, PayloadTooLarge, copy_stream
+from src.files.manager import fileManager
+
+DATA = os.urandom(3 * STREAM_CHUNK_SIZE + 12345)
+
+
+@pytest.fixture
+def pipe():
+    """A read end fed with data by a thread, as stdin would be."""
+    opened = []
+
+    def make(data):
+        r, w = os.pipe()
+
+        def feed():
+            with open(w, "wb") as fh:
+                try:
+                    fh.write(data)
+                except BrokenPipeError:
+                    pass
+
+        thread = threading.Thread(target=feed)
+        thread.start()
+        source = open(r, "rb", buffering=0)
+        opened.append((source, thread))
+        return source
+
+    yield make
+    for source, thread in opened:
+        source.close()
+        thread.join()
+
+
+def test_store_content_from_a_pipe(storage, pipe):
+    p = storage / "piped.bin"
+    size, digest, _, _ = fileManager.store_content(
+        p, pipe(DATA), len(DATA), compress="none"
+    )
+    assert size == len(DATA)
+    assert digest == hashlib.sha256(DATA).hexdigest()
+    assert p.read_bytes() == DATA
+
+
+def test_oversized_payload_keeps_the_old_file(storage, pipe):
+    p = storage / "kept.bin"
+    p.write_bytes(b"old")
+    with pytest.raises(PayloadTooLarge):
+        fileManager.store_content(p, pipe(DATA), len(DATA) - 1, compress="none")
+    assert p.read_bytes() == b"old"
+    assert [e.name for e in storage.iterdir()] == ["kept.bin"]
+
+
+def test_copy_stream_reads_fixed_size_chunks():
+    reads = []
+
+    class Source(io.BytesIO):
+        def readinto(self, b):
+            reads.append(len(b))
+            return super().readinto(b)
+
+    out = io.BytesIO()
+    copy_stream(Source(DATA), out, len(DATA), chunk_size=4096)
+    assert out.getvalue() == DATA
+    assert set(reads) == {4096}
@@ -0,0 +1,83 @@
+"""create-zip's archive writer, read back with zipfile."""
+
+import os
+import struct
+import zipfile
+
+import pytest
+
+from src.cli import ZipArchiveWriter, deflate_zip_member
+
+_CENTRAL = struct.Struct("<4s6H3L5H2L")
+
+
+def _write_zip(tmp_path, files, skip=0):
+    src = tmp_path / "src"
+    archive = tmp_path / "out.zip"
+    with open(archive, "wb") as fh:
+        fh.seek(skip)
+        with ZipArchiveWriter(fh) as zw:
+            for name, data in files.items():
+                p = src / name
+                p.parent.mkdir(parents=True, exist_ok=True)
+                p.write_bytes(data)
+                zw.add(*deflate_zip_member(p, name))
+    return archive
+
+
+def _central_headers(archive):
+    """The fixed fields of each central directory header."""
+    with open(archive, "rb") as f:
+        f.seek(-64 * 1024, os.SEEK_END)
+        tail = f.read()
+    headers = []
+    pos = tail.find(b"PK\x01\x02")
+    while pos >= 0:
+        fields = _CENTRAL.unpack_from(tail, pos)
+        headers.append(fields)
+        pos = tail.find(b"PK\x01\x02", pos + _CENTRAL.size + sum(fields[10:13]))
+    return headers
+
+
+def test_round_trip(tmp_path):
+    files = {
+        "a.txt": b"hello world\n" * 1000,
+        "photo.jpg": os.urandom(4096),
+        "empty.txt": b"",
+        "dir/ü.txt": b"unicode name",
+    }
+    archive = _write_zip(tmp_path, files)
+    with zipfile.ZipFile(archive) as zf:
+        assert zf.testzip() is None
+        assert sorted(zf.namelist()) == sorted(files)
+        for name, data in files.items():
+            assert zf.read(name) == data
+        assert zf.getinfo("a.txt").compress_type == zipfile.ZIP_DEFLATED
+        assert zf.getinfo("photo.jpg").compress_type == zipfile.ZIP_STORED
+
+
+def test_duplicate_name_refused(tmp_path):
+    p = tmp_path / "a.txt"
+    p.write_bytes(b"x")
+    with open(tmp_path / "out.zip", "wb") as fh, ZipArchiveWriter(fh) as zw:
+        zw.add(*deflate_zip_member(p, "a.txt"))
+        with pytest.raises(ValueError):
+            zw.add(*deflate_zip_member(p, "a.txt"))
+
+
+@pytest.mark.parametrize("skip", [3 * 2**30, 5 * 2**30])
+def test_zip64_offsets(tmp_path, skip):
+    """Members past the 32-bit limit, after a hole in a sparse file."""
+    files = {"a.txt": b"first\n" * 100, "b.txt": b"second"}
+    archive = _write_zip(tmp_path, files, skip)
+    with zipfile.ZipFile(archive) as zf:
+        assert zf.testzip() is None
+        for name, data in files.items():
+            assert zf.read(name) == data
+        assert min(info.header_offset for info in zf.infolist()) == skip
+    headers = _central_headers(archive)
+    assert len(headers) == len(files)
+    for fields in headers:
+        # The offset is only in the zip64 extra field; the sizes fit.
+        assert fields[16] == 0xFFFFFFFF
+        assert fields[8] != 0xFFFFFFFF and fields[9] != 0xFFFFFFFF